@@ -0,0 +1,221 @@
+"""
+Offline benchmarks for repo-digest.
+
+Generates a synthetic repository (see SynthSpec), times each pipeline stage
+and the end-to-end export, and writes the timings as JSON. Given a baseline
+JSON the run fails when any stage got slower than the threshold allows.
+
+    python -m benchmarks.run --files 2000 -o bench.json
+    python -m benchmarks.run --files 2000 --baseline bench.json --threshold 0.25
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.repo_digest.core import export_repo_as_text, iter_files
+from src.repo_digest.fileio import load_encoder
+from src.repo_digest.ignore import IgnoreMatcher
+from src.repo_digest.reader import read_files
+from src.repo_digest.stats import FileStats
+from src.repo_digest.tokenizers import WORDS_TOKENIZER
+from src.repo_digest.tree import DirTree
+
+from .synth import SynthSpec, generate_repo
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 0.2
+# Stages faster than this are too noisy to gate on
+DEFAULT_MIN_SECONDS = 0.01
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    runs: List[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    ordered = sorted(runs)
+    return {"median": ordered[len(ordered) // 2], "min": ordered[0], "runs": runs}
+
+
+def _quiet(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Swallow the progress lines export prints, so they do not skew the timing."""
+    def run() -> Any:
+        saved = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            return fn()
+        finally:
+            sys.stdout = saved
+    return run
+
+
+def run_benchmarks(spec: SynthSpec, *, repeat: int = 3, jobs: int = 1, workdir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate the repository for spec and time every stage. Stages that need
+    tiktoken are recorded as skipped when it is not installed.
+    """
+    base = tempfile.mkdtemp(dir=workdir)
+    try:
+        root = os.path.join(base, "repo")
+        os.makedirs(root)
+        counts = generate_repo(root, spec)
+        output = os.path.join(base, "out.txt")
+
+        matcher = IgnoreMatcher.for_root(root, True)
+        paths = list(iter_files(root, matcher=matcher))
+        all_paths = [
+            os.path.relpath(os.path.join(d, f), root)
+            for d, _, files in os.walk(root) for f in files
+        ]
+        infos = [info for _, info, _ in read_files(root, paths, None, jobs, keep_content=False) if info is not None]
+
+        def enumerate_files() -> None:
+            list(iter_files(root, matcher=IgnoreMatcher.for_root(root, True)))
+
+        def match_ignores() -> None:
+            m = IgnoreMatcher.for_root(root, True)
+            for p in all_paths:
+                m.is_ignored(p)
+
+        encoders: List[Tuple[str, Any]] = [(WORDS_TOKENIZER, None)]
+        encoder = load_encoder()
+        if encoder is not None:
+            encoders.append(("cl100k_base", encoder))
+
+        stages: Dict[str, Dict[str, Any]] = {}
+        stages["iter_files"] = _time(enumerate_files, repeat)
+        stages["is_ignored"] = _time(match_ignores, repeat)
+        stages["dir_tree"] = _time(lambda: DirTree.from_infos(infos), repeat)
+        tree = DirTree.from_infos(infos)
+        stages["render_tree"] = _time(lambda: tree.render(io.StringIO()), repeat)
+        stages["file_stats"] = _time(lambda: FileStats.from_infos(infos), repeat)
+        stats = FileStats.from_infos(infos)
+        stages["top_files"] = _time(lambda: (stats.top(20, 'tokens'), stats.top(20, 'bytes')), repeat)
+        for name, enc in encoders:
+            stages[f"read_files[{name}]"] = _time(lambda enc=enc: list(read_files(root, paths, enc, jobs, keep_content=False)), repeat)
+        stages[f"export[{WORDS_TOKENIZER}]"] = _time(_quiet(lambda: export_repo_as_text(root, output, jobs=jobs, tokenizer=WORDS_TOKENIZER)), repeat)
+        stages["export[estimate]"] = _time(_quiet(lambda: export_repo_as_text(root, output, jobs=jobs, tokenizer='estimate')), repeat)
+        if encoder is not None:
+            stages["export[cl100k_base]"] = _time(_quiet(lambda: export_repo_as_text(root, output, jobs=jobs)), repeat)
+        else:
+            stages["export[cl100k_base]"] = {"skipped": "tiktoken is not installed"}
+            stages["read_files[cl100k_base]"] = {"skipped": "tiktoken is not installed"}
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tiktoken": encoder is not None,
+        "jobs": jobs,
+        "repeat": repeat,
+        "spec": spec.as_dict(),
+        "repo": {**counts, "selected": len(paths)},
+        "stages": stages,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], *, threshold: float = DEFAULT_THRESHOLD, thresholds: Optional[Dict[str, float]] = None, min_seconds: float = DEFAULT_MIN_SECONDS) -> List[Dict[str, Any]]:
+    """
+    Return the stages whose median time grew by more than their threshold
+    (a fraction: 0.2 allows 20% slower). thresholds overrides the threshold
+    per stage. Stages missing or skipped on either side, and stages whose
+    baseline is under min_seconds, are not compared.
+    """
+    thresholds = thresholds or {}
+    regressions: List[Dict[str, Any]] = []
+    for name, base in baseline.get("stages", {}).items():
+        cur = current.get("stages", {}).get(name)
+        if cur is None or "median" not in base or "median" not in cur:
+            continue
+        if base["median"] < min_seconds:
+            continue
+        ratio = cur["median"] / base["median"]
+        allowed = thresholds.get(name, threshold)
+        if ratio > 1 + allowed:
+            regressions.append({"stage": name, "baseline": base["median"], "current": cur["median"], "ratio": ratio, "threshold": allowed})
+    return regressions
+
+
+def _format(results: Dict[str, Any]) -> str:
+    lines = [f"repo: {results['repo']}", f"tiktoken: {results['tiktoken']}"]
+    for name, stage in results["stages"].items():
+        if "median" in stage:
+            lines.append(f"{name:32} {stage['median'] * 1000:10.1f} ms (min {stage['min'] * 1000:.1f})")
+        else:
+            lines.append(f"{name:32} skipped: {stage['skipped']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Time repo-digest stages on a synthetic repository.")
+    defaults = SynthSpec()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--fanout", type=int, default=defaults.fanout)
+    parser.add_argument("--size-median", type=int, default=defaults.size_median, help="Median file size in bytes")
+    parser.add_argument("--size-sigma", type=float, default=defaults.size_sigma, help="Log-normal sigma of file sizes")
+    parser.add_argument("--size-max", type=int, default=defaults.size_max)
+    parser.add_argument("--ignore-rules", type=int, default=defaults.ignore_rules, help="Lines in the generated .gitignore")
+    parser.add_argument("--ignore-density", type=float, default=defaults.ignore_density, help="Fraction of files matched by .gitignore")
+    parser.add_argument("--binary-fraction", type=float, default=defaults.binary_fraction)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("-o", "--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against results from an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown as a fraction (default: 0.2)")
+    parser.add_argument("--stage-threshold", action="append", default=[], metavar="STAGE=FRACTION", help="Allowed slowdown for one stage (repeatable)")
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS, help="Do not gate stages faster than this in the baseline")
+    args = parser.parse_args(argv)
+
+    spec = SynthSpec(
+        files=args.files, depth=args.depth, fanout=args.fanout,
+        size_median=args.size_median, size_sigma=args.size_sigma, size_max=args.size_max,
+        ignore_rules=args.ignore_rules, ignore_density=args.ignore_density,
+        binary_fraction=args.binary_fraction, seed=args.seed,
+    )
+    thresholds = {}
+    for item in args.stage_threshold:
+        name, sep, value = item.rpartition('=')
+        if not sep or not name:
+            parser.error(f"expected STAGE=FRACTION, got {item!r}")
+        thresholds[name] = float(value)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("spec") != spec.as_dict():
+            print("[bench] warning: baseline was recorded with a different repository spec")
+
+    results = run_benchmarks(spec, repeat=args.repeat, jobs=args.jobs)
+    print(_format(results))
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if baseline is not None:
+        regressions = compare(baseline, results, threshold=args.threshold, thresholds=thresholds, min_seconds=args.min_seconds)
+        for r in regressions:
+            print(f"[REGRESSION] {r['stage']}: {r['baseline'] * 1000:.1f} ms -> {r['current'] * 1000:.1f} ms ({(r['ratio'] - 1) * 100:+.0f}%, allowed {r['threshold'] * 100:.0f}%)")
+        if regressions:
+            return 1
+        print("[bench] no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import os
+import math
+import random
+from typing import Any, Dict, List
+
+# Words that synthetic source lines are built from
+_VOCABULARY = (
+    "def", "return", "self", "value", "result", "items", "for", "in", "if", "else",
+    "import", "from", "class", "None", "True", "False", "config", "path", "data",
+    "index", "count", "name", "len", "range", "print", "yield", "with", "as",
+)
+_TEXT_EXTENSIONS = ('.py', '.js', '.ts', '.md', '.json', '.txt', '.go', '.rs')
+_BINARY_EXTENSIONS = ('.dat', '.bin2', '')
+
+
+class SynthSpec:
+    """
+    Shape of a synthetic repository.
+
+    files text and binary files are spread over a directory tree of the
+    given depth and fanout. File sizes follow a log-normal distribution
+    around size_median bytes (size_sigma is the sigma of the underlying
+    normal), capped at size_max. ignore_rules lines are written to the root
+    .gitignore; ignore_density of the files match one of them.
+    binary_fraction of the files are binaries with extensions the exclude
+    lists do not know, so only content sniffing catches them. The same spec
+    and seed always produce the same tree.
+    """
+
+    FIELDS = ('files', 'depth', 'fanout', 'size_median', 'size_sigma', 'size_max', 'ignore_rules', 'ignore_density', 'binary_fraction', 'seed')
+
+    def __init__(
+        self,
+        files: int = 1000,
+        depth: int = 4,
+        fanout: int = 4,
+        size_median: int = 2048,
+        size_sigma: float = 1.0,
+        size_max: int = 256 * 1024,
+        ignore_rules: int = 20,
+        ignore_density: float = 0.1,
+        binary_fraction: float = 0.05,
+        seed: int = 0,
+    ) -> None:
+        self.files = files
+        self.depth = depth
+        self.fanout = fanout
+        self.size_median = size_median
+        self.size_sigma = size_sigma
+        self.size_max = size_max
+        self.ignore_rules = ignore_rules
+        self.ignore_density = ignore_density
+        self.binary_fraction = binary_fraction
+        self.seed = seed
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SynthSpec':
+        return cls(**{k: v for k, v in data.items() if k in cls.FIELDS})
+
+
+def _directories(spec: SynthSpec) -> List[str]:
+    dirs = ['']
+    level = ['']
+    for depth in range(spec.depth):
+        level = [os.path.join(parent, f"d{depth}_{i}") for parent in level for i in range(spec.fanout)]
+        dirs.extend(level)
+    return dirs
+
+
+def _text(rng: random.Random, size: int) -> str:
+    lines: List[str] = []
+    total = 0
+    while total < size:
+        indent = "    " * rng.randrange(3)
+        line = indent + " ".join(rng.choice(_VOCABULARY) for _ in range(rng.randint(2, 12))) + "\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)[:size]
+
+
+def generate_repo(root_dir: str, spec: SynthSpec) -> Dict[str, int]:
+    """Write the repository described by spec under root_dir and return file counts by kind."""
+    rng = random.Random(spec.seed)
+    dirs = _directories(spec)
+    for d in dirs:
+        os.makedirs(os.path.join(root_dir, d), exist_ok=True)
+
+    # A few rules that real files hit, padded with rules that never match
+    live_rules = ['*.gen', 'generated/', 'tmp_*'][:max(1, min(3, spec.ignore_rules))]
+    rules = live_rules + [f"*.unused{i}" if i % 2 else f"unused_dir_{i}/" for i in range(spec.ignore_rules - len(live_rules))]
+    with open(os.path.join(root_dir, '.gitignore'), 'w', encoding='utf-8') as f:
+        f.write("\n".join(rules) + "\n")
+
+    counts = {"text": 0, "binary": 0, "ignored": 0, "bytes": 0}
+    mu = math.log(max(1, spec.size_median))
+    for n in range(spec.files):
+        directory = rng.choice(dirs)
+        size = min(spec.size_max, max(1, int(rng.lognormvariate(mu, spec.size_sigma))))
+        roll = rng.random()
+        if roll < spec.ignore_density:
+            rule = rng.choice(live_rules)
+            if rule == 'generated/':
+                directory = os.path.join(directory, 'generated')
+                os.makedirs(os.path.join(root_dir, directory), exist_ok=True)
+                name = f"f{n}.py"
+            elif rule == 'tmp_*':
+                name = f"tmp_{n}.py"
+            else:
+                name = f"f{n}.gen"
+            kind = "ignored"
+            data = _text(rng, size).encode('utf-8')
+        elif roll < spec.ignore_density + spec.binary_fraction:
+            name = f"f{n}{rng.choice(_BINARY_EXTENSIONS)}"
+            kind = "binary"
+            data = b"\0" + rng.getrandbits(8 * size).to_bytes(size, 'little')[1:]
+        else:
+            name = f"f{n}{rng.choice(_TEXT_EXTENSIONS)}"
+            kind = "text"
+            data = _text(rng, size).encode('utf-8')
+        with open(os.path.join(root_dir, directory, name), 'wb') as f:
+            f.write(data)
+        counts[kind] += 1
+        counts["bytes"] += len(data)
+    return counts
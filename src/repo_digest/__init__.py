@@ -1,5 +1,17 @@
 __all__ = [
     "export_repo_as_text",
+    "IgnoreMatcher",
+    "RunMetrics",
+    "scan_repo",
+    "FileRecord",
+    "ScanSummary",
+    "DigestContainer",
+    "register_tokenizer",
 ]
 
+from .container import DigestContainer
 from .core import export_repo_as_text
+from .ignore import IgnoreMatcher
+from .metrics import RunMetrics
+from .scan import FileRecord, ScanSummary, scan_repo
+from .tokenizers import register_tokenizer
@@ -0,0 +1,180 @@
+import io
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional
+
+from .core import export_repo_as_text
+from .metrics import RunMetrics
+from .reader import resolve_jobs
+from .scan import select_encoder
+
+# export_repo_as_text options a batch file may set per repository
+BATCH_OPTIONS = (
+    'allow_secrets', 'respect_gitignore', 'max_bytes', 'preview', 'stream', 'cache', 'cache_dir',
+    'source', 'max_tokens', 'tokenizer', 'sniff_binary', 'max_file_bytes', 'max_file_tokens',
+    'oversize', 'scan_secrets', 'follow_symlinks', 'max_dir_depth', 'max_dir_entries', 'dedup', 'output_format', 'compress',
+)
+
+# Worst outcome first: the batch exits with the first of these that any repository hit
+_EXIT_PRECEDENCE = (2, 3, 1)
+
+
+class BatchJob:
+    """One repository to digest: where it is, where its output goes and its own export options."""
+
+    __slots__ = ('repo', 'output', 'options')
+
+    def __init__(self, repo: str, output: str, options: Optional[Dict[str, Any]] = None) -> None:
+        self.repo = repo
+        self.output = output
+        self.options = dict(options or {})
+
+    def __repr__(self) -> str:
+        return f"BatchJob({self.repo!r}, {self.output!r})"
+
+
+def _default_output(repo: str, output_dir: str, taken: Dict[str, int], extension: str) -> str:
+    name = os.path.basename(os.path.normpath(repo)) or 'repo'
+    count = taken.get(name, 0)
+    taken[name] = count + 1
+    return os.path.join(output_dir, f"{name}{'-' + str(count + 1) if count else ''}{extension}")
+
+
+def load_batch(path: str, output_dir: str = '.', extension: str = '.txt') -> List[BatchJob]:
+    """
+    Read a batch file. A .json file holds a list of objects (or
+    {"repos": [...]}) with "repo", optionally "output", and any of
+    BATCH_OPTIONS; any other file has one repository per line, optionally
+    followed by its output path, with blank lines and # comments skipped.
+
+    Relative paths are taken relative to the batch file. Repositories
+    without an output are written to output_dir as <name><extension>,
+    numbered when two repositories share a name.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+            entries = data.get("repos", []) if isinstance(data, dict) else data
+        else:
+            entries = []
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    parts = line.split(None, 1)
+                    entries.append({"repo": parts[0], **({"output": parts[1].strip()} if len(parts) > 1 else {})})
+    jobs: List[BatchJob] = []
+    taken: Dict[str, int] = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or "repo" not in entry:
+            raise ValueError(f"{path}: every entry needs a repo: {entry!r}")
+        unknown = set(entry) - {"repo", "output"} - set(BATCH_OPTIONS)
+        if unknown:
+            raise ValueError(f"{path}: unknown options for {entry['repo']}: {', '.join(sorted(unknown))}")
+        repo = os.path.join(base, entry["repo"])
+        output = os.path.join(base, entry["output"]) if "output" in entry else _default_output(repo, output_dir, taken, extension)
+        jobs.append(BatchJob(os.path.normpath(repo), output, {k: v for k, v in entry.items() if k in BATCH_OPTIONS}))
+    return jobs
+
+
+def _init_batch_worker(tokenizer: Optional[str] = None) -> None:
+    # the tokenizer registry keeps loaded encoders, so every export in this worker reuses this one
+    try:
+        select_encoder(tokenizer)
+    except ValueError:
+        pass  # reported by the exports that use it
+
+
+def _run_job(repo: str, output: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Digest one repository with its progress output captured; never raises."""
+    totals: Dict[str, Any] = {}
+
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        if event == "totals":
+            totals.update(data)
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"repo": repo, "output": output}
+    try:
+        if not os.path.isdir(repo):
+            raise NotADirectoryError(f"not a directory: {repo}")
+        with redirect_stdout(log):
+            code = export_repo_as_text(repo, output, jobs=1, metrics=RunMetrics(slowest=0, hooks=[on_event]), **options)
+    except Exception as e:
+        code = 1
+        result["error"] = f"{type(e).__name__}: {e}"
+    result.update(exit_code=code, wall=time.perf_counter() - start, log=log.getvalue(), **totals)
+    return result
+
+
+def run_batch(jobs: List[BatchJob], *, workers: int = 0, options: Optional[Dict[str, Any]] = None, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Digest every job on a pool of workers processes (0 = one per CPU),
+    each loading the encoder once; one repository runs in one worker, so
+    the pool spreads repositories, not files, over the cores. options apply
+    to every job, under the job's own. Returns one result per job, in job
+    order: repo, output, exit_code (0/2/3 as for a single export, 1 for an
+    error, with error set), wall seconds, the captured log and, when the
+    export got that far, tokenizer, files, tokens and bytes. progress is
+    called with each result as it finishes.
+    """
+    options = options or {}
+    workers = min(resolve_jobs(workers), max(1, len(jobs)))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    tasks = [(job.repo, job.output, {**options, **job.options}) for job in jobs]
+    if workers <= 1:
+        _init_batch_worker(options.get('tokenizer'))
+        for i, task in enumerate(tasks):
+            results[i] = _run_job(*task)
+            if progress is not None:
+                progress(results[i])
+        return results
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(options.get('tokenizer'),)) as pool:
+        futures = {pool.submit(_run_job, *task): i for i, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if progress is not None:
+                progress(results[i])
+    return results
+
+
+def batch_exit_code(results: List[Dict[str, Any]]) -> int:
+    """2 if any repository was blocked for secrets, else 3 if any hit a limit, else 1 if any failed, else 0."""
+    codes = {r["exit_code"] for r in results}
+    for code in _EXIT_PRECEDENCE:
+        if code in codes:
+            return code
+    return 0
+
+
+_STATUS = {0: "ok", 1: "error", 2: "blocked", 3: "limit"}
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    status = _STATUS.get(result["exit_code"], str(result["exit_code"]))
+    line = f"[{status}] {result['repo']} ({result['wall']:.2f}s)"
+    if "tokens" in result:
+        line += f": {result['files']} files, {result['tokens']} tokens, {result['bytes']} bytes"
+    if "error" in result:
+        line += f": {result['error']}"
+    return line
+
+
+def format_report(results: List[Dict[str, Any]], wall: float) -> str:
+    counts = {status: 0 for status in _STATUS.values()}
+    for r in results:
+        counts[_STATUS.get(r["exit_code"], "error")] += 1
+    lines = ["===== BATCH SUMMARY =====", f"Repositories: {len(results)} ({', '.join(f'{n} {s}' for s, n in counts.items() if n)})"]
+    lines.append(f"Total files: {sum(r.get('files', 0) for r in results)}")
+    lines.append(f"Total tokens: {sum(r.get('tokens', 0) for r in results)}")
+    lines.append(f"Total bytes: {sum(r.get('bytes', 0) for r in results)}")
+    lines.append(f"Wall time: {wall:.2f}s (sum of repositories: {sum(r['wall'] for r in results):.2f}s)")
+    for r in results:
+        if r["exit_code"] != 0:
+            lines.append(format_result(r))
+    return "\n".join(lines)
@@ -0,0 +1,176 @@
+import os
+import re
+import bisect
+import fnmatch
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class BudgetPolicy:
+    """
+    How files compete for a token budget.
+
+    Each file gets a weight: the weight of its extension (ext_weights, e.g.
+    {'.py': 2.0}) times the weight of the first matching path glob
+    (path_weights, e.g. [('tests/*', 0.5)]). Unlisted files weigh 1.0 and a
+    weight of 0 excludes a file outright.
+
+    Files are taken by weight, heaviest first. Within a weight class the
+    default is a knapsack-style fill: a subset-sum over the largest files
+    (exact for budgets up to a few thousand tokens, bucketed above that),
+    a largest-first and a smallest-first fill are tried, each back-filling
+    the budget with the next files that still fit; the fill that uses the
+    most of the budget is kept, and a repair pass then swaps a selected
+    file for a larger dropped one wherever the budget allows. With smallest_first the class is filled
+    smallest first only, maximizing the number of files kept.
+    """
+
+    def __init__(
+        self,
+        ext_weights: Optional[Dict[str, float]] = None,
+        path_weights: Optional[Sequence[Tuple[str, float]]] = None,
+        smallest_first: bool = False,
+    ) -> None:
+        self.ext_weights = {k.lower(): float(v) for k, v in (ext_weights or {}).items()}
+        self.path_weights = [(re.compile(fnmatch.translate(g.replace(os.sep, '/'))), float(w)) for g, w in (path_weights or [])]
+        self.smallest_first = smallest_first
+
+    @property
+    def uniform(self) -> bool:
+        return not self.ext_weights and not self.path_weights
+
+    def weight(self, rel_path: str) -> float:
+        weight = 1.0
+        if self.ext_weights:
+            # cheaper equivalent of os.path.splitext for the hot loop
+            slash = max(rel_path.rfind('/'), rel_path.rfind(os.sep))
+            dot = rel_path.rfind('.')
+            ext = rel_path[dot:].lower() if dot > slash + 1 else "<no-ext>"
+            weight = self.ext_weights.get(ext, 1.0)
+        if self.path_weights:
+            posix = rel_path.replace(os.sep, '/')
+            for rx, w in self.path_weights:
+                if rx.match(posix):
+                    weight *= w
+                    break
+        return weight
+
+
+# The subset-sum pass looks at this many of the largest files of a class,
+# with token counts rounded up to this many buckets of the budget
+_DP_FILES = 2048
+_DP_BUCKETS = 4096
+
+
+def parse_weight(spec: str) -> Tuple[str, float]:
+    """Parse a 'KEY=WEIGHT' command-line spec."""
+    key, sep, value = spec.rpartition('=')
+    if not sep or not key:
+        raise ValueError(f"expected KEY=WEIGHT, got {spec!r}")
+    return key, float(value)
+
+
+def select_within_budget(file_infos: List[Dict[str, Any]], max_tokens: int, policy: Optional[BudgetPolicy] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split file_infos into (selected, dropped) so that the selected files'
+    tokens sum to at most max_tokens. Both lists keep the input order.
+    """
+    policy = policy or BudgetPolicy()
+    tokens = [info["tokens"] for info in file_infos]
+    if policy.uniform:
+        classes = [list(range(len(file_infos)))]
+    else:
+        by_weight: Dict[float, List[int]] = defaultdict(list)
+        for i, info in enumerate(file_infos):
+            weight = policy.weight(info["path"])
+            if weight > 0:
+                by_weight[weight].append(i)
+        classes = [by_weight[w] for w in sorted(by_weight, reverse=True)]
+
+    chosen = bytearray(len(file_infos))
+    remaining = max_tokens
+    for members in classes:
+        if not remaining:
+            break
+        # stable sorts; ties keep the input order
+        ascending = sorted(members, key=tokens.__getitem__)
+        picked, left = _fill(ascending, tokens, remaining)
+        if not policy.smallest_first:
+            descending = sorted(members, key=lambda i: -tokens[i])
+            for fill in (_subset_sum_fill, _fill):
+                candidate, candidate_left = fill(descending, tokens, remaining)
+                if candidate_left <= left:
+                    picked, left = candidate, candidate_left
+            left = _swap_up(picked, ascending, tokens, left)
+        for i in picked:
+            chosen[i] = 1
+        remaining = left
+
+    selected = [info for i, info in enumerate(file_infos) if chosen[i]]
+    dropped = [info for i, info in enumerate(file_infos) if not chosen[i]]
+    return selected, dropped
+
+
+def _fill(order: List[int], tokens: List[int], remaining: int) -> Tuple[List[int], int]:
+    """Take files in order while they fit; return (picked, budget left)."""
+    picked = []
+    for i in order:
+        if tokens[i] <= remaining:
+            picked.append(i)
+            remaining -= tokens[i]
+            if not remaining:
+                break
+    return picked, remaining
+
+
+def _subset_sum_fill(descending: List[int], tokens: List[int], remaining: int) -> Tuple[List[int], int]:
+    """
+    Pick the subset of the largest files that fills the budget best, by a
+    bitset subset-sum over bucketed token counts (rounded up, so the pick
+    always fits), then back-fill with the rest largest first.
+    """
+    head = descending[:_DP_FILES]
+    scale = -(-remaining // _DP_BUCKETS) or 1
+    cap = remaining // scale
+    mask = (1 << (cap + 1)) - 1
+    weights = [-(-tokens[i] // scale) for i in head]
+    # reach[k]: bucket sums reachable with the first k files
+    reach = [1]
+    for w in weights:
+        reach.append((reach[-1] | (reach[-1] << w)) & mask)
+    total = reach[-1].bit_length() - 1
+    picked = []
+    for k in range(len(head), 0, -1):
+        if not (reach[k - 1] >> total) & 1:
+            picked.append(head[k - 1])
+            total -= weights[k - 1]
+    picked.reverse()
+    left = remaining - sum(tokens[i] for i in picked)
+    rest, left = _fill(descending[len(head):], tokens, left) if left else ([], left)
+    return picked + rest, left
+
+
+def _swap_up(picked: List[int], ascending: List[int], tokens: List[int], remaining: int) -> int:
+    """
+    Replace picked files, smallest first, with the largest dropped file of
+    the class that still fits in their place plus the budget left. Edits
+    picked in place and returns the budget left.
+    """
+    if not remaining:
+        return remaining
+    taken = set(picked)
+    dropped = [i for i in ascending if i not in taken]
+    dropped_tokens = [tokens[i] for i in dropped]
+    for slot, i in sorted(enumerate(picked), key=lambda item: tokens[item[1]]):
+        j = bisect.bisect_right(dropped_tokens, tokens[i] + remaining) - 1
+        if j < 0 or dropped_tokens[j] <= tokens[i]:
+            continue
+        remaining -= dropped_tokens[j] - tokens[i]
+        picked[slot] = dropped.pop(j)
+        del dropped_tokens[j]
+        k = bisect.bisect_right(dropped_tokens, tokens[i])
+        dropped.insert(k, i)
+        dropped_tokens.insert(k, tokens[i])
+        if not remaining:
+            break
+    return remaining
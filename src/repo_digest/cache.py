@@ -0,0 +1,177 @@
+import os
+import time
+import sqlite3
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+CACHE_DIR = '.repo-digest-cache'
+CACHE_DB = 'tokens.sqlite'
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT NOT NULL,
+    tokenizer TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (path, tokenizer)
+);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest, tokenizer);
+CREATE TABLE IF NOT EXISTS binaries (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL
+);
+'''
+
+
+def file_digest(content: str) -> str:
+    return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+class CacheStats:
+    __slots__ = ('hits', 'hash_hits', 'misses', 'evicted')
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.hash_hits + self.misses
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "hash_hits": self.hash_hits, "misses": self.misses, "evicted": self.evicted}
+
+    def __str__(self) -> str:
+        return f"hits={self.hits}, hash_hits={self.hash_hits}, misses={self.misses}, evicted={self.evicted}"
+
+
+class TokenCache:
+    """
+    On-disk token/line counts keyed by (path, size, mtime_ns, inode) and
+    tokenizer, with a content-hash fallback for files whose stat signature
+    changed but whose content did not. Files sniffed as binary are
+    remembered by stat signature as well, independent of the tokenizer.
+
+    Writes are buffered and committed by flush(), so pool workers can open
+    the same database read-only while a pass is running.
+    """
+
+    def __init__(self, cache_dir: str, tokenizer: str, *, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, readonly: bool = False) -> None:
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, CACHE_DB)
+        self.tokenizer = tokenizer
+        self.max_bytes = max_bytes
+        self.readonly = readonly
+        self.stats = CacheStats()
+        self._pending: Dict[str, Tuple] = {}
+        self._pending_digests: Dict[str, Tuple[int, int]] = {}
+        self._pending_binaries: Dict[str, Tuple[str, int, int, int]] = {}
+        self._touched: List[str] = []
+        self._now = int(time.time())
+        if readonly:
+            self._conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    @classmethod
+    def for_root(cls, root_dir: str, tokenizer: str, **kwargs) -> 'TokenCache':
+        return cls(os.path.join(root_dir, CACHE_DIR), tokenizer, **kwargs)
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[Tuple[int, int, str]]:
+        """Return (tokens, lines, digest) when the stat signature matches a stored entry."""
+        row = self._conn.execute(
+            'SELECT size, mtime_ns, inode, tokens, lines, digest FROM entries WHERE path = ? AND tokenizer = ?',
+            (path, self.tokenizer),
+        ).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns and row[2] == st.st_ino:
+            self.stats.hits += 1
+            self._touched.append(path)
+            return row[3], row[4], row[5]
+        return None
+
+    def lookup_binary(self, path: str, st: os.stat_result) -> bool:
+        """Return True when the file was sniffed as binary at this stat signature."""
+        row = self._conn.execute('SELECT size, mtime_ns, inode FROM binaries WHERE path = ?', (path,)).fetchone()
+        return row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns and row[2] == st.st_ino
+
+    def store_binary(self, path: str, size: int, mtime_ns: int, inode: int) -> None:
+        self._pending_binaries[path] = (path, size, mtime_ns, inode)
+
+    def lookup_digest(self, digest: str) -> Optional[Tuple[int, int]]:
+        """Return (tokens, lines) of any stored file with identical content."""
+        pending = self._pending_digests.get(digest)
+        if pending is not None:
+            return pending
+        row = self._conn.execute(
+            'SELECT tokens, lines FROM entries WHERE digest = ? AND tokenizer = ? LIMIT 1',
+            (digest, self.tokenizer),
+        ).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def store(self, path: str, size: int, mtime_ns: int, inode: int, digest: str, tokens: int, lines: int) -> None:
+        self._pending[path] = (path, self.tokenizer, size, mtime_ns, inode, digest, tokens, lines, self._now)
+        self._pending_digests[digest] = (tokens, lines)
+
+    def flush(self) -> None:
+        if self.readonly:
+            return
+        with self._conn:
+            if self._pending:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    list(self._pending.values()),
+                )
+            if self._pending_binaries:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO binaries VALUES (?, ?, ?, ?)',
+                    list(self._pending_binaries.values()),
+                )
+            if self._touched:
+                self._conn.executemany(
+                    'UPDATE entries SET last_used = ? WHERE path = ? AND tokenizer = ?',
+                    [(self._now, p, self.tokenizer) for p in self._touched],
+                )
+        self._pending.clear()
+        self._pending_digests.clear()
+        self._pending_binaries.clear()
+        self._touched.clear()
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the database fits in max_bytes."""
+        if self.readonly or self.max_bytes <= 0:
+            return
+        while os.path.getsize(self.path) > self.max_bytes:
+            total = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            binaries = self._conn.execute('SELECT COUNT(*) FROM binaries').fetchone()[0]
+            if not total and not binaries:
+                break
+            drop = max(1, total // 4) if total else 0
+            with self._conn:
+                self._conn.execute(
+                    'DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY last_used ASC LIMIT ?)',
+                    (drop,),
+                )
+                self._conn.execute(
+                    'DELETE FROM binaries WHERE rowid IN (SELECT rowid FROM binaries LIMIT ?)',
+                    (max(1, binaries // 4),),
+                )
+            self._conn.execute('VACUUM')
+            self.stats.evicted += drop
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
@@ -1,42 +1,321 @@
 import argparse
 import os
 import sys
+from typing import Any, Dict, List, Optional
+from .budget import BudgetPolicy, parse_weight
+from .cache import DEFAULT_CACHE_MAX_BYTES
 from .core import export_repo_as_text
+from .gitindex import GitIndexError
+from .manifest import ManifestError
+from .metrics import RunMetrics
+from .tokenizers import TokenizerError, available_tokenizers
+
+TOKENIZER_HELP = "How to count tokens: cl100k_base (default when tiktoken is installed), o200k_base, words_approx, or estimate (fast per-extension estimate)"
+
+def _check_dir(path: str) -> str:
+    path = os.path.abspath(path)
+    if not os.path.exists(path):
+        print(f"[error] Path does not exist: {path}")
+        sys.exit(1)
+    if not os.path.isdir(path):
+        print(f"[error] Not a directory: {path}")
+        sys.exit(1)
+    return path
+
+def _add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options that decide which files are read and how, shared by every command that exports."""
+    parser.add_argument("--tokenizer", choices=available_tokenizers(), default=None, help=TOKENIZER_HELP)
+    parser.add_argument("--max-file-bytes", type=int, default=None, help="Treat files larger than this many bytes as oversized (checked before reading)")
+    parser.add_argument("--max-file-tokens", type=int, default=None, help="Treat files estimated above this many tokens as oversized (checked before reading)")
+    parser.add_argument("--oversize", choices=["skip", "head", "head-tail"], default="skip", help="What to do with oversized files: skip them (default), keep the head, or keep head and tail")
+    parser.add_argument("--no-binary-sniff", action="store_true", help="Do not detect binary files by content (rely on extensions only)")
+    parser.add_argument("--allow-secrets", action="store_true", help="Allow files that match sensitive patterns (NOT recommended)")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not respect .gitignore (default is to respect it)")
+    parser.add_argument("--follow-symlinks", action="store_true", help="Walk into symlinked directories (loops and files seen twice are still skipped)")
+    parser.add_argument("--max-dir-depth", type=int, default=None, metavar="N", help="Do not walk directories more than N levels below the root")
+    parser.add_argument("--max-dir-entries", type=int, default=None, metavar="N", help="Skip directories with more than N entries")
+
+def _export_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Keyword arguments for the options added by _add_export_arguments."""
+    return dict(
+        allow_secrets=args.allow_secrets,
+        respect_gitignore=(not args.no_gitignore),
+        tokenizer=args.tokenizer,
+        sniff_binary=(not args.no_binary_sniff),
+        max_file_bytes=args.max_file_bytes,
+        max_file_tokens=args.max_file_tokens,
+        oversize=args.oversize,
+        follow_symlinks=args.follow_symlinks,
+        max_dir_depth=args.max_dir_depth,
+        max_dir_entries=args.max_dir_entries,
+    )
+
+def _add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options of one-shot exports, shared by the default command and batch."""
+    parser.add_argument("--preview", action="store_true", help="Preview counts only; do not write output")
+    parser.add_argument("--max-bytes", type=int, default=None, help="Fail if estimated total bytes exceed this limit")
+    parser.add_argument("--max-tokens", type=int, default=None, help="Keep only the highest-priority files that fit this token budget")
+    parser.add_argument("--dedup", action="store_true", help="Write each distinct file body once; later identical files reference the first")
+    parser.add_argument("--format", choices=["text", "container"], default="text", help="Write plain text (default) or a random-access container read with 'repo-digest container'")
+    parser.add_argument("--compress", action="store_true", help="With --format container, zlib-compress each file body")
+    parser.add_argument("--stream", action="store_true", help="Keep only file metadata in memory and stream file bodies into the output")
+    parser.add_argument("--cache", action="store_true", help="Reuse token counts of unchanged files from .repo-digest-cache/")
+    parser.add_argument("--source", choices=["walk", "git-index"], default="walk", help="Enumerate files by walking the tree (default) or from the tracked files in .git/index")
+    parser.add_argument("--scan-secrets", action="store_true", help="Also scan file contents for keys and credentials while reading; findings block the export like sensitive files")
+
+def _output_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """Keyword arguments for the options added by _add_output_arguments."""
+    return dict(
+        preview=args.preview,
+        max_bytes=args.max_bytes,
+        max_tokens=args.max_tokens,
+        dedup=args.dedup,
+        output_format=args.format,
+        compress=args.compress,
+        stream=args.stream,
+        cache=args.cache,
+        source=args.source,
+        scan_secrets=args.scan_secrets,
+    )
+
+def watch_main(argv: List[str]) -> None:
+    from .watch import watch_repo
+
+    parser = argparse.ArgumentParser(
+        prog="repo-digest watch",
+        description="Build the digest once, then rewrite it whenever files in the repository change.",
+    )
+    parser.add_argument("path", nargs="?", default=".", help="Path to repository (default: current directory)")
+    parser.add_argument("-o", "--output", default="repo_export.txt", help="Output file path (default: repo_export.txt)")
+    parser.add_argument("--poll", action="store_true", help="Use stat polling even where inotify is available")
+    parser.add_argument("--interval", type=float, default=0.5, help="Polling interval in seconds (default: 0.5)")
+    _add_export_arguments(parser)
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for the initial scan")
+    args = parser.parse_args(argv)
+
+    path = _check_dir(args.path)
+    code = watch_repo(
+        path,
+        args.output,
+        poll=args.poll,
+        interval=args.interval,
+        jobs=args.jobs,
+        **_export_options(args),
+    )
+    sys.exit(code)
+
+def serve_main(argv: List[str]) -> None:
+    from .serve import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_RESULT_CACHE_BYTES, is_loopback, serve
+
+    parser = argparse.ArgumentParser(
+        prog="repo-digest serve",
+        description="Serve digests over HTTP on localhost, keeping the encoder loaded and caching rendered results.",
+        epilog="Endpoints: /preview, /digest, /tree, /file?path=..., /healthz; each takes repo=<path> plus tokenizer, no_gitignore, no_binary_sniff, max_file_bytes, max_file_tokens and oversize; /tree also takes depth and min_tokens.",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Loopback address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow binding a non-loopback --host and serving other machines, without authentication (NOT recommended)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--allow-root", action="append", default=[], metavar="DIR", help="Only serve repositories inside DIR (repeatable; default: the current directory)")
+    parser.add_argument("--allow-secrets", action="store_true", help="Serve files that match sensitive patterns to every client (NOT recommended)")
+    parser.add_argument("--cache-max-bytes", type=int, default=DEFAULT_RESULT_CACHE_BYTES, help="Memory budget for cached results (default: 256 MiB)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes per scan")
+    parser.add_argument("--quiet", action="store_true", help="Do not log requests")
+    args = parser.parse_args(argv)
+
+    if not is_loopback(args.host) and not args.allow_remote:
+        parser.error(f"--host {args.host} is not a loopback address; the server has no authentication (pass --allow-remote to bind it anyway)")
+    roots = [_check_dir(r) for r in args.allow_root]
+    sys.exit(serve(args.host, args.port, allowed_roots=roots, allow_secrets=args.allow_secrets, allow_remote=args.allow_remote, cache_max_bytes=args.cache_max_bytes, jobs=args.jobs, quiet=args.quiet))
+
+def container_main(argv: List[str]) -> None:
+    from .container import ContainerError, DigestContainer
+
+    parser = argparse.ArgumentParser(
+        prog="repo-digest container",
+        description="List, extract or render files from a digest written with --format container.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    list_parser = sub.add_parser("list", help="List stored files with their stats")
+    list_parser.add_argument("container")
+    extract_parser = sub.add_parser("extract", help="Write stored files back out under a directory")
+    extract_parser.add_argument("container")
+    extract_parser.add_argument("paths", nargs="+", help="Stored paths to extract")
+    extract_parser.add_argument("-d", "--directory", default=".", help="Directory to extract into (default: current directory)")
+    render_parser = sub.add_parser("render", help="Render the plain-text export, or only the FILE sections of some paths")
+    render_parser.add_argument("container")
+    render_parser.add_argument("paths", nargs="*", help="Only render these stored paths")
+    render_parser.add_argument("-o", "--output", default=None, help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        with DigestContainer(args.container) as container:
+            if args.command == "list":
+                for entry in container.files:
+                    note = f"  (duplicate of {entry['duplicate_of']})" if "duplicate_of" in entry else ""
+                    print(f"{entry['path']} : {entry['tokens']} tokens, {entry['lines']} lines, {entry['bytes']} bytes{note}")
+            elif args.command == "extract":
+                root = os.path.abspath(args.directory)
+                for path in args.paths:
+                    target = os.path.abspath(os.path.join(root, path))
+                    if os.path.commonpath([root, target]) != root:
+                        print(f"[error] Refusing to extract outside {root}: {path}")
+                        sys.exit(1)
+                    text = container.read(path)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, 'w', encoding='utf-8', newline='') as f:
+                        f.write(text)
+                    print(f"[extract] {path}")
+            elif args.output is None:
+                container.render(sys.stdout, args.paths or None)
+            else:
+                with open(args.output, 'w', encoding='utf-8') as out:
+                    container.render(out, args.paths or None)
+    except KeyError as e:
+        print(f"[error] Not in container: {e.args[0]}")
+        sys.exit(1)
+    except (OSError, ContainerError) as e:
+        print(f"[error] {e}")
+        sys.exit(1)
+
+def batch_main(argv: List[str]) -> None:
+    import json
+    import time
+    from .batch import batch_exit_code, format_report, format_result, load_batch, run_batch
+
+    parser = argparse.ArgumentParser(
+        prog="repo-digest batch",
+        description="Digest many repositories concurrently on one worker pool.",
+        epilog=(
+            "The batch file lists one repository per line, optionally followed by its output path, "
+            "or is a .json list of {\"repo\": ..., \"output\": ..., <export options>} objects. "
+            "Exit code: 2 if any repository was blocked for secrets, else 3 if any hit a limit, else 1 if any failed."
+        ),
+    )
+    parser.add_argument("batch_file", help="File listing the repositories to digest")
+    parser.add_argument("--output-dir", default=".", help="Where to write outputs that the batch file does not name (default: current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Repositories digested in parallel (default: 0 = one per CPU)")
+    parser.add_argument("--report", default=None, metavar="PATH", help="Write per-repository results as JSON to PATH")
+    _add_output_arguments(parser)
+    _add_export_arguments(parser)
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_batch(args.batch_file, args.output_dir, extension=".rdc" if args.format == "container" else ".txt")
+    except (OSError, ValueError) as e:
+        print(f"[error] {e}")
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = dict(_output_options(args), **_export_options(args))
+    start = time.perf_counter()
+    results = run_batch(jobs, workers=args.jobs, options=options, progress=None if args.quiet else (lambda r: print(format_result(r))))
+    wall = time.perf_counter() - start
+    print(format_report(results, wall))
+    if args.report is not None:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"wall": wall, "exit_code": batch_exit_code(results), "repos": results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+    sys.exit(batch_exit_code(results))
+
+# Subcommands; anything else is the path of a one-shot export
+SUBCOMMANDS = {
+    "watch": watch_main,
+    "serve": serve_main,
+    "container": container_main,
+    "batch": batch_main,
+}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBCOMMANDS:
+        SUBCOMMANDS[argv[0]](argv[1:])
+        return
 
-def main() -> None:
     parser = argparse.ArgumentParser(
         prog="repo-digest",
         description="Turn any repository into an AI-ready text bundle with safe defaults and rich analytics.",
         epilog=(
             "Safety: By default, files matching sensitive patterns (e.g., .env, *secret*, *.key) are blocked. "
-            "Use --allow-secrets only if you understand the risk."
+            "--scan-secrets also checks file contents for keys and credentials. "
+            "Use --allow-secrets only if you understand the risk. "
+            "Subcommands: 'repo-digest watch' keeps the output up to date as files change; "
+            "'repo-digest serve' answers digest requests over HTTP on localhost; "
+            "'repo-digest container' reads digests written with --format container; "
+            "'repo-digest batch' digests many repositories on one worker pool."
         ),
     )
     parser.add_argument("path", nargs="?", default=".", help="Path to repository (default: current directory)")
     parser.add_argument("-o", "--output", default="repo_export.txt", help="Output file path (default: repo_export.txt)")
-    parser.add_argument("--preview", action="store_true", help="Preview counts only; do not write output")
-    parser.add_argument("--max-bytes", type=int, default=None, help="Fail if estimated total bytes exceed this limit")
-    parser.add_argument("--allow-secrets", action="store_true", help="Allow files that match sensitive patterns (NOT recommended)")
-    parser.add_argument("--no-gitignore", action="store_true", help="Do not respect .gitignore (default is to respect it)")
+    _add_output_arguments(parser)
+    _add_export_arguments(parser)
+    parser.add_argument("--ext-weight", action="append", default=[], metavar="EXT=WEIGHT", help="Budget priority for an extension, e.g. .py=2 (repeatable)")
+    parser.add_argument("--priority", action="append", default=[], metavar="GLOB=WEIGHT", help="Budget priority for paths matching a glob, e.g. 'tests/*=0.5' (repeatable, first match wins)")
+    parser.add_argument("--smallest-first", action="store_true", help="Fill the token budget with the smallest files first")
+    parser.add_argument("--shard-tokens", type=int, default=None, help="Split the output into part files of at most this many tokens each")
+    parser.add_argument("--shard-bytes", type=int, default=None, help="Split the output into part files of at most this many bytes each")
+    parser.add_argument("--calibrate", action="store_true", help="Fit the estimator against cl100k_base on a sample of this repository (needs tiktoken)")
+    parser.add_argument("--exact-selected", action="store_true", help="With the estimator, re-count the finally selected files exactly (needs tiktoken)")
+    parser.add_argument("--tree-depth", type=int, default=None, metavar="N", help="Show only N levels of the directory tree")
+    parser.add_argument("--tree-min-tokens", type=int, default=None, metavar="N", help="Fold sibling directories under N tokens into one tree line")
+    parser.add_argument("--file-stats", default=None, metavar="PATH", help="Write per-file statistics and analytics to PATH (CSV rows if it ends in .csv, else JSON)")
+    parser.add_argument("--manifest", default=None, help="Write a JSON manifest of per-file sizes, digests and token counts")
+    parser.add_argument("--since-manifest", default=None, help="Write a delta export with only files changed since this manifest")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the token cache (implies --cache)")
+    parser.add_argument("--cache-max-bytes", type=int, default=DEFAULT_CACHE_MAX_BYTES, help="Evict least recently used cache entries above this size")
+    parser.add_argument("--stats", action="store_true", help="Print wall/CPU time per phase, throughput, slowest files and peak memory")
+    parser.add_argument("--metrics-json", default=None, metavar="PATH", help="Write the run metrics as JSON to PATH")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for reading and tokenizing (default: 1, 0 = one per CPU)")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    path = os.path.abspath(args.path)
-    if not os.path.exists(path):
-        print(f"[error] Path does not exist: {path}")
-        sys.exit(1)
-    if not os.path.isdir(path):
-        print(f"[error] Not a directory: {path}")
+    if args.format == "container" and (args.shard_tokens is not None or args.shard_bytes is not None):
+        parser.error("--format container cannot be combined with --shard-tokens/--shard-bytes")
+    if (args.calibrate or args.exact_selected) and args.tokenizer != "estimate":
+        parser.error("--calibrate and --exact-selected need --tokenizer estimate")
+
+    path = _check_dir(args.path)
+
+    try:
+        policy = BudgetPolicy(
+            ext_weights=dict(parse_weight(spec) for spec in args.ext_weight),
+            path_weights=[parse_weight(spec) for spec in args.priority],
+            smallest_first=args.smallest_first,
+        )
+    except ValueError as e:
+        print(f"[error] {e}")
         sys.exit(1)
 
-    code = export_repo_as_text(
-        path,
-        args.output,
-        allow_secrets=args.allow_secrets,
-        respect_gitignore=(not args.no_gitignore),
-        max_bytes=args.max_bytes,
-        preview=args.preview,
-    )
+    metrics = RunMetrics() if args.stats or args.metrics_json else None
+
+    try:
+        code = export_repo_as_text(
+            path,
+            args.output,
+            jobs=args.jobs,
+            cache_dir=args.cache_dir,
+            cache_max_bytes=args.cache_max_bytes,
+            manifest_file=args.manifest,
+            previous_manifest=args.since_manifest,
+            budget_policy=policy,
+            shard_tokens=args.shard_tokens,
+            shard_bytes=args.shard_bytes,
+            calibrate=args.calibrate,
+            exact_selected=args.exact_selected,
+            tree_depth=args.tree_depth,
+            tree_min_tokens=args.tree_min_tokens,
+            file_stats=args.file_stats,
+            metrics=metrics,
+            **_output_options(args),
+            **_export_options(args),
+        )
+    except (GitIndexError, ManifestError, TokenizerError) as e:
+        print(f"[error] {e}")
+        sys.exit(1)
+    if metrics is not None:
+        if args.stats:
+            print(metrics.format())
+        if args.metrics_json:
+            metrics.save(args.metrics_json)
     sys.exit(code)
 
 if __name__ == "__main__":
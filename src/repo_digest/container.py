@@ -0,0 +1,209 @@
+import os
+import json
+import zlib
+import struct
+from datetime import datetime
+from io import StringIO
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .fileio import file_text, write_file_section
+
+CONTAINER_MAGIC = b'RDIGEST\x00'
+CONTAINER_VERSION = 1
+# magic, version, flags, TOC offset, TOC length
+_HEADER = struct.Struct('<8sHHQQ')
+FLAG_COMPRESSED = 1
+
+# Per-file fields stored in the table of contents
+TOC_FIELDS = ('tokens', 'lines', 'bytes', 'digest', 'truncated', 'omitted_bytes')
+
+
+class ContainerError(Exception):
+    pass
+
+
+class ContainerWriter:
+    """
+    Writes a digest container: a fixed header, then one blob per file body
+    (plus the summary text that goes before and after the FILES section),
+    then a JSON table of contents with each blob's offset and length and
+    the file's stats. With compress every blob and the TOC are zlib
+    streams. The header is patched with the TOC's position on close.
+    """
+
+    def __init__(self, path: str, *, compress: bool = False, level: int = 6) -> None:
+        self.path = path
+        self.compress = compress
+        self.level = level
+        self.files: List[Dict[str, Any]] = []
+        self.blobs: Dict[str, Dict[str, int]] = {}
+        self._f = open(path, 'wb')
+        self._f.write(_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, 0, 0, 0))
+
+    def _blob(self, text: str) -> Dict[str, int]:
+        data = text.encode('utf-8', 'surrogateescape')
+        if self.compress:
+            data = zlib.compress(data, self.level)
+        offset = self._f.tell()
+        self._f.write(data)
+        return {"offset": offset, "length": len(data)}
+
+    def add_text(self, name: str, text: str) -> None:
+        """Store a named text blob ('head' and 'tail' make up the plain-text summaries)."""
+        self.blobs[name] = self._blob(text)
+
+    def add_file(self, info: Dict[str, Any], text: Optional[str], duplicate_of: Optional[str] = None) -> None:
+        """Store one file; a duplicate stores no body and points at the file that has it."""
+        entry: Dict[str, Any] = {"path": info["path"].replace(os.sep, '/')}
+        entry.update((k, info[k]) for k in TOC_FIELDS if info.get(k) is not None)
+        if duplicate_of is not None:
+            entry["duplicate_of"] = duplicate_of.replace(os.sep, '/')
+        else:
+            entry.update(self._blob(text))
+        self.files.append(entry)
+
+    def close(self, **meta: Any) -> None:
+        toc = {"version": CONTAINER_VERSION, "generated": datetime.now().isoformat(), **meta, "blobs": self.blobs, "files": self.files}
+        data = json.dumps(toc, separators=(',', ':')).encode('utf-8')
+        if self.compress:
+            data = zlib.compress(data, self.level)
+        offset = self._f.tell()
+        self._f.write(data)
+        self._f.seek(0)
+        self._f.write(_HEADER.pack(CONTAINER_MAGIC, CONTAINER_VERSION, FLAG_COMPRESSED if self.compress else 0, offset, len(data)))
+        self._f.close()
+
+    def abort(self) -> None:
+        self._f.close()
+        os.remove(self.path)
+
+
+def write_container(output_file: str, root_dir: str, file_infos: Iterable[Dict[str, Any]], head: str, tail: str, *, duplicates: Optional[Dict[str, str]] = None, compress: bool = False, **meta: Any) -> None:
+    """
+    Write file_infos (in order) into a container at output_file, reading
+    each body only while it is written. head and tail are the text that
+    goes before and after the FILES section of the plain-text export.
+    """
+    duplicates = duplicates or {}
+    writer = ContainerWriter(output_file, compress=compress)
+    try:
+        writer.add_text("head", head)
+        for info in file_infos:
+            duplicate_of = duplicates.get(info["path"])
+            writer.add_file(info, None if duplicate_of is not None else file_text(root_dir, info), duplicate_of)
+        writer.add_text("tail", tail)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close(**meta)
+
+
+def is_container(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(CONTAINER_MAGIC)) == CONTAINER_MAGIC
+    except OSError:
+        return False
+
+
+class DigestContainer:
+    """
+    Random-access reader for a digest container. Opening reads only the
+    header and the table of contents; read(path) seeks to that one file's
+    blob, so listing or extracting a few files costs the same however large
+    the container is. render() rebuilds the plain-text export, or just the
+    FILE sections of the given paths.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._f = open(path, 'rb')
+        try:
+            header = self._f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ContainerError(f"not a digest container: {path}")
+            magic, version, flags, toc_offset, toc_length = _HEADER.unpack(header)
+            if magic != CONTAINER_MAGIC:
+                raise ContainerError(f"not a digest container: {path}")
+            if version != CONTAINER_VERSION:
+                raise ContainerError(f"unsupported container version {version}: {path}")
+            if toc_offset == 0:
+                raise ContainerError(f"incomplete container (no table of contents): {path}")
+            self.compressed = bool(flags & FLAG_COMPRESSED)
+            try:
+                self.toc = json.loads(self._read(toc_offset, toc_length).decode('utf-8'))
+            except (ValueError, zlib.error) as e:
+                raise ContainerError(f"corrupt table of contents in {path}: {e}") from e
+        except BaseException:
+            self._f.close()
+            raise
+        self.files: List[Dict[str, Any]] = self.toc["files"]
+        self._by_path = {entry["path"]: entry for entry in self.files}
+
+    def __enter__(self) -> 'DigestContainer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def _read(self, offset: int, length: int) -> bytes:
+        self._f.seek(offset)
+        data = self._f.read(length)
+        if len(data) != length:
+            raise ContainerError(f"truncated container: {self.path}")
+        return zlib.decompress(data) if self.compressed else data
+
+    def _text(self, blob: Dict[str, int]) -> str:
+        return self._read(blob["offset"], blob["length"]).decode('utf-8', 'surrogateescape')
+
+    def __contains__(self, path: str) -> bool:
+        return path.replace(os.sep, '/') in self._by_path
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def entry(self, path: str) -> Dict[str, Any]:
+        try:
+            return self._by_path[path.replace(os.sep, '/')]
+        except KeyError:
+            raise KeyError(path) from None
+
+    def read(self, path: str) -> str:
+        """Return one file's body (a duplicate returns the body it refers to)."""
+        entry = self.entry(path)
+        if "duplicate_of" in entry:
+            entry = self.entry(entry["duplicate_of"])
+        return self._text(entry)
+
+    @property
+    def head(self) -> str:
+        return self._text(self.toc["blobs"]["head"])
+
+    @property
+    def tail(self) -> str:
+        return self._text(self.toc["blobs"]["tail"])
+
+    def iter_sections(self, paths: Optional[Iterable[str]] = None) -> Iterator[str]:
+        """Yield the plain-text FILE section of each path (all files, in stored order, by default)."""
+        entries = self.files if paths is None else [self.entry(p) for p in paths]
+        for entry in entries:
+            buf = StringIO()
+            info = {"path": entry["path"].replace('/', os.sep), **{k: entry[k] for k in TOC_FIELDS if k in entry}}
+            duplicate_of = entry.get("duplicate_of")
+            if duplicate_of is None:
+                info["content"] = self._text(entry)
+            write_file_section(buf, '', info, duplicate_of)
+            yield buf.getvalue()
+
+    def render(self, out, paths: Optional[Iterable[str]] = None) -> None:
+        """Write the plain-text export, or only the FILE sections of paths."""
+        if paths is None:
+            out.write(self.head)
+            out.write('\n===== FILES =====\n')
+        for section in self.iter_sections(paths):
+            out.write(section)
+        if paths is None:
+            out.write(self.tail)
@@ -1,212 +1,168 @@
+import io
 import os
-import fnmatch
-from collections import defaultdict, Counter
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 from typing import Iterable, Dict, Any, List, Tuple, Optional
 
-try:
-    import tiktoken  # type: ignore
-except ImportError:  # pragma: no cover - optional dependency
-    tiktoken = None
+from .budget import BudgetPolicy, select_within_budget
+from .cache import DEFAULT_CACHE_MAX_BYTES
+from .container import write_container
+from .estimate import TokenEstimator
+from .fileio import OVERSIZE_MODES, count_tokens, load_encoder, write_file_section
+from .ignore import EXCLUDE_EXTENSIONS, EXCLUDES, GITIGNORE, SENSITIVE_PATTERNS, IgnoreMatcher, read_gitignore_lines
+from .manifest import Manifest, diff_manifest
+from .metrics import RunMetrics
+from .reader import read_files
+from .scan import FileRecord, ScanSummary, scan_repo
+from .shards import plan_shards, shard_index_path, write_shards
+from .stats import FileStats
+from .tree import DirTree
+from .walk import iter_files
 
-# Comprehensive list of directories and files to exclude
-EXCLUDES = [
-    # Version control
-    '.git', '.svn', '.hg', '.bzr',
-    
-    # OS generated files
-    '.DS_Store', 'Thumbs.db', 'desktop.ini',
-    
-    # Python
-    '__pycache__', '*.pyc', '*.pyo', '*.pyd', '.Python',
-    'pip-log.txt', 'pip-delete-this-directory.txt',
-    '.venv', 'venv', 'ENV', 'env',
-    '.pytest_cache', '.mypy_cache', '.tox',
-    'htmlcov', '.coverage', '.coverage.*',
-    '*.egg-info', 'dist', 'build', 'wheels',
-    '.eggs', '*.egg',
-    
-    # Node.js / JavaScript
-    'node_modules', 'npm-debug.log*', 'yarn-debug.log*', 'yarn-error.log*',
-    '.npm', '.yarn', '.pnp', '.pnp.js',
-    'bower_components', 'jspm_packages',
-    
-    # IDE and editors
-    '.idea', '.vscode', '*.swp', '*.swo', '*~',
-    '.project', '.classpath', '.settings',
-    '*.sublime-project', '*.sublime-workspace',
-    
-    # Build outputs
-    'target', 'out', 'bin', 'obj',
-    '*.class', '*.jar', '*.war', '*.ear',
-    '*.dll', '*.exe', '*.o', '*.so', '*.dylib',
-    
-    # Logs and databases
-    '*.log', '*.sql', '*.sqlite', '*.db',
-    'logs', 'log',
-    
-    # Temporary files
-    '*.tmp', '*.temp', '*.bak', '*.backup', '*.cache',
-    '.cache', 'tmp', 'temp',
-    
-    # Security sensitive files
-    '*.key', '*.pem', '*.p12', '*.pfx',
-    'secrets', 'credentials',
-    
-    # Documentation builds
-    '_build', 'site', 'docs/_build',
-    
-    # Package manager locks (usually not needed for understanding code)
-    'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml',
-    'Pipfile.lock', 'poetry.lock', 'composer.lock',
-    
-    # Other
-    '.sass-cache', '.next', '.nuxt', '.turbo',
-    '.docusaurus', '.cache-loader',
-    'vendor', 'vendors',
+# count_tokens, iter_files and the rule lists moved to lower-level modules
+# and are re-exported here under their old names
+__all__ = [
+    'EXCLUDES', 'EXCLUDE_EXTENSIONS', 'SENSITIVE_PATTERNS', 'GITIGNORE',
+    'load_gitignore', 'is_ignored', 'count_tokens', 'iter_files',
+    'summarize_infos', 'find_duplicates', 'build_dir_aggregates', 'print_dir_tree', 'report_blocked',
+    'write_extension_summary', 'write_dir_tree', 'write_file_tables', 'write_skipped_sections',
+    'OUTPUT_FORMATS', 'export_repo_as_text',
 ]
 
-# File extensions to exclude
-EXCLUDE_EXTENSIONS = [
-    # Binary files
-    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg',
-    '.mp3', '.mp4', '.avi', '.mov', '.wmv', '.flv',
-    '.zip', '.tar', '.gz', '.rar', '.7z',
-    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
-    
-    # Compiled files
-    '.pyc', '.pyo', '.class', '.o', '.so', '.dll', '.exe',
-    
-    # Lock files
-    '.lock',
-    
-    # Large data files
-    '.csv', '.tsv', '.parquet', '.feather', '.h5', '.hdf5',
-    
-    # Font files
-    '.ttf', '.otf', '.woff', '.woff2', '.eot',
-    
-    # Map files
-    '.map', '.min.js.map', '.css.map',
-]
+def load_gitignore(root_dir: str) -> List[str]:
+    return read_gitignore_lines(os.path.join(root_dir, GITIGNORE))
 
-# Patterns for files that might contain sensitive information
-SENSITIVE_PATTERNS = [
-    '*secret*', '*password*', '*token*', '*key*',
-    '*.pem', '*.key', '*.cert', '*.crt',
-    '.env*', '*.env',
-]
+@lru_cache(maxsize=32)
+def _matcher_for_patterns(patterns: Tuple[str, ...]) -> IgnoreMatcher:
+    return IgnoreMatcher('.', patterns)
 
-GITIGNORE = '.gitignore'
+def is_ignored(path: str, patterns: Iterable[str], check_sensitive: bool = True) -> bool:
+    return _matcher_for_patterns(tuple(patterns)).is_ignored(path, check_sensitive=check_sensitive)
 
-def load_gitignore(root_dir: str) -> List[str]:
-    patterns: List[str] = []
-    gitignore_path = os.path.join(root_dir, GITIGNORE)
-    if os.path.exists(gitignore_path):
-        with open(gitignore_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    patterns.append(line)
-    return patterns
+def summarize_infos(file_infos: Iterable[Dict[str, Any]]) -> Tuple[int, int, Counter, Counter, Counter]:
+    """Return (total_tokens, total_bytes, by_ext_files, by_ext_tokens, by_ext_bytes)."""
+    total_tokens = 0
+    total_bytes = 0
+    by_ext_files: Counter = Counter()
+    by_ext_tokens: Counter = Counter()
+    by_ext_bytes: Counter = Counter()
+    for info in file_infos:
+        tokens = info["tokens"]
+        size = info["bytes"]
+        total_tokens += tokens
+        total_bytes += size
+        ext = os.path.splitext(info["path"])[1].lower() or "<no-ext>"
+        by_ext_files[ext] += 1
+        by_ext_tokens[ext] += tokens
+        by_ext_bytes[ext] += size
+    return total_tokens, total_bytes, by_ext_files, by_ext_tokens, by_ext_bytes
 
-def is_ignored(path: str, patterns: Iterable[str], check_sensitive: bool = True) -> bool:
-    # Check against gitignore patterns
-    for pat in patterns:
-        if fnmatch.fnmatch(path, pat):
-            return True
-    
-    # Check file extension
-    _, ext = os.path.splitext(path)
-    if ext.lower() in EXCLUDE_EXTENSIONS:
-        return True
-    
-    # Check sensitive patterns (optional)
-    if check_sensitive:
-        for pat in SENSITIVE_PATTERNS:
-            if fnmatch.fnmatch(path.lower(), pat.lower()):
-                return True
-    
-    # Check if any part of the path contains excluded patterns
-    path_parts = path.split(os.sep)
-    for part in path_parts:
-        for exclude in EXCLUDES:
-            if fnmatch.fnmatch(part, exclude):
-                return True
-    
-    return False
-
-def count_tokens(text: str, encoder=None) -> int:
-    if encoder:
-        return len(encoder.encode(text))
-    return len(text.split())
-
-def iter_files(root_dir: str, patterns: Iterable[str]) -> Iterable[str]:
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        # Filter out excluded directories
-        dirnames[:] = [d for d in dirnames if not any(fnmatch.fnmatch(d, exc) for exc in EXCLUDES)]
-        
-        for filename in sorted(filenames):
-            # Skip files matching exclude patterns
-            if any(fnmatch.fnmatch(filename, exc) for exc in EXCLUDES):
-                continue
-            
-            rel_path = os.path.relpath(os.path.join(dirpath, filename), root_dir)
-            
-            # Skip if ignored by any rule (but don't check sensitive patterns here)
-            if is_ignored(rel_path, patterns, check_sensitive=False):
-                continue
-            
-            # Skip minified files
-            if '.min.' in filename or filename.endswith('.min.js') or filename.endswith('.min.css'):
-                continue
-            
-            yield rel_path
+def find_duplicates(file_infos: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Map every file whose content digest was already seen, in path order, to
+    the first file with that content. Infos without a digest (not tracked,
+    or truncated) are never duplicates.
+    """
+    first: Dict[str, str] = {}
+    duplicates: Dict[str, str] = {}
+    for info in sorted(file_infos, key=lambda x: x["path"]):
+        digest = info.get("digest")
+        if digest is None or info.get("truncated"):
+            continue
+        original = first.setdefault(digest, info["path"])
+        if original != info["path"]:
+            duplicates[info["path"]] = original
+    return duplicates
 
 def build_dir_aggregates(file_infos: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, int]], Dict[str, List[str]]]:
-    aggregates: Dict[str, Dict[str, int]] = defaultdict(lambda: {"files": 0, "tokens": 0, "bytes": 0})
-    children_map: Dict[str, set] = defaultdict(set)
-    for info in file_infos:
-        rel_path = info["path"]
-        tokens = int(info["tokens"])  # ensure ints
-        size = int(info["bytes"])
-        # accumulate for this file's directory and all ancestors
-        dir_path = os.path.dirname(rel_path) or "."
-        parts = [] if dir_path == "." else dir_path.split(os.sep)
-        for i in range(len(parts) + 1):
-            d = "." if i == 0 else os.sep.join(parts[:i])
-            # Count file for all ancestor directories including root (represents total files under dir)
-            aggregates[d]["files"] += 1
-            aggregates[d]["tokens"] += tokens
-            aggregates[d]["bytes"] += size
-        # children map
-        if dir_path != ".":
-            parent = os.path.dirname(dir_path) or "."
-            children_map[parent].add(dir_path)
-        else:
-            children_map["."].add(".")  # ensure root exists
-    # ensure sets converted to sorted lists
-    children = {k: sorted(v - {k}) for k, v in children_map.items()}
-    return aggregates, children
-
-def print_dir_tree(out, aggregates: Dict[str, Dict[str, int]], children: Dict[str, List[str]], current: str = ".", prefix: str = "") -> None:
-    # Print current directory line (skip printing for root at first call)
-    if prefix == "":
-        # root header printed separately by caller
-        pass
-    else:
-        data = aggregates.get(current, {"files": 0, "tokens": 0, "bytes": 0})
+    """Per-directory totals and sorted subdirectories, keyed by path ('.' for the root); see DirTree."""
+    tree = DirTree.from_infos(file_infos)
+    return tree.aggregates(), tree.children()
+
+def print_dir_tree(out, aggregates: Dict[str, Dict[str, int]], children: Optional[Dict[str, List[str]]] = None, current: str = ".", prefix: str = "") -> None:
+    """
+    Write the directory lines below current from build_dir_aggregates'
+    results, as DirTree.render does; kept for callers of the old API.
+    children is implied by the aggregates' keys and is not needed.
+    """
+    if current != ".":
+        inner = current + os.sep
+        aggregates = {"." if d == current else d[len(inner):]: v for d, v in aggregates.items() if d == current or d.startswith(inner)}
+    if prefix:
+        data = aggregates.get(".", {"files": 0, "tokens": 0, "bytes": 0})
         out.write(f"{prefix}{os.path.basename(current) or '.'}/ (files: {data['files']}, tokens: {data['tokens']}, bytes: {data['bytes']})\n")
-    # children dirs
-    dirs = sorted([d for d in children.get(current, []) if d != current])
-    for idx, child in enumerate(dirs):
-        is_last = idx == len(dirs) - 1
-        branch = "└── " if is_last else "├── "
-        next_prefix = (prefix.replace("└── ", "    ").replace("├── ", "│   ") if prefix else "") + branch
-        print_dir_tree(out, aggregates, children, child, next_prefix)
+    buf = io.StringIO()
+    DirTree.from_aggregates(aggregates).render(buf)
+    continuation = prefix.replace("└── ", "    ").replace("├── ", "│   ")
+    for line in buf.getvalue().splitlines(True):
+        out.write(continuation + line)
+
+def write_extension_summary(out, by_ext_files: Counter, by_ext_tokens: Counter, by_ext_bytes: Counter) -> None:
+    out.write('\n===== SUMMARY BY EXTENSION =====\n')
+    for ext in sorted(by_ext_files.keys()):
+        out.write(f"{ext}: files={by_ext_files[ext]}, tokens={by_ext_tokens[ext]}, bytes={by_ext_bytes[ext]}\n")
 
+def write_dir_tree(out, tree: DirTree, max_depth: Optional[int] = None, min_tokens: Optional[int] = None) -> None:
+    out.write('\n===== DIRECTORY TREE =====\n')
+    root = tree.get('.')
+    out.write(f"./ (files: {root.files}, tokens: {root.tokens}, bytes: {root.bytes})\n")
+    tree.render(out, max_depth, min_tokens)
 
-def export_repo_as_text(root_dir: str, output_file: str, *, allow_secrets: bool = False, respect_gitignore: bool = True, max_bytes: Optional[int] = None, preview: bool = False) -> int:
+def write_file_tables(out, written_infos: Iterable[Dict[str, Any]], file_infos: Iterable[Dict[str, Any]], duplicates: Optional[Dict[str, str]] = None, stats: Optional[FileStats] = None) -> None:
+    """
+    Write SUMMARY BY FILE for written_infos and the top-20 tables for
+    file_infos, taken from stats when given (it must hold file_infos).
+    """
+    duplicates = duplicates or {}
+    if stats is None:
+        stats = FileStats.from_infos(file_infos)
+    # Detailed summary by file
+    out.write(f"\n===== SUMMARY BY FILE =====\n")
+    for info in sorted(written_infos, key=lambda x: x['tokens'], reverse=True):
+        note = f", truncated ({info['truncated']}, {info['omitted_bytes']} bytes omitted)" if info.get("truncated") else ""
+        if info['path'] in duplicates:
+            note += f", duplicate of {duplicates[info['path']]}"
+        out.write(f"{info['path']} : {info['tokens']} tokens, {info['lines']} lines, {info['bytes']} bytes{note}\n")
+
+    # Top files
+    out.write(f"\n===== TOP 20 BY TOKENS =====\n")
+    for path, tokens in stats.top(20, 'tokens'):
+        out.write(f"{path} : {tokens} tokens\n")
+    out.write(f"\n===== TOP 20 BY BYTES =====\n")
+    for path, size in stats.top(20, 'bytes'):
+        out.write(f"{path} : {size} bytes\n")
+
+def write_skipped_sections(out, skipped_binary: List[Any], skipped_large: List[Any]) -> None:
+    # Files detected as binary by content sniffing
+    if skipped_binary:
+        out.write(f"\n===== SKIPPED BINARY FILES =====\n")
+        for info in skipped_binary:
+            out.write(f"{info['path']} : {info['bytes']} bytes\n")
+
+    # Files over the per-file limits
+    if skipped_large:
+        out.write(f"\n===== SKIPPED LARGE FILES =====\n")
+        for info in skipped_large:
+            out.write(f"{info['path']} : {info['bytes']} bytes\n")
+
+def report_blocked(heading: str, entries: List[str], limit: int = 20) -> None:
+    """Print why an export was blocked: heading, the first limit entries, and how to override."""
+    print(f"[SAFETY] {heading}:")
+    for entry in entries[:limit]:
+        print(f" - {entry}")
+    if len(entries) > limit:
+        print(f" ... and {len(entries) - limit} more")
+    print("Re-run with --allow-secrets if you know what you're doing.")
+
+OUTPUT_FORMATS = ('text', 'container')
+
+def _finish(metrics: RunMetrics, timing: bool, exit_code: int) -> int:
+    if timing:
+        metrics.finish(exit_code)
+    return exit_code
+
+def export_repo_as_text(root_dir: str, output_file: str, *, allow_secrets: bool = False, respect_gitignore: bool = True, max_bytes: Optional[int] = None, preview: bool = False, jobs: int = 1, stream: bool = False, cache: bool = False, cache_dir: Optional[str] = None, cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES, source: str = 'walk', manifest_file: Optional[str] = None, previous_manifest: Optional[str] = None, max_tokens: Optional[int] = None, budget_policy: Optional[BudgetPolicy] = None, shard_tokens: Optional[int] = None, shard_bytes: Optional[int] = None, tokenizer: Optional[str] = None, calibrate: bool = False, exact_selected: bool = False, sniff_binary: bool = True, max_file_bytes: Optional[int] = None, max_file_tokens: Optional[int] = None, oversize: str = 'skip', scan_secrets: bool = False, follow_symlinks: bool = False, max_dir_depth: Optional[int] = None, max_dir_entries: Optional[int] = None, dedup: bool = False, output_format: str = 'text', compress: bool = False, tree_depth: Optional[int] = None, tree_min_tokens: Optional[int] = None, file_stats: Optional[str] = None, metrics: Optional[RunMetrics] = None) -> int:
     """
     Export repository at root_dir into a single text file with summaries.
 
@@ -214,64 +170,231 @@ def export_repo_as_text(root_dir: str, output_file: str, *, allow_secrets: bool
       0 success
       2 safety violation (secrets detected and not allowed)
       3 exceeded size/limits in preview
-    """
-    patterns = load_gitignore(root_dir) if respect_gitignore else []
-    encoder = tiktoken.get_encoding('cl100k_base') if tiktoken else None
-    tokenizer_name = 'cl100k_base' if encoder else 'words_approx'
 
-    file_infos: List[Dict[str, Any]] = []
-    total_tokens = 0
-    total_bytes = 0
-    by_ext_tokens: Counter = Counter()
-    by_ext_bytes: Counter = Counter()
-    by_ext_files: Counter = Counter()
+    jobs controls how many worker processes read and tokenize files
+    (1 = in-process, 0 = one per CPU). Output is identical for any value.
 
-    # Pre-scan to detect secrets and size
-    blocked_sensitive: List[str] = []
+    With stream=True only per-file metadata is kept after the first pass and
+    file bodies are copied from disk in chunks while writing, so memory stays
+    flat regardless of repository size.
 
-    for rel_path in iter_files(root_dir, patterns):
-        # sensitive check by pattern (path-level)
-        is_sensitive = any(fnmatch.fnmatch(rel_path.lower(), pat.lower()) for pat in SENSITIVE_PATTERNS)
-        if is_sensitive and not allow_secrets:
-            blocked_sensitive.append(rel_path)
-            continue
+    With cache=True (or an explicit cache_dir) token and line counts are kept
+    in an on-disk cache under .repo-digest-cache/ and reused for unchanged
+    files; the cache is trimmed to cache_max_bytes.
+
+    source selects how candidate files are enumerated: 'walk' walks the
+    working tree, 'git-index' reads the tracked files from .git/index
+    (raises GitIndexError if the index cannot be read).
+
+    manifest_file writes a JSON sidecar with each file's size, stat
+    signature, digest and counts. Given a previous_manifest the export is a
+    delta: only added and modified files are written, deleted files are
+    listed, and files whose stat signature still matches are not re-read.
+
+    max_tokens keeps only the files that fit the token budget, chosen by
+    budget_policy (see BudgetPolicy); dropped files are listed in a
+    DROPPED BY TOKEN BUDGET section.
+
+    shard_tokens / shard_bytes split the FILES section into part files
+    (output.part-001.txt, ...) that each stay under the ceiling, written
+    concurrently; output_file is then replaced by output.index.txt, which
+    holds the summaries and maps every file to its part.
+
+    tokenizer names a tokenizer from the registry (see
+    register_tokenizer): cl100k_base and o200k_base need tiktoken,
+    WORDS_TOKENIZER counts whitespace-separated words. The default (None)
+    is cl100k_base when tiktoken is installed and words otherwise; encoders
+    are loaded on first use and kept for the process. tokenizer='estimate' replaces the encoder with a per-extension
+    bytes-per-token estimator (see TokenEstimator); preview then only stats
+    files, and totals are reported with error bounds. calibrate fits the
+    ratios against cl100k_base on a sample of the repository, and
+    exact_selected re-counts the files that were finally selected with
+    cl100k_base. Both need tiktoken.
+
+    sniff_binary inspects the first bytes of every file and skips binaries
+    without reading them in full; skipped files are listed in a SKIPPED
+    BINARY FILES section.
+
+    max_file_bytes / max_file_tokens cap single files. Both are checked
+    against stat sizes before a file is read (tokens through the estimator's
+    per-extension ratio). Per oversize, a file over the cap is skipped and
+    listed in a SKIPPED LARGE FILES section ('skip'), or only its first
+    bytes ('head') or first and last bytes around an elision marker
+    ('head-tail') are read, and it is marked truncated in the summaries.
+
+    scan_secrets also checks the content of every file as it is read for
+    private keys, provider key formats and random-looking values assigned
+    to secret-sounding names (see scan_text). Like sensitive file names,
+    findings stop the export with exit code 2, listed as path:line, unless
+    allow_secrets is set. Every file is read, even in preview and for
+    unchanged files in a delta export.
+
+    The walk skips directory symlinks unless follow_symlinks is set, and
+    always skips symlink loops. A file reached again through a hard link
+    or symlink is included once. Directories more than max_dir_depth
+    levels deep, or with more than max_dir_entries entries, are left out
+    with a [skip] note (see walk_files).
+
+    dedup hashes file content during the read and writes each distinct body
+    once: a later file (in path order) with the same content gets only its
+    header, marked DUPLICATE OF the first. Summaries then report
+    deduplicated token and byte totals next to the raw ones. Truncated
+    files are never deduplicated.
 
-        abs_path = os.path.join(root_dir, rel_path)
-        try:
-            with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            tokens = count_tokens(content, encoder)
-            lines = content.count('\n') + (1 if content and not content.endswith('\n') else 0)
-            size = os.path.getsize(abs_path)
-            file_infos.append({"path": rel_path, "tokens": tokens, "lines": lines, "bytes": size, "content": content})
-            total_tokens += tokens
-            total_bytes += size
-            ext = os.path.splitext(rel_path)[1].lower() or "<no-ext>"
-            by_ext_tokens[ext] += tokens
-            by_ext_bytes[ext] += size
-            by_ext_files[ext] += 1
-        except Exception as e:
-            print(f"[skip] {rel_path}: {e}")
+    output_format='container' writes a random-access container instead of
+    text (see DigestContainer): each file body is stored separately behind
+    a table of contents with offsets and stats, zlib-compressed per file
+    with compress. The text export can be rendered back from it exactly.
+    Containers cannot be sharded.
+
+    tree_depth limits the DIRECTORY TREE to that many levels, and
+    tree_min_tokens folds sibling directories under that many tokens into
+    one line (see DirTree.render).
+
+    file_stats writes the selected files' per-file statistics there, also
+    in preview: CSV rows when the path ends in .csv, else JSON with
+    per-extension percentiles and size histograms, per-directory token
+    density and the top files (see FileStats).
+
+    metrics (a RunMetrics) collects wall and CPU time per phase, per-file
+    read times and peak RSS, and passes events to its hooks; the run is
+    finished (see RunMetrics.finish) before this returns.
+    """
+    if oversize not in OVERSIZE_MODES:
+        raise ValueError(f"unknown oversize mode: {oversize!r}")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format: {output_format!r}")
+    if output_format == 'container' and (shard_tokens is not None or shard_bytes is not None):
+        raise ValueError("container output cannot be sharded")
+    timing = metrics is not None
+    previous = Manifest.load(previous_manifest) if previous_manifest is not None else None
+    records = scan_repo(
+        root_dir,
+        allow_secrets=allow_secrets,
+        respect_gitignore=respect_gitignore,
+        source=source,
+        jobs=jobs,
+        keep_content=not (stream or preview),
+        tokenizer=tokenizer,
+        calibrate=calibrate,
+        stat_only=preview,
+        cache=cache,
+        cache_dir=cache_dir,
+        cache_max_bytes=cache_max_bytes,
+        track=manifest_file is not None or dedup,
+        previous=previous,
+        sniff_binary=sniff_binary,
+        max_file_bytes=max_file_bytes,
+        max_file_tokens=max_file_tokens,
+        oversize=oversize,
+        scan_secrets=scan_secrets,
+        follow_symlinks=follow_symlinks,
+        max_dir_depth=max_dir_depth,
+        max_dir_entries=max_dir_entries,
+        metrics=metrics,
+        stop_on_blocked=not allow_secrets,
+    )
+    metrics = metrics or RunMetrics(slowest=0)
+
+    file_infos: List[Any] = []
+    for item in records:
+        if isinstance(item, ScanSummary):
+            scanned = item
+        else:
+            file_infos.append(item)
+    encoder = scanned.encoder
+    tokenizer_name = scanned.tokenizer
+    estimator = encoder if isinstance(encoder, TokenEstimator) else None
+    skipped_binary = scanned.skipped_binary
+    skipped_large = scanned.skipped_large
+    for rel_path, reason in scanned.walk_skipped:
+        print(f"[skip] {rel_path}: {reason}")
+    for rel_path, error in scanned.errors:
+        print(f"[skip] {rel_path}: {error}")
+    if scanned.cache_stats is not None:
+        print(f"[cache] {scanned.cache_stats}")
+    for notice in scanned.notices:
+        print(notice)
 
     # Safety: secrets check
+    blocked_sensitive = scanned.blocked_sensitive
     if blocked_sensitive and not allow_secrets:
-        print("[SAFETY] Sensitive-looking files were blocked by default:")
-        for p in blocked_sensitive[:20]:
-            print(f" - {p}")
-        if len(blocked_sensitive) > 20:
-            print(f" ... and {len(blocked_sensitive) - 20} more")
-        print("Re-run with --allow-secrets if you know what you're doing.")
-        return 2
+        report_blocked("Sensitive-looking files were blocked by default", blocked_sensitive)
+        return _finish(metrics, timing, 2)
+
+    # Safety: secrets found in file contents
+    secret_findings = scanned.secret_findings
+    if secret_findings and not allow_secrets:
+        report_blocked("Likely secrets found in file contents", [f"{path}:{line}: {rule}" for path, line, rule in secret_findings])
+        return _finish(metrics, timing, 2)
     
     # Warning when secrets are allowed
     if allow_secrets:
-        sensitive_included = [info["path"] for info in file_infos if any(fnmatch.fnmatch(info["path"].lower(), pat.lower()) for pat in SENSITIVE_PATTERNS)]
+        sensitive_included = scanned.sensitive_included
         if sensitive_included:
             print(f"[WARNING] Including {len(sensitive_included)} sensitive files (--allow-secrets enabled)")
             for p in sensitive_included[:5]:
                 print(f" - {p}")
             if len(sensitive_included) > 5:
                 print(f" ... and {len(sensitive_included) - 5} more")
+        if secret_findings:
+            print(f"[WARNING] Including {len({f[0] for f in secret_findings})} files with likely secrets in their content (--allow-secrets enabled)")
+            for path, line, rule in secret_findings[:5]:
+                print(f" - {path}:{line}: {rule}")
+            if len(secret_findings) > 5:
+                print(f" ... and {len(secret_findings) - 5} more")
+
+    # Token budget: keep the highest-priority files that fit
+    metrics.mark('select')
+    all_infos = file_infos
+    dropped_budget: List[Dict[str, Any]] = []
+    if max_tokens is not None:
+        file_infos, dropped_budget = select_within_budget(all_infos, max_tokens, budget_policy)
+
+    # Exact counts for the files that made it, after planning on estimates
+    if estimator is not None and exact_selected:
+        exact_encoder = load_encoder()
+        if exact_encoder is None:
+            print("[estimate] tiktoken is not installed; keeping estimated counts")
+        else:
+            metrics.mark('exact_count')
+            exact_infos = []
+            for rel_path, info, error in read_files(root_dir, [i["path"] for i in file_infos], exact_encoder, jobs, keep_content=not (stream or preview), track=dedup, sniff_binary=sniff_binary, max_file_bytes=max_file_bytes, max_file_tokens=max_file_tokens, oversize=oversize):
+                if info is None:
+                    print(f"[skip] {rel_path}: {error}")
+                    metrics.skipped(rel_path, f"read error: {error}")
+                    continue
+                # the same skips scan_repo applies: a stat-only preview never sniffed these files
+                if info.get("binary"):
+                    skipped_binary.append(FileRecord.from_info(root_dir, info))
+                    metrics.skipped(rel_path, "binary")
+                    continue
+                if info.get("oversized"):
+                    skipped_large.append(FileRecord.from_info(root_dir, info))
+                    metrics.skipped(rel_path, "oversized")
+                    continue
+                exact_infos.append(info)
+            file_infos = exact_infos
+            if max_tokens is not None:
+                file_infos, over_budget = select_within_budget(file_infos, max_tokens, budget_policy)
+                dropped_budget = dropped_budget + over_budget
+            estimator = None
+            tokenizer_name = 'cl100k_base (selected files; planned with estimate)'
+
+    metrics.mark('aggregate')
+    total_tokens, total_bytes, by_ext_files, by_ext_tokens, by_ext_bytes = summarize_infos(file_infos)
+    duplicates: Dict[str, str] = {}
+    if dedup:
+        duplicates = find_duplicates(file_infos)
+        dup_infos = [info for info in file_infos if info["path"] in duplicates]
+        dedup_tokens = total_tokens - sum(info["tokens"] for info in dup_infos)
+        dedup_bytes = total_bytes - sum(info["bytes"] for info in dup_infos)
+    metrics.emit("totals", tokenizer=tokenizer_name, files=len(file_infos), tokens=total_tokens, bytes=total_bytes)
+
+    # Per-file columns were gathered during the scan, unless the selection changed since
+    stats = scanned.stats if file_infos is all_infos else FileStats.from_infos(file_infos)
+    if file_stats is not None:
+        stats.save(file_stats, tokenizer_name)
 
     # Preview mode
     if preview:
@@ -279,62 +402,132 @@ def export_repo_as_text(root_dir: str, output_file: str, *, allow_secrets: bool
         print(f"Tokenizer: {tokenizer_name}")
         print(f"Total candidate files: {len(file_infos)}")
         print(f"Estimated total tokens: {total_tokens}")
+        if estimator is not None:
+            low, high = estimator.bounds(by_ext_tokens)
+            print(f"Estimate bounds: {low}-{high} tokens")
         print(f"Estimated total bytes: {total_bytes}")
+        if dedup:
+            print(f"Deduplicated: {dedup_tokens} tokens, {dedup_bytes} bytes ({len(duplicates)} duplicate files)")
         print("Top extensions:")
         for ext in sorted(by_ext_files.keys())[:10]:
             print(f" {ext}: files={by_ext_files[ext]}, tokens={by_ext_tokens[ext]}, bytes={by_ext_bytes[ext]}")
+        if skipped_binary:
+            print(f"Binary files skipped: {len(skipped_binary)}")
+        if skipped_large:
+            print(f"Large files skipped: {len(skipped_large)}")
+        truncated = sum(1 for info in file_infos if info.get("truncated"))
+        if truncated:
+            print(f"Large files truncated: {truncated}")
+        if max_tokens is not None:
+            print(f"Token budget: {max_tokens} (kept {len(file_infos)} of {len(all_infos)} files, dropped {len(dropped_budget)})")
         if max_bytes is not None and total_bytes > max_bytes:
             print(f"[LIMIT] Estimated bytes {total_bytes} exceed --max-bytes={max_bytes}")
-            return 3
-        return 0
+            return _finish(metrics, timing, 3)
+        return _finish(metrics, timing, 0)
 
     # Max bytes enforcement (write path)
     if max_bytes is not None and total_bytes > max_bytes:
         print(f"[LIMIT] Total bytes {total_bytes} exceed --max-bytes={max_bytes}. Use --preview first or raise the limit.")
-        return 3
+        return _finish(metrics, timing, 3)
 
-    # Build aggregates and tree
-    aggregates, children = build_dir_aggregates(file_infos)
+    # Directory totals were gathered during the scan, unless the selection changed since
+    tree = scanned.tree if file_infos is all_infos else DirTree.from_infos(file_infos)
 
-    with open(output_file, 'w', encoding='utf-8') as out:
+    written_infos = file_infos
+    if previous is not None:
+        added, modified, deleted = diff_manifest(previous, all_infos)
+        changed = set(added) | set(modified)
+        written_infos = [info for info in file_infos if info["path"] in changed]
+    # Bodies are only skipped when their first copy is written in this output
+    written_duplicates = find_duplicates(written_infos) if dedup else {}
+
+    # Sharded output: file bodies go to part files, output_file's place is taken by an index
+    metrics.mark('write')
+    shards = None
+    if shard_tokens is not None or shard_bytes is not None:
+        unique_infos = [info for info in written_infos if info["path"] not in written_duplicates]
+        shards = plan_shards(root_dir, sorted(unique_infos, key=lambda x: x["path"]), encoder, max_tokens=shard_tokens, max_bytes=shard_bytes)
+        part_paths = write_shards(root_dir, shards, output_file, tokenizer=tokenizer_name, total_files=len(file_infos), total_tokens=total_tokens, total_bytes=total_bytes)
+        output_file = shard_index_path(output_file)
+        print(f"[shards] wrote {len(part_paths)} parts, index: {output_file}")
+
+    def write_head(out) -> None:
         # Summary
-        out.write('===== REPO SUMMARY =====\n')
-        out.write(f"Generated: {datetime.now().isoformat()}\n")
+        if previous is not None:
+            out.write('===== REPO DELTA =====\n')
+            out.write(f"Generated: {datetime.now().isoformat()}\n")
+            out.write(f"Base manifest: {previous_manifest}\n")
+            out.write(f"Added: {len(added)}\n")
+            out.write(f"Modified: {len(modified)}\n")
+            out.write(f"Deleted: {len(deleted)}\n")
+            out.write(f"Unchanged: {len(all_infos) - len(added) - len(modified)}\n")
+        else:
+            out.write('===== REPO SUMMARY =====\n')
+            out.write(f"Generated: {datetime.now().isoformat()}\n")
         out.write(f"Tokenizer: {tokenizer_name}\n")
         out.write(f"Total files: {len(file_infos)}\n")
         out.write(f"Total tokens: {total_tokens}\n")
+        if estimator is not None:
+            low, high = estimator.bounds(by_ext_tokens)
+            out.write(f"Estimate bounds: {low}-{high} tokens\n")
         out.write(f"Total bytes: {total_bytes}\n")
+        if dedup:
+            out.write(f"Deduplicated tokens: {dedup_tokens}\n")
+            out.write(f"Deduplicated bytes: {dedup_bytes}\n")
+            out.write(f"Duplicate files: {len(duplicates)}\n")
+        if max_tokens is not None:
+            out.write(f"Token budget: {max_tokens} (kept {len(file_infos)} of {len(all_infos)} files, dropped {len(dropped_budget)})\n")
 
-        # Extension breakdown
-        out.write('\n===== SUMMARY BY EXTENSION =====\n')
-        for ext in sorted(by_ext_files.keys()):
-            out.write(f"{ext}: files={by_ext_files[ext]}, tokens={by_ext_tokens[ext]}, bytes={by_ext_bytes[ext]}\n")
-
-        # Directory tree
-        out.write('\n===== DIRECTORY TREE =====\n')
-        root_data = aggregates.get('.', {"files": 0, "tokens": 0, "bytes": 0})
-        out.write(f"./ (files: {root_data['files']}, tokens: {root_data['tokens']}, bytes: {root_data['bytes']})\n")
-        print_dir_tree(out, aggregates, children, current='.', prefix='')
-
-        # Files
-        out.write('\n===== FILES =====\n')
-        for info in sorted(file_infos, key=lambda x: x["path"]):
-            out.write(f"\n===== FILE: {info['path']} =====\n")
-            out.write(f"[TOKENS: {info['tokens']} | LINES: {info['lines']} | BYTES: {info['bytes']}]\n")
-            out.write(info['content'])
-            out.write('\n')
-
-        # Detailed summary by file
-        out.write(f"\n===== SUMMARY BY FILE =====\n")
-        for info in sorted(file_infos, key=lambda x: x['tokens'], reverse=True):
-            out.write(f"{info['path']} : {info['tokens']} tokens, {info['lines']} lines, {info['bytes']} bytes\n")
-
-        # Top files
-        out.write(f"\n===== TOP 20 BY TOKENS =====\n")
-        for info in sorted(file_infos, key=lambda x: x['tokens'], reverse=True)[:20]:
-            out.write(f"{info['path']} : {info['tokens']} tokens\n")
-        out.write(f"\n===== TOP 20 BY BYTES =====\n")
-        for info in sorted(file_infos, key=lambda x: x['bytes'], reverse=True)[:20]:
-            out.write(f"{info['path']} : {info['bytes']} bytes\n")
+        write_extension_summary(out, by_ext_files, by_ext_tokens, by_ext_bytes)
+        write_dir_tree(out, tree, tree_depth, tree_min_tokens)
+
+        # Changes against the previous manifest
+        if previous is not None:
+            out.write('\n===== CHANGES =====\n')
+            status = {**{p: 'A' for p in added}, **{p: 'M' for p in modified}, **{p: 'D' for p in deleted}}
+            for path in sorted(status):
+                out.write(f"{status[path]} {path}\n")
+
+    def write_tail(out) -> None:
+        write_file_tables(out, written_infos, file_infos, written_duplicates, stats)
+        write_skipped_sections(out, skipped_binary, skipped_large)
+
+        # Files left out by the token budget
+        if max_tokens is not None:
+            out.write(f"\n===== DROPPED BY TOKEN BUDGET =====\n")
+            for info in sorted(dropped_budget, key=lambda x: x['tokens'], reverse=True):
+                out.write(f"{info['path']} : {info['tokens']} tokens\n")
+
+    if output_format == 'container':
+        head, tail = io.StringIO(), io.StringIO()
+        write_head(head)
+        write_tail(tail)
+        write_container(output_file, root_dir, sorted(written_infos, key=lambda x: x["path"]), head.getvalue(), tail.getvalue(), duplicates=written_duplicates, compress=compress, tokenizer=tokenizer_name)
+    else:
+        with open(output_file, 'w', encoding='utf-8') as out:
+            write_head(out)
+            if shards is None:
+                # Files
+                out.write('\n===== FILES =====\n')
+                for info in sorted(written_infos, key=lambda x: x["path"]):
+                    write_file_section(out, root_dir, info, written_duplicates.get(info["path"]))
+            else:
+                # Where each file went
+                out.write('\n===== SHARD INDEX =====\n')
+                for shard, part_path in zip(shards, part_paths):
+                    out.write(f"{os.path.basename(part_path)}: files={len(shard.pieces)}, tokens={shard.tokens}, bytes={shard.bytes}\n")
+                out.write('\n')
+                for shard, part_path in zip(shards, part_paths):
+                    for piece in shard.pieces:
+                        lines = f" [lines {piece.start_line + 1}-{piece.end_line}]" if piece.is_split else ""
+                        out.write(f"{piece.path} -> {os.path.basename(part_path)}{lines}\n")
+                for path in sorted(written_duplicates):
+                    out.write(f"{path} -> duplicate of {written_duplicates[path]}\n")
+
+            write_tail(out)
+
+    if manifest_file is not None:
+        metrics.mark('manifest')
+        Manifest.from_infos(tokenizer_name, all_infos).save(manifest_file)
 
-    return 0
+    return _finish(metrics, timing, 0)
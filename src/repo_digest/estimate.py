@@ -0,0 +1,127 @@
+import os
+import json
+import math
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ESTIMATE_TOKENIZER = 'estimate'
+
+# Approximate UTF-8 bytes per cl100k_base token by extension. These are
+# starting points only; calibrate() fits them against the real encoder.
+DEFAULT_BYTES_PER_TOKEN: Dict[str, float] = {
+    '.py': 3.4, '.pyi': 3.4, '.ipynb': 3.0,
+    '.js': 3.3, '.mjs': 3.3, '.cjs': 3.3, '.jsx': 3.2, '.ts': 3.3, '.tsx': 3.2,
+    '.java': 3.6, '.kt': 3.5, '.scala': 3.4, '.cs': 3.6, '.go': 3.2, '.rs': 3.2,
+    '.c': 3.1, '.h': 3.3, '.cc': 3.1, '.cpp': 3.1, '.hpp': 3.2, '.swift': 3.4,
+    '.rb': 3.4, '.php': 3.2, '.sh': 3.1, '.bash': 3.1, '.sql': 3.2, '.lua': 3.3,
+    '.html': 3.0, '.htm': 3.0, '.css': 2.9, '.scss': 2.9, '.vue': 3.1, '.svelte': 3.1,
+    '.json': 2.8, '.yaml': 3.1, '.yml': 3.1, '.toml': 3.0, '.xml': 2.9, '.ini': 3.2, '.cfg': 3.2,
+    '.md': 4.0, '.rst': 4.0, '.txt': 4.2,
+    '<no-ext>': 3.6,
+}
+DEFAULT_RATIO = 3.5
+# Relative error assumed for uncalibrated ratios
+DEFAULT_ERROR = 0.25
+
+
+def _ext(path: str) -> str:
+    return os.path.splitext(path)[1].lower() or "<no-ext>"
+
+
+class TokenEstimator:
+    """
+    Token counts estimated from byte length with per-extension
+    bytes-per-token ratios, so no encoder runs and (in preview) no file is
+    read. Each ratio carries a relative error bound; calibrated ratios get
+    the bound measured on their calibration sample.
+    """
+
+    name = ESTIMATE_TOKENIZER
+
+    def __init__(self, ratios: Optional[Dict[str, float]] = None, errors: Optional[Dict[str, float]] = None, default_ratio: float = DEFAULT_RATIO, default_error: float = DEFAULT_ERROR) -> None:
+        self.ratios = dict(DEFAULT_BYTES_PER_TOKEN if ratios is None else ratios)
+        self.errors = dict(errors or {})
+        self.default_ratio = default_ratio
+        self.default_error = default_error
+
+    def ratio(self, ext: str) -> float:
+        return self.ratios.get(ext, self.default_ratio)
+
+    def error(self, ext: str) -> float:
+        return self.errors.get(ext, self.default_error)
+
+    def estimate_bytes(self, size: int, path: str = '') -> int:
+        if size <= 0:
+            return 0
+        return max(1, int(round(size / self.ratio(_ext(path)))))
+
+    def count(self, text: str, path: str = '') -> int:
+        # len(str) is O(1); only non-ASCII text pays for the UTF-8 length
+        size = len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+        return self.estimate_bytes(size, path)
+
+    def cache_key(self) -> str:
+        """
+        The tokenizer name counts are cached under: 'estimate' plus a hash
+        of the ratio table, so counts made with other (or uncalibrated)
+        ratios are never reused.
+        """
+        table = json.dumps([sorted(self.ratios.items()), self.default_ratio])
+        return f"{self.name}:{hashlib.blake2b(table.encode('utf-8'), digest_size=8).hexdigest()}"
+
+    def bounds(self, tokens_by_ext: Dict[str, int]) -> Tuple[int, int]:
+        """Return (low, high) totals assuming every extension is off by its full error bound."""
+        total = sum(tokens_by_ext.values())
+        spread = sum(tokens * self.error(ext) for ext, tokens in tokens_by_ext.items())
+        return max(0, int(total - spread)), int(math.ceil(total + spread))
+
+    @classmethod
+    def calibrate(cls, samples: Iterable[Tuple[str, str]], encoder, *, min_samples: int = 3) -> 'TokenEstimator':
+        """
+        Fit per-extension ratios from (path, text) samples against encoder.
+
+        The ratio of an extension is its total bytes over its total tokens,
+        and its error bound is twice the standard deviation of the per-file
+        relative error. Extensions with fewer than min_samples files keep the
+        default ratio and bound.
+        """
+        per_ext: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for path, text in samples:
+            size = len(text.encode('utf-8', 'surrogatepass'))
+            if not size:
+                continue
+            tokens = len(encoder.encode(text))
+            if tokens:
+                per_ext[_ext(path)].append((size, tokens))
+
+        ratios = dict(DEFAULT_BYTES_PER_TOKEN)
+        errors: Dict[str, float] = {}
+        for ext, pairs in per_ext.items():
+            if len(pairs) < min_samples:
+                continue
+            ratio = sum(s for s, _ in pairs) / sum(t for _, t in pairs)
+            rel = [(s / ratio - t) / t for s, t in pairs]
+            mean = sum(rel) / len(rel)
+            std = math.sqrt(sum((r - mean) ** 2 for r in rel) / (len(rel) - 1))
+            ratios[ext] = ratio
+            errors[ext] = min(1.0, abs(mean) + 2 * std)
+        return cls(ratios, errors)
+
+
+def sample_for_calibration(root_dir: str, rel_paths: Iterable[str], *, per_ext: int = 20, max_bytes: int = 64 * 1024) -> List[Tuple[str, str]]:
+    """Read up to per_ext files per extension (first max_bytes of each) as calibration samples."""
+    taken: Dict[str, int] = defaultdict(int)
+    samples: List[Tuple[str, str]] = []
+    for rel_path in rel_paths:
+        ext = _ext(rel_path)
+        if taken[ext] >= per_ext:
+            continue
+        try:
+            with open(os.path.join(root_dir, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read(max_bytes)
+        except OSError:
+            continue
+        taken[ext] += 1
+        samples.append((rel_path, text))
+    return samples
@@ -0,0 +1,163 @@
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from .estimate import TokenEstimator
+from .tokenizers import DEFAULT_TOKENIZER, CountingTokenizer, get_encoder, tiktoken_available
+
+
+def count_tokens(text: str, encoder=None, path: str = '') -> int:
+    if isinstance(encoder, (TokenEstimator, CountingTokenizer)):
+        return encoder.count(text, path)
+    if encoder:
+        return len(encoder.encode(text))
+    return len(text.split())
+
+
+def load_encoder(name: str = DEFAULT_TOKENIZER):
+    """Return the tiktoken encoder for name (loaded once per process), or None when tiktoken is not installed."""
+    return get_encoder(name) if tiktoken_available() else None
+
+
+# Chunk size used when streaming file bodies into the output
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+# Leading bytes inspected to decide whether a file is binary
+SNIFF_BYTES = 8192
+# Control characters that do not normally appear in text (tab, newlines, form feed, backspace and ESC do)
+_CONTROL_BYTES = bytes(c for c in range(32) if c not in (8, 9, 10, 12, 13, 27)) + b'\x7f'
+_HIGH_BYTES = bytes(range(128, 256))
+
+
+def looks_binary(head: bytes) -> bool:
+    """
+    Guess from the first bytes of a file whether it is binary: any NUL byte,
+    more than 10% control characters, or invalid UTF-8 with mostly
+    non-ASCII bytes.
+    """
+    if not head:
+        return False
+    if b'\0' in head:
+        return True
+    controls = len(head) - len(head.translate(None, _CONTROL_BYTES))
+    if controls * 10 > len(head):
+        return True
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # a multi-byte sequence cut off at the end of the sample is fine
+        if e.start < len(head) - 3:
+            high = len(head) - len(head.translate(None, _HIGH_BYTES))
+            return high * 10 > len(head) * 3
+    return False
+
+
+# Treatments for files over the per-file limits
+OVERSIZE_MODES = ('skip', 'head', 'head-tail')
+
+
+def _universal_newlines(text: str) -> str:
+    # same translation text-mode open() applies
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def read_truncated(raw, size: int, limit: int, mode: str) -> Tuple[str, int]:
+    """
+    Read at most limit bytes of an open binary file by seeking: the head
+    only, or half from the head and half from the tail around an elision
+    marker. Cuts are moved to line boundaries when possible. Returns
+    (text, omitted_bytes).
+    """
+    if mode == 'head':
+        raw.seek(0)
+        head = raw.read(limit)
+        cut = head.rfind(b'\n')
+        if cut > 0:
+            head = head[:cut + 1]
+        return _universal_newlines(head.decode('utf-8', errors='ignore')), size - len(head)
+    half = limit // 2
+    raw.seek(0)
+    head = raw.read(half)
+    cut = head.rfind(b'\n')
+    if cut > 0:
+        head = head[:cut + 1]
+    raw.seek(max(0, size - half))
+    tail = raw.read(half)
+    cut = tail.find(b'\n')
+    if 0 <= cut < len(tail) - 1:
+        tail = tail[cut + 1:]
+    omitted = size - len(head) - len(tail)
+    marker = f"\n... [truncated: {omitted} bytes omitted] ...\n"
+    text = head.decode('utf-8', errors='ignore') + marker + tail.decode('utf-8', errors='ignore')
+    return _universal_newlines(text), omitted
+
+
+_DEFAULT_ESTIMATOR = TokenEstimator()
+
+
+def file_byte_limit(rel_path: str, max_file_bytes: Optional[int], max_file_tokens: Optional[int]) -> Optional[int]:
+    """
+    The per-file size limit checked against stat data. A token limit is
+    turned into bytes with the estimator's ratio for the file's extension,
+    so it can be enforced before anything is read.
+    """
+    limit = max_file_bytes
+    if max_file_tokens is not None:
+        ext = os.path.splitext(rel_path)[1].lower() or "<no-ext>"
+        token_bytes = int(max_file_tokens * _DEFAULT_ESTIMATOR.ratio(ext))
+        limit = token_bytes if limit is None else min(limit, token_bytes)
+    return limit
+
+
+def copy_file_text(abs_path: str, out, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+    """Write a file's decoded text to out in fixed-size chunks (same decoding as read_file_info)."""
+    with open(abs_path, 'r', encoding='utf-8', errors='ignore') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            out.write(chunk)
+
+
+def file_text(root_dir: str, info: Dict[str, Any]) -> str:
+    """
+    The text of a file as an export writes it: its kept content, the
+    truncated text of a truncated file, or else the whole file decoded.
+    """
+    if "content" in info:
+        return info["content"]
+    if info.get("truncated"):
+        with open(os.path.join(root_dir, info["path"]), 'rb') as raw:
+            return read_truncated(raw, info["bytes"], info["byte_limit"], info["truncated"])[0]
+    with open(os.path.join(root_dir, info["path"]), 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def write_file_section(out, root_dir: str, info: Dict[str, Any], duplicate_of: Optional[str] = None) -> None:
+    out.write(f"\n===== FILE: {info['path']} =====\n")
+    if duplicate_of is not None:
+        # the body was already written under duplicate_of
+        out.write(f"[TOKENS: {info['tokens']} | LINES: {info['lines']} | BYTES: {info['bytes']} | DUPLICATE OF: {duplicate_of}]\n")
+        return
+    if info.get("truncated"):
+        out.write(f"[TOKENS: {info['tokens']} | LINES: {info['lines']} | BYTES: {info['bytes']} | TRUNCATED: {info['truncated']}, {info['omitted_bytes']} bytes omitted]\n")
+    else:
+        out.write(f"[TOKENS: {info['tokens']} | LINES: {info['lines']} | BYTES: {info['bytes']}]\n")
+    if 'content' in info:
+        out.write(info['content'])
+    elif info.get("truncated"):
+        try:
+            with open(os.path.join(root_dir, info['path']), 'rb') as raw:
+                out.write(read_truncated(raw, info['bytes'], info['byte_limit'], info['truncated'])[0])
+        except OSError as e:
+            print(f"[warn] {info['path']}: could not stream content: {e}")
+    else:
+        try:
+            copy_file_text(os.path.join(root_dir, info['path']), out)
+        except OSError as e:
+            print(f"[warn] {info['path']}: could not stream content: {e}")
+    out.write('\n')
+
+
+def is_minified(filename: str) -> bool:
+    return '.min.' in filename or filename.endswith('.min.js') or filename.endswith('.min.css')
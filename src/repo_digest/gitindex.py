@@ -0,0 +1,124 @@
+import os
+import struct
+from typing import List, NamedTuple, Optional
+
+# Entry modes worth exporting; gitlinks (submodules, 0o160000) are skipped
+_MODE_TYPE_MASK = 0o170000
+_MODE_REGULAR = 0o100000
+_MODE_SYMLINK = 0o120000
+
+_HEADER = struct.Struct('>4sLL')
+_ENTRY = struct.Struct('>LLLLLLLLLL20sH')
+
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE = 0x3000
+_FLAG_NAME_MASK = 0x0fff
+
+
+class GitIndexError(Exception):
+    pass
+
+
+class IndexEntry(NamedTuple):
+    path: str
+    mode: int
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def find_git_dir(root_dir: str) -> Optional[str]:
+    """Return the git directory of a worktree root, following '.git' files used by worktrees and submodules."""
+    dot_git = os.path.join(root_dir, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        with open(dot_git, 'r', encoding='utf-8', errors='ignore') as f:
+            line = f.readline().strip()
+        if line.startswith('gitdir:'):
+            git_dir = line[len('gitdir:'):].strip()
+            if not os.path.isabs(git_dir):
+                git_dir = os.path.join(root_dir, git_dir)
+            return os.path.normpath(git_dir)
+    return None
+
+
+def _read_offset_varint(data: bytes, pos: int):
+    c = data[pos]
+    pos += 1
+    value = c & 0x7f
+    while c & 0x80:
+        value += 1
+        c = data[pos]
+        pos += 1
+        value = (value << 7) + (c & 0x7f)
+    return value, pos
+
+
+def parse_index(data: bytes) -> List[IndexEntry]:
+    """Parse the entries of a git index file (versions 2, 3 and 4)."""
+    if len(data) < _HEADER.size:
+        raise GitIndexError("index file is truncated")
+    signature, version, count = _HEADER.unpack_from(data, 0)
+    if signature != b'DIRC':
+        raise GitIndexError("not a git index file")
+    if version not in (2, 3, 4):
+        raise GitIndexError(f"unsupported index version {version}")
+
+    entries: List[IndexEntry] = []
+    pos = _HEADER.size
+    previous = b''
+    try:
+        for _ in range(count):
+            start = pos
+            (_ctime_s, _ctime_ns, mtime_s, mtime_ns, _dev, inode, mode,
+             _uid, _gid, size, _sha, flags) = _ENTRY.unpack_from(data, pos)
+            pos += _ENTRY.size
+            if version >= 3 and flags & _FLAG_EXTENDED:
+                pos += 2
+            if version == 4:
+                strip, pos = _read_offset_varint(data, pos)
+                end = data.index(b'\0', pos)
+                name = previous[:len(previous) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                name_len = flags & _FLAG_NAME_MASK
+                if name_len == _FLAG_NAME_MASK:
+                    end = data.index(b'\0', pos)
+                else:
+                    end = pos + name_len
+                name = data[pos:end]
+                # entries are NUL-padded to a multiple of 8 bytes
+                pos = start + ((end - start + 8) & ~7)
+            previous = name
+            if flags & _FLAG_STAGE:
+                # unmerged entry; keep a single copy of the path
+                if entries and entries[-1].path == name.decode('utf-8', 'surrogateescape'):
+                    continue
+            entries.append(IndexEntry(
+                name.decode('utf-8', 'surrogateescape'),
+                mode,
+                size,
+                mtime_s * 1_000_000_000 + mtime_ns,
+                inode,
+            ))
+    except (struct.error, ValueError, IndexError) as e:
+        raise GitIndexError(f"corrupt index: {e}") from e
+    return entries
+
+
+def read_git_index(root_dir: str) -> List[IndexEntry]:
+    """Return the tracked regular files and symlinks of the repository at root_dir."""
+    git_dir = find_git_dir(root_dir)
+    if git_dir is None:
+        raise GitIndexError(f"not a git repository: {root_dir}")
+    index_path = os.path.join(git_dir, 'index')
+    try:
+        with open(index_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise GitIndexError(f"cannot read {index_path}: {e}") from e
+    return [
+        e for e in parse_index(data)
+        if e.mode & _MODE_TYPE_MASK in (_MODE_REGULAR, _MODE_SYMLINK)
+    ]
@@ -0,0 +1,400 @@
+import os
+import re
+import fnmatch
+from typing import Iterable, Dict, List, Optional, Pattern, Tuple
+
+GITIGNORE = '.gitignore'
+
+# Comprehensive list of directories and files to exclude
+EXCLUDES = [
+    # Version control
+    '.git', '.svn', '.hg', '.bzr',
+    
+    # OS generated files
+    '.DS_Store', 'Thumbs.db', 'desktop.ini',
+    
+    # Python
+    '__pycache__', '*.pyc', '*.pyo', '*.pyd', '.Python',
+    'pip-log.txt', 'pip-delete-this-directory.txt',
+    '.venv', 'venv', 'ENV', 'env',
+    '.pytest_cache', '.mypy_cache', '.tox',
+    'htmlcov', '.coverage', '.coverage.*',
+    '*.egg-info', 'dist', 'build', 'wheels',
+    '.eggs', '*.egg',
+    
+    # Node.js / JavaScript
+    'node_modules', 'npm-debug.log*', 'yarn-debug.log*', 'yarn-error.log*',
+    '.npm', '.yarn', '.pnp', '.pnp.js',
+    'bower_components', 'jspm_packages',
+    
+    # IDE and editors
+    '.idea', '.vscode', '*.swp', '*.swo', '*~',
+    '.project', '.classpath', '.settings',
+    '*.sublime-project', '*.sublime-workspace',
+    
+    # Build outputs
+    'target', 'out', 'bin', 'obj',
+    '*.class', '*.jar', '*.war', '*.ear',
+    '*.dll', '*.exe', '*.o', '*.so', '*.dylib',
+    
+    # Logs and databases
+    '*.log', '*.sql', '*.sqlite', '*.db',
+    'logs', 'log',
+    
+    # Temporary files
+    '*.tmp', '*.temp', '*.bak', '*.backup', '*.cache',
+    '.cache', 'tmp', 'temp',
+    
+    # Security sensitive files
+    '*.key', '*.pem', '*.p12', '*.pfx',
+    'secrets', 'credentials',
+    
+    # Documentation builds
+    '_build', 'site', 'docs/_build',
+    
+    # Package manager locks (usually not needed for understanding code)
+    'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml',
+    'Pipfile.lock', 'poetry.lock', 'composer.lock',
+    
+    # Other
+    '.sass-cache', '.next', '.nuxt', '.turbo',
+    '.docusaurus', '.cache-loader',
+    'vendor', 'vendors',
+    '.repo-digest-cache',
+]
+
+# File extensions to exclude
+EXCLUDE_EXTENSIONS = [
+    # Binary files
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg',
+    '.mp3', '.mp4', '.avi', '.mov', '.wmv', '.flv',
+    '.zip', '.tar', '.gz', '.rar', '.7z',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    
+    # Compiled files
+    '.pyc', '.pyo', '.class', '.o', '.so', '.dll', '.exe',
+    
+    # Lock files
+    '.lock',
+    
+    # Large data files
+    '.csv', '.tsv', '.parquet', '.feather', '.h5', '.hdf5',
+    
+    # Font files
+    '.ttf', '.otf', '.woff', '.woff2', '.eot',
+    
+    # Map files
+    '.map', '.min.js.map', '.css.map',
+]
+
+# Patterns for files that might contain sensitive information
+SENSITIVE_PATTERNS = [
+    '*secret*', '*password*', '*token*', '*key*',
+    '*.pem', '*.key', '*.cert', '*.crt',
+    '.env*', '*.env',
+]
+
+_GLOB_CHARS = set('*?[')
+
+
+def _to_posix(path: str) -> str:
+    return path.replace(os.sep, '/') if os.sep != '/' else path
+
+
+def _combine(regexes: List[str], flags: int = 0) -> Optional[Pattern[str]]:
+    if not regexes:
+        return None
+    return re.compile('|'.join(f'(?:{r})' for r in regexes), flags)
+
+
+def _translate_glob(pat: str) -> str:
+    """Translate one gitignore glob (already stripped of '!', anchors and trailing '/') to a regex body."""
+    out: List[str] = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == '*':
+            if pat.startswith('**', i):
+                at_start = i == 0 or pat[i - 1] == '/'
+                at_end = i + 2 == n or pat[i + 2] == '/'
+                if at_start and at_end:
+                    if i + 2 == n:
+                        out.append('.*')
+                        i += 2
+                    else:
+                        out.append('(?:.*/)?')
+                        i += 3
+                    continue
+                # '**' not delimited by slashes behaves like a regular '*'
+                i += 1
+                while i < n and pat[i] == '*':
+                    i += 1
+                out.append('[^/]*')
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pat[j] in '!^':
+                j += 1
+            if j < n and pat[j] == ']':
+                j += 1
+            while j < n and pat[j] != ']':
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pat[i + 1:j].replace('\\', '\\\\')
+                if body and body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pat[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class GitignoreRule:
+    __slots__ = ('pattern', 'regex', 'negate', 'dir_only')
+
+    def __init__(self, pattern: str, regex: Pattern[str], negate: bool, dir_only: bool) -> None:
+        self.pattern = pattern
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+
+
+def parse_gitignore_line(line: str, base: str = '') -> Optional[Tuple[str, bool, bool]]:
+    """
+    Parse a single .gitignore line into (regex, negate, dir_only).
+
+    ``base`` is the posix path of the directory holding the .gitignore
+    relative to the repository root ('' for the root itself). The returned
+    regex is matched against root-relative posix paths.
+    """
+    line = line.rstrip('\n').rstrip('\r')
+    if not line or line.startswith('#'):
+        return None
+    # trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+    if not line:
+        return None
+    negate = False
+    if line.startswith('!'):
+        negate = True
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    anchored = '/' in line
+    line = line.lstrip('/')
+    prefix = re.escape(base + '/') if base else ''
+    body = _translate_glob(line)
+    if anchored:
+        regex = f'{prefix}{body}'
+    else:
+        regex = f'{prefix}(?:.*/)?{body}'
+    return regex, negate, dir_only
+
+
+class GitignoreRules:
+    """
+    The rules of one .gitignore file.
+
+    Within a file the last matching rule wins. When the file has no
+    negations every rule is folded into a single alternation so a path is
+    answered with one regex match.
+    """
+
+    __slots__ = ('base', 'rules', '_file_re', '_dir_re', '_has_negation')
+
+    def __init__(self, base: str, lines: Iterable[str]) -> None:
+        self.base = base
+        self.rules: List[GitignoreRule] = []
+        for raw in lines:
+            parsed = parse_gitignore_line(raw, base)
+            if parsed is None:
+                continue
+            regex, negate, dir_only = parsed
+            self.rules.append(GitignoreRule(raw.strip(), re.compile(f'(?:{regex})\\Z'), negate, dir_only))
+        self._has_negation = any(r.negate for r in self.rules)
+        if not self._has_negation:
+            self._file_re = _combine([r.regex.pattern for r in self.rules if not r.dir_only])
+            self._dir_re = _combine([r.regex.pattern for r in self.rules])
+        else:
+            self._file_re = self._dir_re = None
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """Return True (ignored), False (re-included) or None (no rule matched)."""
+        if not self._has_negation:
+            rx = self._dir_re if is_dir else self._file_re
+            if rx is not None and rx.match(path):
+                return True
+            return None
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(path):
+                return not rule.negate
+        return None
+
+
+def read_gitignore_lines(path: str) -> List[str]:
+    lines: List[str] = []
+    if os.path.isfile(path):
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                # only the line ending goes here: an escaped trailing space
+                # ('foo\ ') is part of the pattern, parse_gitignore_line
+                # drops the unescaped ones
+                line = line.rstrip('\r\n')
+                if line.strip() and not line.startswith('#'):
+                    lines.append(line)
+    return lines
+
+
+class IgnoreMatcher:
+    """
+    All exclusion rules of a run compiled once.
+
+    Name excludes are split into a literal set plus one combined regex,
+    extensions are a set lookup, sensitive patterns are a single regex and
+    .gitignore files (root and nested) are kept per directory with proper
+    gitignore semantics: negation, anchored and directory-only rules, and
+    deeper files overriding shallower ones.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        patterns: Iterable[str] = (),
+        *,
+        excludes: Optional[Iterable[str]] = None,
+        exclude_extensions: Optional[Iterable[str]] = None,
+        sensitive_patterns: Optional[Iterable[str]] = None,
+        nested_gitignore: bool = False,
+    ) -> None:
+        self.root_dir = root_dir
+        self.nested_gitignore = nested_gitignore
+
+        names = list(EXCLUDES if excludes is None else excludes)
+        self._exclude_literals = frozenset(n for n in names if '/' not in n and not (_GLOB_CHARS & set(n)))
+        self._exclude_name_re = _combine(
+            [fnmatch.translate(n) for n in names if '/' not in n and (_GLOB_CHARS & set(n))]
+        )
+        # entries such as 'docs/_build' name a path prefix rather than a single component
+        self._exclude_path_re = _combine(
+            [_translate_glob(n.strip('/')) + '(?:/|\\Z)' for n in names if '/' in n]
+        )
+        self._exclude_exts = frozenset(e.lower() for e in (EXCLUDE_EXTENSIONS if exclude_extensions is None else exclude_extensions))
+        self._sensitive_re = _combine(
+            [fnmatch.translate(p.lower()) for p in (SENSITIVE_PATTERNS if sensitive_patterns is None else sensitive_patterns)]
+        )
+
+        self._gitignores: Dict[str, GitignoreRules] = {}
+        root_rules = GitignoreRules('', patterns)
+        if root_rules:
+            self._gitignores[''] = root_rules
+
+    @classmethod
+    def for_root(cls, root_dir: str, respect_gitignore: bool = True, patterns: Optional[Iterable[str]] = None, **kwargs) -> 'IgnoreMatcher':
+        """
+        Build the matcher for a run: root .gitignore (or patterns in its
+        place) plus nested ones discovered during the walk.
+        """
+        if not respect_gitignore:
+            return cls(root_dir, (), nested_gitignore=False, **kwargs)
+        if patterns is None:
+            patterns = read_gitignore_lines(os.path.join(root_dir, GITIGNORE))
+        return cls(root_dir, patterns, nested_gitignore=True, **kwargs)
+
+    def add_gitignore(self, rel_dir: str, lines: Iterable[str]) -> None:
+        base = _to_posix(rel_dir).strip('/')
+        if base == '.':
+            base = ''
+        rules = GitignoreRules(base, lines)
+        if rules:
+            self._gitignores[base] = rules
+
+    def load_dir(self, rel_dir: str) -> None:
+        """Read the .gitignore of a directory below the root (no-op unless nested loading is enabled)."""
+        if not self.nested_gitignore or rel_dir in ('', '.'):
+            return
+        lines = read_gitignore_lines(os.path.join(self.root_dir, rel_dir, GITIGNORE))
+        if lines:
+            self.add_gitignore(rel_dir, lines)
+
+    def excluded_name(self, name: str) -> bool:
+        if name in self._exclude_literals:
+            return True
+        return self._exclude_name_re is not None and self._exclude_name_re.match(name) is not None
+
+    def excluded_extension(self, path: str) -> bool:
+        return os.path.splitext(path)[1].lower() in self._exclude_exts
+
+    def is_sensitive(self, path: str) -> bool:
+        return self._sensitive_re is not None and self._sensitive_re.match(path.lower()) is not None
+
+    def gitignored(self, path: str, is_dir: bool = False) -> bool:
+        """Gitignore verdict for a single posix path, without looking at its ancestors."""
+        if not self._gitignores:
+            return False
+        base = path
+        while True:
+            slash = base.rfind('/')
+            base = base[:slash] if slash >= 0 else ''
+            rules = self._gitignores.get(base)
+            if rules is not None:
+                verdict = rules.match(path, is_dir)
+                if verdict is not None:
+                    return verdict
+            if not base:
+                return False
+
+    def is_dir_excluded(self, rel_dir: str) -> bool:
+        """Like is_dir_ignored, but only the exclude rules; .gitignore is not consulted."""
+        path = _to_posix(rel_dir)
+        if self.excluded_name(path.rsplit('/', 1)[-1]):
+            return True
+        return self._exclude_path_re is not None and self._exclude_path_re.match(path) is not None
+
+    def is_dir_ignored(self, rel_dir: str) -> bool:
+        """Check one directory during a top-down walk (its ancestors are assumed to be kept)."""
+        if self.is_dir_excluded(rel_dir):
+            return True
+        return self.gitignored(_to_posix(rel_dir), is_dir=True)
+
+    def is_file_ignored(self, rel_path: str, check_sensitive: bool = False) -> bool:
+        """Check one file during a top-down walk (its ancestors are assumed to be kept)."""
+        path = _to_posix(rel_path)
+        name = path.rsplit('/', 1)[-1]
+        if self.excluded_name(name) or self.excluded_extension(name):
+            return True
+        if self.gitignored(path, is_dir=False):
+            return True
+        return check_sensitive and self.is_sensitive(path)
+
+    def is_ignored(self, rel_path: str, check_sensitive: bool = True, is_dir: bool = False) -> bool:
+        """Full verdict for an arbitrary path, including every ancestor directory."""
+        path = _to_posix(rel_path)
+        parts = path.split('/')
+        for i in range(1, len(parts)):
+            if self.is_dir_ignored('/'.join(parts[:i])):
+                return True
+        if is_dir:
+            return self.is_dir_ignored(path) or (check_sensitive and self.is_sensitive(path))
+        return self.is_file_ignored(path, check_sensitive=check_sensitive)
@@ -0,0 +1,83 @@
+import os
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+# Per-file fields stored in a manifest
+MANIFEST_FIELDS = ("bytes", "mtime_ns", "inode", "digest", "tokens", "lines")
+
+
+class ManifestError(Exception):
+    pass
+
+
+class Manifest:
+    """Per-file size, stat signature, content digest and counts of one export."""
+
+    def __init__(self, tokenizer: str, files: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.tokenizer = tokenizer
+        self.files: Dict[str, Dict[str, Any]] = files or {}
+
+    @classmethod
+    def from_infos(cls, tokenizer: str, file_infos: Iterable[Dict[str, Any]]) -> 'Manifest':
+        files = {
+            info["path"].replace(os.sep, '/'): {k: info[k] for k in MANIFEST_FIELDS if k in info}
+            for info in file_infos
+        }
+        return cls(tokenizer, files)
+
+    @classmethod
+    def load(cls, path: str) -> 'Manifest':
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ManifestError(f"cannot read manifest {path}: {e}") from e
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            raise ManifestError(f"unsupported manifest format: {path}")
+        return cls(data.get("tokenizer", ""), data.get("files", {}))
+
+    def save(self, path: str) -> None:
+        data = {"version": MANIFEST_VERSION, "tokenizer": self.tokenizer, "files": self.files}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=0, sort_keys=True)
+            f.write('\n')
+
+    def get(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        return self.files.get(rel_path.replace(os.sep, '/'))
+
+    def unchanged(self, rel_path: str, st: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Return the stored entry when the file's stat signature still matches it."""
+        entry = self.get(rel_path)
+        if (
+            entry is not None
+            and entry.get("bytes") == st.st_size
+            and entry.get("mtime_ns") == st.st_mtime_ns
+            and entry.get("inode") == st.st_ino
+            and "digest" in entry
+        ):
+            return entry
+        return None
+
+
+def diff_manifest(previous: Manifest, file_infos: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Return (added, modified, deleted) paths of file_infos relative to a
+    previous manifest. A file is modified when its digest differs or is
+    missing on either side.
+    """
+    added: List[str] = []
+    modified: List[str] = []
+    seen = set()
+    for info in file_infos:
+        key = info["path"].replace(os.sep, '/')
+        seen.add(key)
+        entry = previous.files.get(key)
+        if entry is None:
+            added.append(info["path"])
+        elif entry.get("digest") is None or entry.get("digest") != info.get("digest"):
+            # without a digest on either side a change cannot be ruled out
+            modified.append(info["path"])
+    deleted = sorted(p.replace('/', os.sep) for p in previous.files if p not in seen)
+    return added, modified, deleted
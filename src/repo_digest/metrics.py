@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import heapq
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+Hook = Callable[[str, Dict[str, Any]], None]
+
+
+def _cpu_seconds() -> float:
+    # includes reaped worker processes, so pooled reads are counted
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process or of its largest finished child, if known."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RunMetrics:
+    """
+    Timings of one export, gathered as it runs.
+
+    The pipeline calls mark(name) as it enters each phase, which also closes
+    the previous one; mark(None) closes the last. Time measured inside a
+    phase (ignore matching during the walk, tokenizing during the read) is
+    added with add(name, ..., parent=...). Per-file read times feed the
+    files/s and MB/s rates and the slowest-files list.
+
+    Every hook is called as hook(event, data) for the events phase_start,
+    phase_end, skip (a file left out, with a reason), encoder_loaded,
+    totals (file, token and byte totals of the selection) and run_end;
+    hooks run inline and should be quick. finish() ends the run, fires
+    run_end and returns the report, which is what --stats prints and
+    --metrics-json saves.
+    """
+
+    def __init__(self, slowest: int = 10, hooks: Optional[List[Hook]] = None) -> None:
+        self.slowest = slowest
+        self.hooks: List[Hook] = list(hooks or [])
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.files = 0
+        self.bytes = 0
+        self.encoder_load_seconds = 0.0
+        self._slow: List[Tuple[float, str]] = []
+        self._current: Optional[Tuple[str, float, float]] = None
+        self._start = time.perf_counter()
+        self._start_cpu = _cpu_seconds()
+        self._report: Optional[Dict[str, Any]] = None
+
+    def emit(self, event: str, **data: Any) -> None:
+        for hook in self.hooks:
+            hook(event, data)
+
+    def _phase(self, name: str, parent: Optional[str] = None) -> Dict[str, Any]:
+        phase = self.phases.get(name)
+        if phase is None:
+            # nested phases are timed by wall clock only
+            phase = self.phases[name] = {"wall": 0.0} if parent is not None else {"wall": 0.0, "cpu": 0.0}
+            if parent is not None:
+                phase["parent"] = parent
+        return phase
+
+    def mark(self, name: Optional[str]) -> None:
+        now, cpu = time.perf_counter(), _cpu_seconds()
+        if self._current is not None:
+            current, start, start_cpu = self._current
+            phase = self._phase(current)
+            phase["wall"] += now - start
+            phase["cpu"] += cpu - start_cpu
+            self.emit("phase_end", phase=current, wall=now - start, cpu=cpu - start_cpu)
+        self._current = None
+        if name is not None:
+            self._current = (name, now, cpu)
+            self.emit("phase_start", phase=name)
+
+    def add(self, name: str, wall: float, parent: Optional[str] = None) -> None:
+        self._phase(name, parent)["wall"] += wall
+
+    def encoder_loaded(self, name: str, seconds: float) -> None:
+        self.encoder_load_seconds += seconds
+        self.emit("encoder_loaded", tokenizer=name, seconds=seconds)
+
+    def skipped(self, path: str, reason: str) -> None:
+        self.emit("skip", path=path, reason=reason)
+
+    def record_file(self, info: Dict[str, Any]) -> None:
+        """Count one read file, taking (and removing) its per-file timing fields."""
+        self.files += 1
+        self.bytes += info.get("bytes", 0)
+        seconds = info.pop("read_seconds", None)
+        tokenize = info.pop("tokenize_seconds", None)
+        if tokenize is not None:
+            self.add("tokenize", tokenize, parent="read")
+        if seconds is None or not self.slowest:
+            return
+        item = (seconds, info["path"])
+        if len(self._slow) < self.slowest:
+            heapq.heappush(self._slow, item)
+        elif item > self._slow[0]:
+            heapq.heapreplace(self._slow, item)
+
+    def finish(self, exit_code: int = 0) -> Dict[str, Any]:
+        """Close the open phase and return the report; calling it again returns the same report."""
+        if self._report is not None:
+            return self._report
+        self.mark(None)
+        wall = time.perf_counter() - self._start
+        read_wall = self.phases.get("read", {}).get("wall", 0.0)
+        self._report = {
+            "exit_code": exit_code,
+            "wall": wall,
+            "cpu": _cpu_seconds() - self._start_cpu,
+            "phases": self.phases,
+            "files": self.files,
+            "bytes": self.bytes,
+            "files_per_second": self.files / read_wall if read_wall else None,
+            "mb_per_second": self.bytes / (1024 * 1024) / read_wall if read_wall else None,
+            "tokenizer_seconds": self.phases.get("tokenize", {}).get("wall", 0.0),
+            "encoder_load_seconds": self.encoder_load_seconds,
+            "slowest_files": [{"path": p, "seconds": s} for s, p in sorted(self._slow, reverse=True)],
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+        self.emit("run_end", **self._report)
+        return self._report
+
+    def format(self) -> str:
+        report = self.finish()
+        lines = ["===== RUN STATS =====", f"Total: wall {report['wall']:.3f}s, cpu {report['cpu']:.3f}s"]
+        for name, phase in self.phases.items():
+            if "parent" in phase:
+                continue
+            lines.append(f"  {name}: wall {phase['wall']:.3f}s, cpu {phase['cpu']:.3f}s")
+            for child, sub in self.phases.items():
+                if sub.get("parent") == name:
+                    lines.append(f"    {child}: wall {sub['wall']:.3f}s")
+        if report["files_per_second"] is not None:
+            lines.append(f"Read: {report['files']} files, {report['files_per_second']:.1f} files/s, {report['mb_per_second']:.2f} MB/s")
+        lines.append(f"Tokenizer: {report['tokenizer_seconds']:.3f}s, encoder load {report['encoder_load_seconds']:.3f}s")
+        if report["peak_rss_bytes"] is not None:
+            lines.append(f"Peak RSS: {report['peak_rss_bytes'] / (1024 * 1024):.1f} MiB")
+        if report["slowest_files"]:
+            lines.append(f"Slowest {len(report['slowest_files'])} files:")
+            for item in report["slowest_files"]:
+                lines.append(f"  {item['path']}: {item['seconds'] * 1000:.1f} ms")
+        return "\n".join(lines)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.finish(), f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+class TimedMatcher:
+    """Wraps an IgnoreMatcher so that time spent matching is added to a metrics phase."""
+
+    _TIMED = ('load_dir', 'is_dir_ignored', 'is_file_ignored', 'is_sensitive', 'is_ignored')
+
+    def __init__(self, matcher, metrics: RunMetrics, phase: str = 'ignore', parent: Optional[str] = 'walk') -> None:
+        self._matcher = matcher
+        self._metrics = metrics
+        self._phase = metrics._phase(phase, parent)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._matcher, name)
+        if name not in self._TIMED:
+            return attr
+        phase = self._phase
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                phase["wall"] += time.perf_counter() - start
+        # later lookups find the wrapper without going through __getattr__
+        setattr(self, name, timed)
+        return timed
@@ -0,0 +1,275 @@
+import io
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .cache import TokenCache, file_digest
+from .estimate import TokenEstimator
+from .fileio import OVERSIZE_MODES, SNIFF_BYTES, count_tokens, file_byte_limit, looks_binary, read_truncated
+from .tokenizers import WORDS_TOKENIZER, encoder_name, get_encoder
+from .walk import FileStat
+
+
+class ReadOptions:
+    """Per-run settings of the read pass, shared with pool workers."""
+
+    __slots__ = ('keep_content', 'track', 'sniff_binary', 'max_file_bytes', 'max_file_tokens', 'oversize', 'timing', 'scan_secrets')
+
+    def __init__(self, keep_content: bool = True, track: bool = False, sniff_binary: bool = True, max_file_bytes: Optional[int] = None, max_file_tokens: Optional[int] = None, oversize: str = 'skip', timing: bool = False, scan_secrets: bool = False) -> None:
+        if oversize not in OVERSIZE_MODES:
+            raise ValueError(f"unknown oversize mode: {oversize!r}")
+        self.keep_content = keep_content
+        self.track = track
+        self.sniff_binary = sniff_binary
+        self.max_file_bytes = max_file_bytes
+        self.max_file_tokens = max_file_tokens
+        self.oversize = oversize
+        self.timing = timing
+        self.scan_secrets = scan_secrets
+
+    def byte_limit(self, rel_path: str) -> Optional[int]:
+        return file_byte_limit(rel_path, self.max_file_bytes, self.max_file_tokens)
+
+    def __getstate__(self):
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for k, v in zip(self.__slots__, state):
+            setattr(self, k, v)
+
+
+def read_file_info(root_dir: str, rel_path: str, encoder=None, options: Optional[ReadOptions] = None, cache: Optional[TokenCache] = None, known: Optional[Dict[str, Any]] = None, st: Optional[FileStat] = None) -> Dict[str, Any]:
+    """
+    Read one file and return its info dict.
+
+    known carries already-known fields (tokens, lines, bytes and possibly the
+    stat signature and digest) from a cache hit: the file is then not read at
+    all unless its content is needed. With options.track the info also
+    records the file's digest and stat signature (mtime_ns, inode), and cache
+    (if given) is consulted by digest before tokenizing. With
+    options.sniff_binary only the first SNIFF_BYTES of a binary file are
+    read and its info is flagged "binary" with zero tokens. Files over the
+    options' per-file limit are either flagged "oversized" without being
+    read (not even sniffed), or only their head (and tail) is read and the
+    info is flagged "truncated"; a tracked truncated file's digest is that
+    of its truncated text. With options.timing, files that were read carry
+    their read and tokenize times (read_seconds, tokenize_seconds). With
+    options.scan_secrets the text that was read is also run through
+    scan_text, and likely secrets are listed as (line, rule) in "secrets";
+    cached counts then still save tokenizing, but not reading. st is the
+    file's stat from the walk, if it has one; the open file is then not
+    stat-ed again.
+    """
+    options = options or ReadOptions()
+    start = time.perf_counter() if options.timing else 0.0
+    limit = options.byte_limit(rel_path)
+    if known is not None and limit is not None and known["bytes"] > limit:
+        # counts cached for the whole file do not describe a truncated one
+        known = None
+    if known is not None and (not (options.keep_content or options.scan_secrets) or known.get("binary")):
+        return {"path": rel_path, **known}
+    abs_path = os.path.join(root_dir, rel_path)
+    info: Dict[str, Any] = {"path": rel_path}
+    with open(abs_path, 'rb') as raw:
+        if st is None:
+            st = os.fstat(raw.fileno())
+        if options.track:
+            info.update(mtime_ns=st.st_mtime_ns, inode=st.st_ino)
+        oversized = limit is not None and st.st_size > limit
+        if oversized and options.oversize == 'skip':
+            # decided from the size alone, before the binary sniff reads anything
+            info.update(tokens=0, lines=0, bytes=st.st_size, oversized=True)
+            return info
+        if options.sniff_binary and known is None:
+            head = raw.read(SNIFF_BYTES)
+            if looks_binary(head):
+                info.update(tokens=0, lines=0, bytes=st.st_size, binary=True)
+                return info
+            raw.seek(0)
+        if oversized:
+            info["bytes"] = st.st_size
+            content, omitted = read_truncated(raw, st.st_size, limit, options.oversize)
+            info.update(truncated=options.oversize, omitted_bytes=omitted, byte_limit=limit)
+            known = None
+        else:
+            with io.TextIOWrapper(raw, encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+    if options.scan_secrets:
+        from .secretscan import scan_text
+
+        findings = scan_text(content)
+        if findings:
+            info["secrets"] = findings
+    tokenize_start = time.perf_counter() if options.timing else 0.0
+    if "truncated" in info:
+        if options.track:
+            # the digest of the text that is written, so a delta sees the truncated file change
+            info["digest"] = file_digest(content)
+        info["tokens"] = count_tokens(content, encoder, rel_path)
+        info["lines"] = content.count('\n') + (1 if content and not content.endswith('\n') else 0)
+    elif known is not None:
+        info.update(known)
+    else:
+        if options.track:
+            digest = file_digest(content)
+            info["digest"] = digest
+            if cache is not None:
+                hit = cache.lookup_digest(digest)
+                info["cache"] = "hash" if hit else "miss"
+                if hit is not None:
+                    info.update(tokens=hit[0], lines=hit[1])
+        if "tokens" not in info:
+            info["tokens"] = count_tokens(content, encoder, rel_path)
+            info["lines"] = content.count('\n') + (1 if content and not content.endswith('\n') else 0)
+    if options.timing:
+        end = time.perf_counter()
+        info.update(read_seconds=end - start, tokenize_seconds=end - tokenize_start)
+    info["bytes"] = st.st_size
+    if options.keep_content:
+        info["content"] = content
+    return info
+
+
+# Encoder and read-only token cache of a pool worker process, loaded once by _init_worker
+_worker_encoder = None
+_worker_cache: Optional[TokenCache] = None
+
+
+def _init_worker(cache_dir: Optional[str] = None, tokenizer_name: str = '', encoder: Any = WORDS_TOKENIZER) -> None:
+    global _worker_encoder, _worker_cache
+    # a registry name is loaded here, once per worker; estimators arrive pickled
+    _worker_encoder = get_encoder(encoder) if isinstance(encoder, str) else encoder
+    if cache_dir is not None:
+        try:
+            _worker_cache = TokenCache(cache_dir, tokenizer_name, readonly=True)
+        except sqlite3.Error:
+            _worker_cache = None
+
+
+def _read_file_task(task: Tuple[str, str, ReadOptions, Optional[Dict[str, Any]], Optional[FileStat]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    root_dir, rel_path, options, known, st = task
+    try:
+        return read_file_info(root_dir, rel_path, _worker_encoder, options, _worker_cache, known, st), None
+    except Exception as e:
+        return None, str(e)
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    if jobs is None:
+        return 1
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def stat_signature(st: Union[os.stat_result, FileStat]) -> Dict[str, int]:
+    return {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+
+def lookup_cached(root_dir: str, rel_paths: List[str], cache: TokenCache, stats: Optional[List[Optional[FileStat]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the known fields of stat-signature cache hits. Paths are stat-ed
+    unless stats (aligned with rel_paths) already holds their stat.
+    """
+    known: Dict[str, Dict[str, Any]] = {}
+    for i, rel_path in enumerate(rel_paths):
+        st = stats[i] if stats is not None else None
+        if st is None:
+            try:
+                st = os.stat(os.path.join(root_dir, rel_path))
+            except OSError:
+                continue
+        hit = cache.lookup(rel_path, st)
+        if hit is not None:
+            known[rel_path] = {"tokens": hit[0], "lines": hit[1], "digest": hit[2], **stat_signature(st)}
+        elif cache.lookup_binary(rel_path, st):
+            known[rel_path] = {"tokens": 0, "lines": 0, "binary": True, **stat_signature(st)}
+    return known
+
+
+def read_files(root_dir: str, rel_paths: List[str], encoder=None, jobs: int = 1, keep_content: bool = True, cache: Optional[TokenCache] = None, track: bool = False, sniff_binary: bool = True, max_file_bytes: Optional[int] = None, max_file_tokens: Optional[int] = None, oversize: str = 'skip', timing: bool = False, scan_secrets: bool = False, stats: Optional[List[Optional[FileStat]]] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Read, decode, count lines and tokenize files, yielding (rel_path, info, error)
+    in the order of rel_paths. With jobs > 1 the work runs in a process pool where
+    each worker loads its own encoder once.
+
+    When a cache is given, stat-signature hits skip tokenizing (and reading, if
+    content is not kept), other files are looked up by content digest, and
+    fresh counts are stored back into the cache. With track (implied by a
+    cache) every info carries its digest and stat signature. Binary files
+    (see looks_binary) come back flagged "binary" unless sniff_binary is off,
+    and files over max_file_bytes / max_file_tokens are handled per oversize.
+    timing adds per-file read and tokenize times, and scan_secrets scans
+    each file's text for secrets as it is read (see read_file_info).
+    stats, aligned with rel_paths, are the files' stats from the walk; they
+    replace the cache lookup's stat and the read's fstat.
+    """
+    jobs = resolve_jobs(jobs)
+    options = ReadOptions(keep_content, track or cache is not None, sniff_binary, max_file_bytes, max_file_tokens, oversize, timing, scan_secrets)
+    known = lookup_cached(root_dir, rel_paths, cache, stats) if cache is not None else {}
+    stats = stats if stats is not None else [None] * len(rel_paths)
+    if jobs <= 1 or len(rel_paths) < 2:
+        for rel_path, st in zip(rel_paths, stats):
+            try:
+                info = read_file_info(root_dir, rel_path, encoder, options, cache, known.get(rel_path), st)
+            except Exception as e:
+                yield rel_path, None, str(e)
+                continue
+            yield rel_path, _record_cached(cache, info), None
+        return
+    chunksize = max(1, min(64, len(rel_paths) // (jobs * 4)))
+    spec = encoder if isinstance(encoder, TokenEstimator) else encoder_name(encoder)
+    initargs = (cache.cache_dir, cache.tokenizer, spec) if cache is not None else (None, '', spec)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+        tasks = [(root_dir, rel_path, options, known.get(rel_path), st) for rel_path, st in zip(rel_paths, stats)]
+        for rel_path, (info, error) in zip(rel_paths, pool.map(_read_file_task, tasks, chunksize=chunksize)):
+            yield rel_path, _record_cached(cache, info), error
+
+
+def estimate_files(root_dir: str, rel_paths: List[str], estimator: TokenEstimator, max_file_bytes: Optional[int] = None, max_file_tokens: Optional[int] = None, oversize: str = 'skip', stats: Optional[List[Optional[FileStat]]] = None) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Like read_files, but token counts come from stat sizes alone (the
+    walk's, when stats holds them); nothing is read and lines are not
+    counted.
+    """
+    for i, rel_path in enumerate(rel_paths):
+        st = stats[i] if stats is not None else None
+        if st is None:
+            try:
+                st = os.stat(os.path.join(root_dir, rel_path))
+            except OSError as e:
+                yield rel_path, None, str(e)
+                continue
+        size = st.st_size
+        limit = file_byte_limit(rel_path, max_file_bytes, max_file_tokens)
+        if limit is not None and size > limit:
+            if oversize == 'skip':
+                yield rel_path, {"path": rel_path, "tokens": 0, "lines": 0, "bytes": size, "oversized": True}, None
+            else:
+                info = {"path": rel_path, "tokens": estimator.estimate_bytes(limit, rel_path), "lines": 0, "bytes": size}
+                info.update(truncated=oversize, omitted_bytes=size - limit, byte_limit=limit)
+                yield rel_path, info, None
+            continue
+        yield rel_path, {"path": rel_path, "tokens": estimator.estimate_bytes(size, rel_path), "lines": 0, "bytes": size}, None
+
+
+def _record_cached(cache: Optional[TokenCache], info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if cache is None or info is None:
+        return info
+    if info.get("binary"):
+        if "mtime_ns" in info:
+            cache.store_binary(info["path"], info["bytes"], info["mtime_ns"], info["inode"])
+        return info
+    if info.get("oversized") or info.get("truncated"):
+        return info
+    status = info.pop("cache", None)
+    if status is None:
+        return info
+    if status == "hash":
+        cache.stats.hash_hits += 1
+    else:
+        cache.stats.misses += 1
+    cache.store(info["path"], info["bytes"], info["mtime_ns"], info["inode"], info["digest"], info["tokens"], info["lines"])
+    return info
@@ -0,0 +1,332 @@
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .cache import DEFAULT_CACHE_MAX_BYTES, TokenCache
+from .estimate import TokenEstimator, sample_for_calibration
+from .fileio import OVERSIZE_MODES, file_byte_limit, file_text, load_encoder
+from .ignore import IgnoreMatcher
+from .manifest import Manifest
+from .metrics import RunMetrics, TimedMatcher
+from .reader import estimate_files, read_files
+from .stats import FileStats
+from .tokenizers import default_tokenizer, get_encoder
+from .tree import DirTree
+from .walk import FileStat, iter_index_files, walk_files
+
+# Public per-file fields of a FileRecord; optional ones are None when unknown
+RECORD_FIELDS = ('path', 'bytes', 'tokens', 'lines', 'digest', 'mtime_ns', 'inode', 'truncated', 'omitted_bytes', 'byte_limit')
+
+
+class FileRecord:
+    """
+    One scanned file: its relative path, size, token and line counts, and
+    whatever the scan tracked (digest and stat signature, truncation).
+
+    content returns the file's text, read from disk on access unless the
+    scan kept it. Records also answer record["tokens"], record.get(...) and
+    `"digest" in record` like the info dicts the writers work on, with unset
+    optional fields reported as missing.
+    """
+
+    __slots__ = RECORD_FIELDS + ('_root', '_content')
+
+    def __init__(self, root_dir: str, path: str, bytes: int, tokens: int, lines: int, content: Optional[str] = None, **optional: Any) -> None:
+        self._root = root_dir
+        self._content = content
+        self.path = path
+        self.bytes = bytes
+        self.tokens = tokens
+        self.lines = lines
+        for name in RECORD_FIELDS[4:]:
+            setattr(self, name, optional.get(name))
+
+    @classmethod
+    def from_info(cls, root_dir: str, info: Dict[str, Any]) -> 'FileRecord':
+        return cls(root_dir, **{k: v for k, v in info.items() if k in RECORD_FIELDS or k == 'content'})
+
+    @property
+    def content(self) -> str:
+        if self._content is not None:
+            return self._content
+        return file_text(self._root, self)
+
+    def drop_content(self) -> None:
+        """Release kept content; later reads of content go back to disk."""
+        self._content = None
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'content':
+            if self._content is None:
+                raise KeyError(key)
+            return self._content
+        if key in RECORD_FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {k: getattr(self, k) for k in RECORD_FIELDS if getattr(self, k) is not None}
+        if self._content is not None:
+            data['content'] = self._content
+        return data
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.path!r}, bytes={self.bytes}, tokens={self.tokens}, lines={self.lines})"
+
+
+class ScanSummary:
+    """
+    What a scan saw, yielded after its last FileRecord: totals,
+    per-extension counters, per-directory totals (tree, a DirTree) and
+    per-file columns (stats, a FileStats) of the yielded records, and the
+    files that were left out (blocked as sensitive, binary, over the size
+    limit, unreadable). With content scanning, secret_findings lists
+    (path, line, rule) of likely secrets in the yielded records.
+    walk_skipped lists (path, reason) for what the walk left out: files
+    already reached through another link, symlink loops, and directories
+    over the depth or entry limits. notices lists messages for the user
+    about how the scan ran, e.g. calibration falling back to the default
+    ratios.
+
+    complete is False when the scan stopped before reading because
+    sensitive files were blocked (see scan_repo's stop_on_blocked).
+    """
+
+    __slots__ = (
+        'tokenizer', 'encoder', 'files', 'tokens', 'bytes',
+        'by_ext_files', 'by_ext_tokens', 'by_ext_bytes',
+        'blocked_sensitive', 'sensitive_included', 'secret_findings', 'skipped_binary', 'skipped_large', 'errors', 'walk_skipped',
+        'tree', 'stats', 'cache_stats', 'notices', 'complete',
+    )
+
+    def __init__(self, tokenizer: str, encoder=None) -> None:
+        self.tokenizer = tokenizer
+        self.encoder = encoder
+        self.files = 0
+        self.tokens = 0
+        self.bytes = 0
+        self.by_ext_files: Counter = Counter()
+        self.by_ext_tokens: Counter = Counter()
+        self.by_ext_bytes: Counter = Counter()
+        self.blocked_sensitive: List[str] = []
+        self.sensitive_included: List[str] = []
+        self.secret_findings: List[Tuple[str, int, str]] = []
+        self.skipped_binary: List[FileRecord] = []
+        self.skipped_large: List[FileRecord] = []
+        self.errors: List[Tuple[str, str]] = []
+        self.walk_skipped: List[Tuple[str, str]] = []
+        self.tree = DirTree()
+        self.stats = FileStats()
+        self.cache_stats = None
+        self.notices: List[str] = []
+        self.complete = True
+
+    def add(self, record: FileRecord) -> None:
+        ext = os.path.splitext(record.path)[1].lower() or "<no-ext>"
+        self.files += 1
+        self.tokens += record.tokens
+        self.bytes += record.bytes
+        self.by_ext_files[ext] += 1
+        self.by_ext_tokens[ext] += record.tokens
+        self.by_ext_bytes[ext] += record.bytes
+        self.tree.add(record.path, record.tokens, record.bytes)
+        self.stats.add(record.path, record.tokens, record.bytes, record.lines)
+
+    def __repr__(self) -> str:
+        return f"ScanSummary(files={self.files}, tokens={self.tokens}, bytes={self.bytes}, tokenizer={self.tokenizer!r})"
+
+
+def select_encoder(tokenizer: Optional[str]) -> Tuple[Any, str]:
+    """Return (encoder, tokenizer name) for a tokenizer option; None means cl100k_base when tiktoken is installed."""
+    name = default_tokenizer() if tokenizer is None else tokenizer
+    return get_encoder(name), name
+
+
+def scan_repo(
+    root_dir: str,
+    *,
+    allow_secrets: bool = False,
+    respect_gitignore: bool = True,
+    source: str = 'walk',
+    jobs: int = 1,
+    keep_content: bool = False,
+    tokenizer: Optional[str] = None,
+    calibrate: bool = False,
+    stat_only: bool = False,
+    cache: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    track: bool = False,
+    previous: Optional[Manifest] = None,
+    sniff_binary: bool = True,
+    max_file_bytes: Optional[int] = None,
+    max_file_tokens: Optional[int] = None,
+    oversize: str = 'skip',
+    scan_secrets: bool = False,
+    follow_symlinks: bool = False,
+    max_dir_depth: Optional[int] = None,
+    max_dir_entries: Optional[int] = None,
+    metrics: Optional[RunMetrics] = None,
+    stop_on_blocked: bool = False,
+    matcher: Optional[IgnoreMatcher] = None,
+    dirs: Optional[Set[str]] = None,
+    links: Optional[Dict[Tuple[int, int], str]] = None,
+) -> Iterator[Union[FileRecord, ScanSummary]]:
+    """
+    Scan the repository at root_dir, yielding a FileRecord for every
+    included file in enumeration order, then one ScanSummary.
+
+    Files are enumerated and filtered as in export_repo_as_text and read in
+    a pool of jobs workers; records are yielded as results arrive, so
+    nothing but the summary accumulates. keep_content keeps each file's
+    text on its record; otherwise content is read again on access.
+
+    stat_only with tokenizer='estimate' counts tokens from stat sizes
+    without reading (not with track). track records digests and stat
+    signatures; previous (a Manifest) lets files whose stat signature is
+    unchanged be taken from it without reading. With stop_on_blocked the
+    scan yields an incomplete summary right after enumeration when
+    sensitive files were blocked. scan_secrets runs the content secret
+    scanner (see scan_text) over every file in the read pass, in the
+    workers when jobs > 1; files are then always read, so neither
+    stat_only nor previous skips reading. follow_symlinks,
+    max_dir_depth and max_dir_entries control the walk (see walk_files),
+    which also fills dirs and links when given. A matcher replaces the
+    rules of IgnoreMatcher.for_root(root_dir, respect_gitignore) and
+    collects the nested .gitignore files the walk reads.
+    Its stats are reused by the cache lookup, the manifest check and the
+    stat-only estimate. The cache, calibration, binary and size-limit
+    options are those of export_repo_as_text; metrics (a RunMetrics)
+    receives phase timings and skip events.
+    """
+    if oversize not in OVERSIZE_MODES:
+        raise ValueError(f"unknown oversize mode: {oversize!r}")
+    timing = metrics is not None
+    metrics = metrics or RunMetrics(slowest=0)
+    if matcher is None:
+        matcher = IgnoreMatcher.for_root(root_dir, respect_gitignore)
+
+    metrics.mark('encoder_load')
+    load_start = time.perf_counter()
+    encoder, tokenizer_name = select_encoder(tokenizer)
+    metrics.encoder_loaded(tokenizer_name, time.perf_counter() - load_start)
+    estimator = encoder if isinstance(encoder, TokenEstimator) else None
+    summary = ScanSummary(tokenizer_name, encoder)
+
+    track = track or previous is not None
+    stat_estimate = estimator is not None and stat_only and not track and not scan_secrets
+    # Stat in the walk only when something looks at sizes before reading; the read itself stats the open file
+    need_stat = stat_estimate or cache or cache_dir is not None or previous is not None
+
+    metrics.mark('walk')
+    if timing:
+        matcher = TimedMatcher(matcher, metrics)
+    if source == 'git-index':
+        enumerated: Iterable[Tuple[str, Optional[FileStat]]] = ((rel_path, None) for rel_path in iter_index_files(root_dir, matcher))
+    elif source == 'walk':
+        enumerated = walk_files(root_dir, matcher, stat=need_stat, follow_symlinks=follow_symlinks, max_depth=max_dir_depth, max_dir_entries=max_dir_entries, skipped=summary.walk_skipped, dirs=dirs, links=links)
+    else:
+        raise ValueError(f"unknown source: {source!r}")
+
+    candidates: List[str] = []
+    candidate_stats: List[Optional[FileStat]] = []
+    for rel_path, st in enumerated:
+        # sensitive check by pattern (path-level)
+        if matcher.is_sensitive(rel_path):
+            if not allow_secrets:
+                summary.blocked_sensitive.append(rel_path)
+                metrics.skipped(rel_path, "sensitive")
+                continue
+            summary.sensitive_included.append(rel_path)
+        candidates.append(rel_path)
+        candidate_stats.append(st)
+    for rel_path, reason in summary.walk_skipped:
+        metrics.skipped(rel_path, reason)
+
+    if summary.blocked_sensitive and stop_on_blocked:
+        summary.complete = False
+        yield summary
+        return
+
+    if estimator is not None and calibrate:
+        metrics.mark('calibrate')
+        exact_encoder = load_encoder()
+        if exact_encoder is None:
+            summary.notices.append("[estimate] tiktoken is not installed; using default ratios")
+        else:
+            encoder = estimator = summary.encoder = TokenEstimator.calibrate(sample_for_calibration(root_dir, candidates), exact_encoder)
+
+    metrics.mark('read')
+    token_cache: Optional[TokenCache] = None
+    if cache or cache_dir is not None:
+        # estimates depend on the ratio table, which calibration changes
+        cache_key = tokenizer_name if estimator is None else estimator.cache_key()
+        if cache_dir is None:
+            token_cache = TokenCache.for_root(root_dir, cache_key, max_bytes=cache_max_bytes)
+        else:
+            token_cache = TokenCache(cache_dir, cache_key, max_bytes=cache_max_bytes)
+
+    # Files whose stat signature matches the previous manifest are not read again
+    reused: Dict[str, Dict[str, Any]] = {}
+    to_read, to_read_stats = candidates, candidate_stats
+    if previous is not None and previous.tokenizer == tokenizer_name and not scan_secrets:
+        to_read, to_read_stats = [], []
+        for rel_path, st in zip(candidates, candidate_stats):
+            try:
+                entry = previous.unchanged(rel_path, st or os.stat(os.path.join(root_dir, rel_path)))
+            except OSError:
+                entry = None
+            limit = file_byte_limit(rel_path, max_file_bytes, max_file_tokens)
+            if entry is not None and (limit is None or entry["bytes"] <= limit):
+                reused[rel_path] = {"path": rel_path, **entry}
+            else:
+                to_read.append(rel_path)
+                to_read_stats.append(st)
+
+    if stat_estimate:
+        results = estimate_files(root_dir, to_read, estimator, max_file_bytes, max_file_tokens, oversize, stats=to_read_stats)
+    else:
+        results = read_files(root_dir, to_read, encoder, jobs, keep_content=keep_content, cache=token_cache, track=track, sniff_binary=sniff_binary, max_file_bytes=max_file_bytes, max_file_tokens=max_file_tokens, oversize=oversize, timing=timing, scan_secrets=scan_secrets, stats=to_read_stats)
+    try:
+        for rel_path in candidates:
+            info = reused.get(rel_path)
+            if info is None:
+                _, info, error = next(results)
+                if info is not None:
+                    metrics.record_file(info)
+            if info is None:
+                summary.errors.append((rel_path, error))
+                metrics.skipped(rel_path, f"read error: {error}")
+                continue
+            record = FileRecord.from_info(root_dir, info)
+            if info.get("binary"):
+                summary.skipped_binary.append(record)
+                metrics.skipped(rel_path, "binary")
+                continue
+            if info.get("oversized"):
+                summary.skipped_large.append(record)
+                metrics.skipped(rel_path, "oversized")
+                continue
+            for line, rule in info.get("secrets", ()):
+                summary.secret_findings.append((rel_path, line, rule))
+            summary.add(record)
+            yield record
+    finally:
+        # shuts the worker pool down now rather than when the generator is collected
+        results.close()
+        if token_cache is not None:
+            token_cache.close()
+            summary.cache_stats = token_cache.stats
+    yield summary
@@ -0,0 +1,99 @@
+import re
+import math
+import functools
+from collections import Counter
+from typing import List, Tuple
+
+# Provider key formats: (rule name, pattern). Each pattern starts with a
+# literal character and must not follow a letter, digit or underscore.
+KEY_FORMATS = (
+    ('aws_access_key_id', r'A(?:KIA|SIA|GPA|IDA|ROA)[0-9A-Z]{16}\b'),
+    ('github_token', r'gh[pousr]_[A-Za-z0-9]{36,}'),
+    ('github_token', r'github_pat_[A-Za-z0-9_]{60,}'),
+    ('gitlab_token', r'glpat-[A-Za-z0-9_-]{20,}'),
+    ('slack_token', r'xox[abposr]-[A-Za-z0-9-]{10,}'),
+    ('stripe_key', r'sk_live_[A-Za-z0-9]{24,}'),
+    ('stripe_key', r'rk_live_[A-Za-z0-9]{24,}'),
+    ('google_api_key', r'AIza[0-9A-Za-z_-]{35}'),
+    ('openai_api_key', r'sk-[A-Za-z0-9_-]{32,}'),
+    ('npm_token', r'npm_[A-Za-z0-9]{36}\b'),
+)
+
+PRIVATE_KEY = r'-----BEGIN (?:[A-Z0-9]+ )*PRIVATE KEY'
+
+# Names that make an assigned literal suspect; matched as written, in UPPER and in Capitalized case
+SECRET_NAMES = ('secret', 'password', 'passwd', 'token', 'api_key', 'api-key', 'apikey', 'apiKey', 'access_key', 'accessKey', 'auth', 'credential')
+
+# The rest of an assignment after the name; the group is the assigned value
+_ASSIGNMENT = r'[\w.-]*["\']?[ \t]*(?::=|=>|[:=])[ \t]*[rbu]?["\']?([A-Za-z0-9+/_.~-]{16,}={0,2})'
+
+# Minimum Shannon entropy, in bits per character, of an assigned value
+MIN_ENTROPY = 3.5
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled():
+    """
+    Build the single matcher on first use, so importing the module costs
+    nothing when contents are not scanned. re only skips ahead quickly when every
+    top-level alternative starts with a literal, so the alternatives are
+    kept flat and each ends in an empty group; the index of the last group
+    that matched names the rule.
+    """
+    rules: List[Tuple[str, bool]] = []
+    branches: List[str] = []
+    groups = 0
+
+    def branch(rule: str, pattern: str, boundary: bool) -> None:
+        nonlocal groups
+        groups += re.compile(pattern).groups + 1
+        rules.extend([('', False)] * (groups - len(rules) - 1))
+        rules.append((rule, boundary))
+        branches.append(f'{pattern}()')
+
+    branch('private_key', PRIVATE_KEY, False)
+    for rule, pattern in KEY_FORMATS:
+        branch(rule, pattern, True)
+    for name in SECRET_NAMES:
+        for variant in dict.fromkeys((name, name.upper(), name[:1].upper() + name[1:])):
+            branch('high_entropy_assignment', re.escape(variant) + _ASSIGNMENT, False)
+    return re.compile('|'.join(branches)), [('', False)] + rules
+
+
+
+def shannon_entropy(text: str) -> float:
+    if not text:
+        return 0.0
+    n = len(text)
+    return -sum(c / n * math.log2(c / n) for c in Counter(text).values())
+
+
+def _random_enough(value: str) -> bool:
+    # Mixed letters and digits rule out dotted names like settings.DATABASE_PASSWORD
+    return any(c.isdigit() for c in value) and any(c.isalpha() for c in value) and shannon_entropy(value) >= MIN_ENTROPY
+
+
+def scan_text(text: str) -> List[Tuple[int, str]]:
+    """
+    Return (line number, rule name) for every likely secret in text, in
+    order, at most one per rule and line: private key headers, provider key
+    formats (KEY_FORMATS) and secret-sounding names assigned random-looking
+    literals. The matched text itself is never returned, so findings are
+    safe to print.
+    """
+    findings: List[Tuple[int, str]] = []
+    line = 1
+    pos = 0
+    matcher, rules = _compiled()
+    for m in matcher.finditer(text):
+        rule, boundary = rules[m.lastindex]
+        start = m.start()
+        if boundary and start and (text[start - 1].isalnum() or text[start - 1] == '_'):
+            continue
+        if rule == 'high_entropy_assignment' and not _random_enough(m.group(m.lastindex - 1)):
+            continue
+        line += text.count('\n', pos, start)
+        pos = start
+        if not findings or findings[-1] != (line, rule):
+            findings.append((line, rule))
+    return findings
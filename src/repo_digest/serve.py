@@ -0,0 +1,460 @@
+import io
+import os
+import json
+import errno
+import time
+import hashlib
+import ipaddress
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .core import write_dir_tree
+from .fileio import is_minified
+from .ignore import IgnoreMatcher
+from .reader import ReadOptions, read_file_info
+from .scan import FileRecord, scan_repo, select_encoder
+from .tokenizers import DEFAULT_TOKENIZER, TokenizerError, available_tokenizers
+from .walk import walk_files
+from .watch import InotifyWatcher, LiveIndex
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_RESULT_CACHE_BYTES = 256 * 1024 * 1024
+# Host headers the server answers to (besides the address it is bound to);
+# anything else may be a DNS-rebinding page in the user's browser
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+def is_loopback(host: str) -> bool:
+    """Whether host (a name or an address) is this machine's loopback interface."""
+    if host == 'localhost':
+        return True
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    mapped = getattr(address, 'ipv4_mapped', None)
+    return (mapped or address).is_loopback
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of rendered responses, bounded by the total size of the
+    stored bodies. Bodies larger than the whole budget are not stored.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_RESULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries: 'OrderedDict[Tuple, Tuple[int, str, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Tuple[int, str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, entry: Tuple[int, str, bytes]) -> None:
+        body = entry[2]
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[2])
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evicted += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+
+def tree_fingerprint(root_dir: str, respect_gitignore: bool = True) -> str:
+    """
+    Hash of the path, size, mtime and inode of every file an export would
+    consider. It only walks and stats, so it is far cheaper than a scan, and
+    it changes whenever a file is added, removed or edited.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for rel_path, st in walk_files(root_dir, IgnoreMatcher.for_root(root_dir, respect_gitignore), stat=True):
+        if st is None:
+            continue
+        h.update(f"{rel_path}\0{st.st_size}\0{st.st_mtime_ns}\0{st.st_ino}\n".encode('utf-8', 'surrogateescape'))
+    return h.hexdigest()
+
+
+class TreeWatch:
+    """
+    A change counter for one repository: an inotify watch on every
+    directory an export walks, read without blocking on each request, so
+    an unchanged tree costs one read() instead of a stat of every file.
+    After a change the directories are listed again (names only, no file
+    stats) to pick up new directories and .gitignore edits.
+
+    Raises OSError where inotify is unavailable or a directory cannot be
+    watched; fingerprint() returns None once that happens later on.
+    """
+
+    def __init__(self, root_dir: str, respect_gitignore: bool = True) -> None:
+        self.root_dir = root_dir
+        self.respect_gitignore = respect_gitignore
+        self.generation = 0
+        self.dirs: Set[str] = set()
+        self._lock = threading.Lock()
+        self._list_dirs()
+        self.watcher: Optional[InotifyWatcher] = InotifyWatcher(self)
+        if self.watcher.sync():
+            self.close()
+            raise OSError(errno.ENOSPC, f"cannot watch every directory of {root_dir}")
+
+    def _list_dirs(self) -> None:
+        dirs: Set[str] = set()
+        for _ in walk_files(self.root_dir, IgnoreMatcher.for_root(self.root_dir, self.respect_gitignore), dirs=dirs):
+            pass
+        self.dirs = dirs
+
+    def fingerprint(self) -> Optional[str]:
+        with self._lock:
+            if self.watcher is None:
+                return None
+            if self.watcher.poll():
+                self.generation += 1
+                self._list_dirs()
+                if self.watcher.sync():
+                    self.close()
+                    return None
+            return f"watch:{self.generation}"
+
+    def close(self) -> None:
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str, **extra: Any) -> None:
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+# Query parameters accepted by every endpoint, and how to parse them
+_OPTIONS = {
+    'tokenizer': str,
+    'no_gitignore': bool,
+    'no_binary_sniff': bool,
+    'max_file_bytes': int,
+    'max_file_tokens': int,
+    'oversize': str,
+    # /tree only
+    'depth': int,
+    'min_tokens': int,
+}
+
+
+def _parse_options(query: Dict[str, List[str]]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {}
+    for name, kind in _OPTIONS.items():
+        if name not in query:
+            continue
+        value = query[name][-1]
+        if kind is bool:
+            options[name] = value.lower() in ('1', 'true', 'yes', 'on', '')
+        elif kind is int:
+            try:
+                options[name] = int(value)
+            except ValueError:
+                raise RequestError(400, f"{name} must be an integer")
+        else:
+            options[name] = value
+    if options.get('oversize', 'skip') not in ('skip', 'head', 'head-tail'):
+        raise RequestError(400, "oversize must be skip, head or head-tail")
+    if options.get('tokenizer', DEFAULT_TOKENIZER) not in available_tokenizers():
+        raise RequestError(400, f"tokenizer must be one of: {', '.join(available_tokenizers())}")
+    return options
+
+
+def _scan_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(
+        respect_gitignore=not options.get('no_gitignore', False),
+        tokenizer=options.get('tokenizer'),
+        sniff_binary=not options.get('no_binary_sniff', False),
+        max_file_bytes=options.get('max_file_bytes'),
+        max_file_tokens=options.get('max_file_tokens'),
+        oversize=options.get('oversize', 'skip'),
+    )
+
+
+def _json(status: int, data: Any) -> Tuple[int, str, bytes]:
+    return status, 'application/json', (json.dumps(data, indent=2, sort_keys=True) + '\n').encode('utf-8')
+
+
+def _text(text: str) -> Tuple[int, str, bytes]:
+    return 200, 'text/plain; charset=utf-8', text.encode('utf-8')
+
+
+def _blocked(paths: Iterable[str]) -> RequestError:
+    return RequestError(403, "sensitive-looking files were blocked; restart the server with --allow-secrets if you know what you're doing", blocked=sorted(paths))
+
+
+class DigestService:
+    """
+    The work behind the HTTP endpoints, independent of the transport.
+
+    Every result is cached under (endpoint, repository, options, extra,
+    fingerprint), where the fingerprint is the change count of the
+    repository's TreeWatch for whole-tree results (tree_fingerprint where
+    inotify is unavailable) and the file's stat signature for single files,
+    so a repeat request for an unchanged tree is served from memory.
+
+    Only repositories inside allowed_roots (default: the current directory)
+    are served. allow_secrets holds for every request; clients cannot turn
+    it on.
+    """
+
+    def __init__(self, *, allowed_roots: Iterable[str] = (), allow_secrets: bool = False, cache_max_bytes: int = DEFAULT_RESULT_CACHE_BYTES, jobs: int = 1) -> None:
+        self.allowed_roots = [os.path.realpath(r) for r in (list(allowed_roots) or [os.getcwd()])]
+        self.allow_secrets = allow_secrets
+        self.cache = ResultCache(cache_max_bytes)
+        self.jobs = jobs
+        self._watches: Dict[Tuple[str, bool], Optional[TreeWatch]] = {}
+        self._watches_lock = threading.Lock()
+        self.started = time.time()
+        # the first load pays for reading the BPE ranks; later requests reuse it
+        start = time.perf_counter()
+        self.encoder, self.tokenizer_name = select_encoder(None)
+        self.encoder_load_seconds = time.perf_counter() - start
+
+    def resolve_repo(self, query: Dict[str, List[str]]) -> str:
+        if 'repo' not in query:
+            raise RequestError(400, "missing repo parameter")
+        repo = os.path.realpath(query['repo'][-1])
+        if not os.path.isdir(repo):
+            raise RequestError(404, f"not a directory: {repo}")
+        if not any(os.path.commonpath([repo, r]) == r for r in self.allowed_roots):
+            raise RequestError(403, f"repository is outside the allowed roots: {repo}")
+        return repo
+
+    def fingerprint(self, repo: str, respect_gitignore: bool = True) -> str:
+        """The repository's TreeWatch change count, or tree_fingerprint without inotify."""
+        key = (repo, respect_gitignore)
+        with self._watches_lock:
+            if key not in self._watches:
+                try:
+                    self._watches[key] = TreeWatch(repo, respect_gitignore)
+                except OSError:
+                    self._watches[key] = None
+            watch = self._watches[key]
+        fingerprint = watch.fingerprint() if watch is not None else None
+        return fingerprint if fingerprint is not None else tree_fingerprint(repo, respect_gitignore)
+
+    def close(self) -> None:
+        with self._watches_lock:
+            for watch in self._watches.values():
+                if watch is not None:
+                    watch.close()
+            self._watches.clear()
+
+    def handle(self, endpoint: str, query: Dict[str, List[str]]) -> Tuple[Tuple[int, str, bytes], bool]:
+        """Return ((status, content type, body), served_from_cache)."""
+        if endpoint == '/healthz':
+            return _json(200, {"status": "ok", "tokenizer": self.tokenizer_name, "encoder_load_seconds": self.encoder_load_seconds, "uptime": time.time() - self.started, "cache": self.cache.stats()}), False
+        handlers = {'/preview': self.preview, '/digest': self.digest, '/tree': self.tree, '/file': self.file}
+        handler = handlers.get(endpoint)
+        if handler is None:
+            raise RequestError(404, f"unknown endpoint: {endpoint}")
+        repo = self.resolve_repo(query)
+        options = _parse_options(query)
+        rel_path = None
+        if endpoint == '/file':
+            rel_path = self._resolve_file(repo, query)
+            try:
+                st = os.stat(os.path.join(repo, rel_path))
+            except OSError:
+                raise RequestError(404, f"no such file: {rel_path}")
+            fingerprint = f"{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+        else:
+            fingerprint = self.fingerprint(repo, not options.get('no_gitignore', False))
+        key = (endpoint, repo, tuple(sorted(options.items())), rel_path, fingerprint)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached, True
+        result = handler(repo, options, rel_path) if endpoint == '/file' else handler(repo, options)
+        self.cache.put(key, result)
+        return result, False
+
+    def _resolve_file(self, repo: str, query: Dict[str, List[str]]) -> str:
+        if 'path' not in query:
+            raise RequestError(400, "missing path parameter")
+        rel_path = os.path.normpath(query['path'][-1].replace('/', os.sep))
+        if os.path.isabs(rel_path) or rel_path == os.pardir or rel_path.startswith(os.pardir + os.sep):
+            raise RequestError(400, "path must be relative to the repository")
+        real = os.path.realpath(os.path.join(repo, rel_path))
+        if os.path.commonpath([real, repo]) != repo:
+            raise RequestError(400, "path escapes the repository")
+        return rel_path
+
+    def _scan(self, repo: str, options: Dict[str, Any], **kwargs: Any) -> Tuple[List[FileRecord], Any]:
+        records: List[FileRecord] = []
+        summary = None
+        for item in scan_repo(repo, allow_secrets=self.allow_secrets, jobs=self.jobs, stop_on_blocked=not self.allow_secrets, **_scan_options(options), **kwargs):
+            if isinstance(item, FileRecord):
+                records.append(item)
+            else:
+                summary = item
+        if summary.blocked_sensitive and not self.allow_secrets:
+            raise _blocked(summary.blocked_sensitive)
+        return records, summary
+
+    def preview(self, repo: str, options: Dict[str, Any]) -> Tuple[int, str, bytes]:
+        _, summary = self._scan(repo, options, stat_only=True)
+        data = {
+            "repo": repo,
+            "tokenizer": summary.tokenizer,
+            "files": summary.files,
+            "tokens": summary.tokens,
+            "bytes": summary.bytes,
+            "by_extension": {
+                ext: {"files": summary.by_ext_files[ext], "tokens": summary.by_ext_tokens[ext], "bytes": summary.by_ext_bytes[ext]}
+                for ext in sorted(summary.by_ext_files)
+            },
+            "skipped_binary": len(summary.skipped_binary),
+            "skipped_large": len(summary.skipped_large),
+            "errors": [{"path": p, "error": e} for p, e in summary.errors],
+        }
+        if hasattr(summary.encoder, 'bounds'):
+            data["estimate_bounds"] = list(summary.encoder.bounds(summary.by_ext_tokens))
+        return _json(200, data)
+
+    def tree(self, repo: str, options: Dict[str, Any]) -> Tuple[int, str, bytes]:
+        _, summary = self._scan(repo, options)
+        buf = io.StringIO()
+        write_dir_tree(buf, summary.tree, options.get('depth'), options.get('min_tokens'))
+        return _text(buf.getvalue().lstrip('\n'))
+
+    def digest(self, repo: str, options: Dict[str, Any]) -> Tuple[int, str, bytes]:
+        index = LiveIndex(repo, allow_secrets=self.allow_secrets, jobs=self.jobs, **_scan_options(options))
+        index.build()
+        if index.blocked_sensitive and not index.allow_secrets:
+            raise _blocked(index.blocked_sensitive)
+        buf = io.StringIO()
+        index.render(buf)
+        return _text(buf.getvalue())
+
+    def file(self, repo: str, options: Dict[str, Any], rel_path: str) -> Tuple[int, str, bytes]:
+        matcher = IgnoreMatcher.for_root(repo, not options.get('no_gitignore', False))
+        parts = rel_path.split(os.sep)
+        for i in range(1, len(parts)):
+            matcher.load_dir(os.sep.join(parts[:i]))
+        if matcher.is_ignored(rel_path, check_sensitive=False) or is_minified(parts[-1]):
+            raise RequestError(404, f"file is excluded from digests: {rel_path}")
+        if matcher.is_sensitive(rel_path) and not self.allow_secrets:
+            raise _blocked([rel_path])
+        scan_options = _scan_options(options)
+        encoder, tokenizer_name = select_encoder(scan_options['tokenizer'])
+        read_options = ReadOptions(True, False, scan_options['sniff_binary'], scan_options['max_file_bytes'], scan_options['max_file_tokens'], scan_options['oversize'])
+        try:
+            info = read_file_info(repo, rel_path, encoder, read_options)
+        except OSError as e:
+            raise RequestError(404, str(e))
+        info["tokenizer"] = tokenizer_name
+        return _json(200, info)
+
+
+class DigestRequestHandler(BaseHTTPRequestHandler):
+    server_version = "repo-digest"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        try:
+            if not self.server.client_allowed(self.client_address[0]):
+                raise RequestError(403, "only local clients are served")
+            if not self.server.host_allowed(self.headers.get('Host')):
+                raise RequestError(403, "unexpected Host header")
+            (status, content_type, body), hit = self.server.service.handle(url.path.rstrip('/') or '/', query)
+        except RequestError as e:
+            (status, content_type, body), hit = _json(e.status, {"error": str(e), **e.extra}), False
+        except TokenizerError as e:
+            (status, content_type, body), hit = _json(400, {"error": str(e)}), False
+        except Exception as e:  # keep serving after a failed request
+            (status, content_type, body), hit = _json(500, {"error": f"{type(e).__name__}: {e}"}), False
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Repo-Digest-Cache", "hit" if hit else "miss")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class DigestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: DigestService, quiet: bool = False, allow_remote: bool = False) -> None:
+        super().__init__(address, DigestRequestHandler)
+        self.service = service
+        self.quiet = quiet
+        self.allow_remote = allow_remote
+
+    def client_allowed(self, client: str) -> bool:
+        return self.allow_remote or is_loopback(client)
+
+    def host_allowed(self, host: Optional[str]) -> bool:
+        """Whether a request's Host header names this machine (LOCAL_HOSTS, or the bound address with allow_remote)."""
+        if not host:
+            return False
+        name = urlsplit('//' + host).hostname
+        return name in LOCAL_HOSTS or (self.allow_remote and name == self.server_address[0])
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.service.close()
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, *, quiet: bool = False, allow_remote: bool = False, **service_options: Any) -> DigestServer:
+    """
+    Create (but do not start) a server; port 0 picks a free port.
+
+    The server has no authentication, so host must be a loopback address
+    unless allow_remote is set; without it, requests from other machines
+    are refused as well.
+    """
+    if not allow_remote and not is_loopback(host):
+        raise ValueError(f"refusing to bind {host}: not a loopback address (pass allow_remote to serve other machines)")
+    return DigestServer((host, port), DigestService(**service_options), quiet=quiet, allow_remote=allow_remote)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **service_options: Any) -> int:
+    server = make_server(host, port, **service_options)
+    service = server.service
+    if server.allow_remote:
+        print(f"[serve] WARNING: serving {host} without authentication; any client that can reach it can read the allowed roots")
+    print(f"[serve] tokenizer {service.tokenizer_name} loaded in {service.encoder_load_seconds * 1000:.0f} ms")
+    print(f"[serve] listening on http://{server.server_address[0]}:{server.server_address[1]} (endpoints: /preview /digest /tree /file /healthz)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
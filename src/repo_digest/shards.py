@@ -0,0 +1,213 @@
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .fileio import count_tokens, file_text, write_file_section
+
+
+class ShardPiece:
+    """
+    A whole file, or a line range of a file that was too large for one
+    shard. A range also records where it starts and ends in the file's
+    text (start_offset, end_offset, in characters), so it can be sliced
+    out without splitting the file again.
+    """
+
+    __slots__ = ('info', 'part', 'parts', 'start_line', 'end_line', 'start_offset', 'end_offset', 'tokens', 'bytes', 'lines')
+
+    def __init__(self, info: Dict[str, Any], tokens: int, size: int, lines: int, part: int = 1, parts: int = 1, start_line: int = 0, end_line: int = 0, start_offset: int = 0, end_offset: int = 0) -> None:
+        self.info = info
+        self.tokens = tokens
+        self.bytes = size
+        self.lines = lines
+        self.part = part
+        self.parts = parts
+        self.start_line = start_line
+        self.end_line = end_line
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+    @property
+    def path(self) -> str:
+        return self.info["path"]
+
+    @property
+    def is_split(self) -> bool:
+        return self.parts > 1
+
+    def header(self) -> str:
+        if self.is_split:
+            title = f"{self.path} (part {self.part}/{self.parts}, lines {self.start_line + 1}-{self.end_line})"
+        else:
+            title = self.path
+        return f"\n===== FILE: {title} =====\n[TOKENS: {self.tokens} | LINES: {self.lines} | BYTES: {self.bytes}]\n"
+
+
+class Shard:
+    __slots__ = ('number', 'pieces', 'tokens', 'bytes')
+
+    def __init__(self, number: int) -> None:
+        self.number = number
+        self.pieces: List[ShardPiece] = []
+        self.tokens = 0
+        self.bytes = 0
+
+    def add(self, piece: ShardPiece, tokens: int, size: int) -> None:
+        self.pieces.append(piece)
+        self.tokens += tokens
+        self.bytes += size
+
+
+def shard_path(output_file: str, number: int) -> str:
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}.part-{number:03d}{ext or '.txt'}"
+
+
+def shard_index_path(output_file: str) -> str:
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}.index{ext or '.txt'}"
+
+
+class _Limits:
+    def __init__(self, max_tokens: Optional[int], max_bytes: Optional[int], reserve_tokens: int, reserve_bytes: int) -> None:
+        self.tokens = None if max_tokens is None else max(1, max_tokens - reserve_tokens)
+        self.bytes = None if max_bytes is None else max(1, max_bytes - reserve_bytes)
+
+    def fits(self, tokens: int, size: int) -> bool:
+        return (self.tokens is None or tokens <= self.tokens) and (self.bytes is None or size <= self.bytes)
+
+
+def plan_shards(root_dir: str, file_infos: List[Dict[str, Any]], encoder=None, *, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None) -> List[Shard]:
+    """
+    Pack files, in the given order, into shards whose tokens and bytes
+    (file headers included) stay under the ceilings. Files are kept whole
+    when they fit in a shard; larger files are split on line boundaries.
+    A single line longer than the ceiling still becomes its own piece.
+    """
+    if max_tokens is None and max_bytes is None:
+        raise ValueError("plan_shards needs max_tokens or max_bytes")
+    reserve = _shard_header(Shard(999), 999, 10 ** 9, 10 ** 12, 10 ** 12, "x" * 16)
+    limits = _Limits(max_tokens, max_bytes, count_tokens(reserve, encoder), len(reserve.encode('utf-8')))
+
+    def cost(piece: ShardPiece):
+        header = piece.header()
+        return piece.tokens + count_tokens(header, encoder), piece.bytes + len(header.encode('utf-8')) + 1
+
+    shards: List[Shard] = [Shard(1)]
+
+    def place(piece: ShardPiece) -> None:
+        tokens, size = cost(piece)
+        current = shards[-1]
+        if current.pieces and not limits.fits(current.tokens + tokens, current.bytes + size):
+            current = Shard(len(shards) + 1)
+            shards.append(current)
+        current.add(piece, tokens, size)
+
+    for info in file_infos:
+        piece = ShardPiece(info, info["tokens"], info["bytes"], info["lines"])
+        if limits.fits(*cost(piece)):
+            place(piece)
+            continue
+        for piece in _split_file(root_dir, info, encoder, limits):
+            place(piece)
+
+    if not shards[-1].pieces and len(shards) > 1:
+        shards.pop()
+    return shards
+
+
+def _split_file(root_dir: str, info: Dict[str, Any], encoder, limits: _Limits) -> List[ShardPiece]:
+    lines = file_text(root_dir, info).splitlines(keepends=True)
+    # leave room for the piece header
+    widest = ShardPiece(info, 10 ** 9, 10 ** 12, 10 ** 9, 999, 999, 10 ** 9, 10 ** 9).header()
+    header_tokens = count_tokens(widest, encoder)
+    header_bytes = len(widest.encode('utf-8')) + 1
+    pieces: List[ShardPiece] = []
+    start = start_offset = offset = 0
+    tokens = size = 0
+    for i, line in enumerate(lines):
+        line_tokens = count_tokens(line, encoder)
+        line_bytes = len(line.encode('utf-8'))
+        if i > start and not limits.fits(tokens + line_tokens + header_tokens, size + line_bytes + header_bytes):
+            pieces.append(ShardPiece(info, tokens, size, i - start, start_line=start, end_line=i, start_offset=start_offset, end_offset=offset))
+            start, start_offset, tokens, size = i, offset, 0, 0
+        tokens += line_tokens
+        size += line_bytes
+        offset += len(line)
+    if lines:
+        pieces.append(ShardPiece(info, tokens, size, len(lines) - start, start_line=start, end_line=len(lines), start_offset=start_offset, end_offset=offset))
+    for n, piece in enumerate(pieces, 1):
+        piece.part = n
+        piece.parts = len(pieces)
+    return pieces
+
+
+def _shard_header(shard: Shard, count: int, files: int, tokens: int, size: int, tokenizer: str) -> str:
+    return (
+        f"===== REPO SHARD {shard.number}/{count} =====\n"
+        f"Generated: {datetime.now().isoformat()}\n"
+        f"Tokenizer: {tokenizer}\n"
+        f"Shard files: {len(shard.pieces)}\n"
+        f"Shard tokens: {shard.tokens}\n"
+        f"Shard bytes: {shard.bytes}\n"
+        f"Repository totals: files={files}, tokens={tokens}, bytes={size}\n"
+        "\n===== FILES =====\n"
+    )
+
+
+class _SplitTexts:
+    """
+    The text of every split file, read once for all of its pieces (which
+    may sit in several shards written concurrently) and released once its
+    last piece has been written.
+    """
+
+    def __init__(self, root_dir: str, shards: List[Shard]) -> None:
+        self.root_dir = root_dir
+        self._remaining = Counter(piece.path for shard in shards for piece in shard.pieces if piece.is_split)
+        self._texts: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def piece_text(self, piece: ShardPiece) -> str:
+        with self._lock:
+            entry = self._texts.setdefault(piece.path, [threading.Lock(), None])
+        with entry[0]:
+            if entry[1] is None:
+                entry[1] = file_text(self.root_dir, piece.info)
+            text = entry[1][piece.start_offset:piece.end_offset]
+        with self._lock:
+            self._remaining[piece.path] -= 1
+            if not self._remaining[piece.path]:
+                del self._texts[piece.path]
+        return text
+
+
+def _write_shard(root_dir: str, shard: Shard, path: str, header: str, split_texts: _SplitTexts) -> None:
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write(header)
+        for piece in shard.pieces:
+            if not piece.is_split:
+                write_file_section(out, root_dir, piece.info)
+                continue
+            out.write(piece.header())
+            out.write(split_texts.piece_text(piece))
+            out.write('\n')
+
+
+def write_shards(root_dir: str, shards: List[Shard], output_file: str, *, tokenizer: str, total_files: int, total_tokens: int, total_bytes: int, jobs: Optional[int] = None) -> List[str]:
+    """Write every shard to its own part file concurrently and return the part paths."""
+    paths = [shard_path(output_file, shard.number) for shard in shards]
+    headers = [_shard_header(shard, len(shards), total_files, total_tokens, total_bytes, tokenizer) for shard in shards]
+    split_texts = _SplitTexts(root_dir, shards)
+    workers = max(1, min(len(shards), jobs or os.cpu_count() or 1))
+    if workers == 1:
+        for shard, path, header in zip(shards, paths, headers):
+            _write_shard(root_dir, shard, path, header, split_texts)
+        return paths
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() re-raises the first write error, if any
+        list(pool.map(_write_shard, [root_dir] * len(shards), shards, paths, headers, [split_texts] * len(shards)))
+    return paths
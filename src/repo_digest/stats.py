@@ -0,0 +1,185 @@
+import os
+import csv
+import math
+import json
+import heapq
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+STATS_VERSION = 1
+
+# Numeric per-file columns
+STAT_COLUMNS = ('tokens', 'bytes', 'lines')
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class FileStats:
+    """
+    Per-file tokens, bytes and lines, stored by column.
+
+    Each column is an array of 64-bit integers, and each row is about 30
+    bytes on top of its file name. A path is split into its directory and
+    name. Directories and extensions are interned once and stored per row
+    as an index. Rows keep insertion order. Top-N queries select with a
+    heap instead of sorting, and ties keep insertion order just as a
+    stable sort would.
+    """
+
+    __slots__ = ('names', 'dir_ids', 'ext_ids', 'dirs', 'exts', 'tokens', 'bytes', 'lines', '_dir_index', '_ext_index')
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.dir_ids = array('I')
+        self.ext_ids = array('I')
+        self.dirs: List[str] = []
+        self.exts: List[str] = []
+        self.tokens = array('q')
+        self.bytes = array('q')
+        self.lines = array('q')
+        self._dir_index: Dict[str, int] = {}
+        self._ext_index: Dict[str, int] = {}
+
+    @classmethod
+    def from_infos(cls, file_infos: Iterable[Dict[str, Any]]) -> 'FileStats':
+        stats = cls()
+        for info in file_infos:
+            stats.add(info["path"], int(info["tokens"]), int(info["bytes"]), int(info.get("lines", 0)))
+        return stats
+
+    def add(self, rel_path: str, tokens: int, size: int, lines: int = 0) -> None:
+        rel_dir, _, name = rel_path.rpartition(os.sep)
+        dir_id = self._dir_index.get(rel_dir)
+        if dir_id is None:
+            dir_id = self._dir_index[rel_dir] = len(self.dirs)
+            self.dirs.append(rel_dir)
+        # same rule as os.path.splitext: leading dots do not start an extension
+        stem, dot, ext = name.lstrip('.').rpartition('.')
+        ext = '.' + ext.lower() if dot else "<no-ext>"
+        ext_id = self._ext_index.get(ext)
+        if ext_id is None:
+            ext_id = self._ext_index[ext] = len(self.exts)
+            self.exts.append(ext)
+        self.names.append(name)
+        self.dir_ids.append(dir_id)
+        self.ext_ids.append(ext_id)
+        self.tokens.append(tokens)
+        self.bytes.append(size)
+        self.lines.append(lines)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def path(self, i: int) -> str:
+        rel_dir = self.dirs[self.dir_ids[i]]
+        return rel_dir + os.sep + self.names[i] if rel_dir else self.names[i]
+
+    def extension(self, i: int) -> str:
+        return self.exts[self.ext_ids[i]]
+
+    def column(self, key: str) -> array:
+        if key not in STAT_COLUMNS:
+            raise ValueError(f"unknown column: {key!r} (expected one of {', '.join(STAT_COLUMNS)})")
+        return getattr(self, key)
+
+    def _rows(self, ext: Optional[str]) -> Iterable[int]:
+        if ext is None:
+            return range(len(self))
+        ext_id = self._ext_index.get(ext)
+        return [i for i, e in enumerate(self.ext_ids) if e == ext_id] if ext_id is not None else []
+
+    def top(self, n: int, key: str = 'tokens') -> List[Tuple[str, int]]:
+        """The n largest files by key, as (path, value), largest first."""
+        col = self.column(key)
+        return [(self.path(i), col[i]) for i in heapq.nlargest(n, range(len(self)), key=col.__getitem__)]
+
+    def percentiles(self, key: str = 'bytes', qs: Sequence[float] = DEFAULT_PERCENTILES, ext: Optional[str] = None) -> Dict[float, int]:
+        """Nearest-rank percentiles of a column, over all files or those with one extension."""
+        col = self.column(key)
+        values = sorted(col[i] for i in self._rows(ext))
+        if not values:
+            return {}
+        return {q: values[min(len(values), max(1, math.ceil(len(values) * q / 100))) - 1] for q in qs}
+
+    def histogram(self, key: str = 'bytes', ext: Optional[str] = None) -> Dict[int, int]:
+        """
+        File counts in power-of-two buckets, keyed by each bucket's
+        inclusive upper bound (0, 1, 2, 4, 8, ...).
+        """
+        col = self.column(key)
+        counts: Dict[int, int] = {}
+        for i in self._rows(ext):
+            value = col[i]
+            bound = 1 << (value - 1).bit_length() if value > 0 else 0
+            counts[bound] = counts.get(bound, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def by_extension(self) -> Dict[str, Dict[str, int]]:
+        totals = {ext: {"files": 0, "tokens": 0, "bytes": 0, "lines": 0} for ext in self.exts}
+        for i, ext_id in enumerate(self.ext_ids):
+            t = totals[self.exts[ext_id]]
+            t["files"] += 1
+            t["tokens"] += self.tokens[i]
+            t["bytes"] += self.bytes[i]
+            t["lines"] += self.lines[i]
+        return dict(sorted(totals.items()))
+
+    def by_directory(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Totals of the files directly in each directory ('.' for the root)
+        and their token density in tokens per KiB.
+        """
+        totals = [[0, 0, 0] for _ in self.dirs]
+        for i, dir_id in enumerate(self.dir_ids):
+            t = totals[dir_id]
+            t[0] += 1
+            t[1] += self.tokens[i]
+            t[2] += self.bytes[i]
+        return {
+            (rel_dir or '.'): {"files": files, "tokens": tokens, "bytes": size, "tokens_per_kib": round(tokens * 1024 / size, 2) if size else 0.0}
+            for rel_dir, (files, tokens, size) in sorted(zip(self.dirs, totals))
+        }
+
+    def report(self, top: int = 20, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """Everything the JSON export holds apart from the per-file columns."""
+        extensions = self.by_extension()
+        for ext, data in extensions.items():
+            data["bytes_percentiles"] = {f"p{q:g}": v for q, v in self.percentiles('bytes', qs, ext).items()}
+            data["bytes_histogram"] = {str(bound): n for bound, n in self.histogram('bytes', ext).items()}
+        return {
+            "files": len(self),
+            "tokens": sum(self.tokens),
+            "bytes": sum(self.bytes),
+            "lines": sum(self.lines),
+            "percentiles": {key: {f"p{q:g}": v for q, v in self.percentiles(key, qs).items()} for key in STAT_COLUMNS},
+            "extensions": extensions,
+            "directories": self.by_directory(),
+            "top_tokens": [[p.replace(os.sep, '/'), v] for p, v in self.top(top, 'tokens')],
+            "top_bytes": [[p.replace(os.sep, '/'), v] for p, v in self.top(top, 'bytes')],
+        }
+
+    def to_json(self, tokenizer: str = '', top: int = 20) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"version": STATS_VERSION, "tokenizer": tokenizer}
+        data.update(self.report(top))
+        # One list per column, rows in the same order
+        data["columns"] = {
+            "path": [self.path(i).replace(os.sep, '/') for i in range(len(self))],
+            "extension": [self.extension(i) for i in range(len(self))],
+            **{key: self.column(key).tolist() for key in STAT_COLUMNS},
+        }
+        return data
+
+    def write_csv(self, out) -> None:
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(('path', 'extension') + STAT_COLUMNS)
+        for i in range(len(self)):
+            writer.writerow((self.path(i).replace(os.sep, '/'), self.extension(i), self.tokens[i], self.bytes[i], self.lines[i]))
+
+    def save(self, path: str, tokenizer: str = '') -> None:
+        """Write per-file rows as CSV when path ends in .csv, else the JSON report with columns."""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if path.lower().endswith('.csv'):
+                self.write_csv(f)
+            else:
+                json.dump(self.to_json(tokenizer), f, indent=1)
+                f.write('\n')
@@ -0,0 +1,121 @@
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .estimate import ESTIMATE_TOKENIZER, TokenEstimator
+
+DEFAULT_TOKENIZER = 'cl100k_base'
+# Whitespace word count, used when tiktoken is unavailable
+WORDS_TOKENIZER = 'words_approx'
+# Encodings loaded through tiktoken
+TIKTOKEN_ENCODINGS = ('cl100k_base', 'o200k_base')
+
+
+class TokenizerError(ValueError):
+    pass
+
+
+class CountingTokenizer:
+    """Adapts a function text -> token count to the encoder interface count_tokens uses."""
+
+    def __init__(self, name: str, count: Callable[[str], int]) -> None:
+        self.name = name
+        self._count = count
+
+    def count(self, text: str, path: str = '') -> int:
+        return self._count(text)
+
+    def __repr__(self) -> str:
+        return f"CountingTokenizer({self.name!r})"
+
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_loaded: Dict[str, Any] = {}
+_lock = threading.RLock()
+_tiktoken_found: Optional[bool] = None
+
+
+def tiktoken_available() -> bool:
+    """Whether tiktoken is installed, checked without importing it."""
+    global _tiktoken_found
+    if _tiktoken_found is None:
+        _tiktoken_found = importlib.util.find_spec('tiktoken') is not None
+    return _tiktoken_found
+
+
+def _tiktoken_factory(name: str) -> Callable[[], Any]:
+    def load() -> Any:
+        if not tiktoken_available():
+            raise TokenizerError(f"tokenizer {name} needs tiktoken, which is not installed")
+        return importlib.import_module('tiktoken').get_encoding(name)
+    return load
+
+
+def register_tokenizer(name: str, factory: Optional[Callable[[], Any]] = None, *, count: Optional[Callable[[str], int]] = None, replace: bool = False) -> None:
+    """
+    Register a tokenizer under name. Either factory returns an encoder (an
+    object with encode(text) returning tokens, loaded on first use), or
+    count is a function text -> token count. Pool workers look tokenizers
+    up by name, so register at import time of a module they import as
+    well (with the fork start method, registrations are inherited).
+    """
+    if (factory is None) == (count is None):
+        raise TypeError("pass exactly one of factory or count")
+    if count is not None:
+        counter = CountingTokenizer(name, count)
+        factory = lambda: counter
+    with _lock:
+        if name in _factories and not replace:
+            raise TokenizerError(f"tokenizer already registered: {name}")
+        _factories[name] = factory
+        _loaded.pop(name, None)
+
+
+def unregister_tokenizer(name: str) -> None:
+    with _lock:
+        _factories.pop(name, None)
+        _loaded.pop(name, None)
+
+
+def available_tokenizers() -> List[str]:
+    return sorted(_factories)
+
+
+def get_encoder(name: str) -> Any:
+    """
+    Return the encoder registered as name, loading it on first use and
+    reusing it afterwards. The word approximation's encoder is None.
+    """
+    with _lock:
+        if name in _loaded:
+            return _loaded[name]
+        factory = _factories.get(name)
+        if factory is None:
+            raise TokenizerError(f"unknown tokenizer: {name!r} (available: {', '.join(sorted(_factories))})")
+        encoder = _loaded[name] = factory()
+        return encoder
+
+
+def encoder_name(encoder: Any) -> str:
+    """The registered name of a loaded encoder (or of None, the word approximation)."""
+    if encoder is None:
+        return WORDS_TOKENIZER
+    with _lock:
+        for name, loaded in _loaded.items():
+            if loaded is encoder:
+                return name
+    name = getattr(encoder, 'name', None)
+    if name is None:
+        raise TokenizerError(f"encoder has no registered name: {encoder!r}")
+    return name
+
+
+def default_tokenizer() -> str:
+    return DEFAULT_TOKENIZER if tiktoken_available() else WORDS_TOKENIZER
+
+
+for _name in TIKTOKEN_ENCODINGS:
+    register_tokenizer(_name, _tiktoken_factory(_name))
+register_tokenizer(WORDS_TOKENIZER, lambda: None)
+register_tokenizer(ESTIMATE_TOKENIZER, TokenEstimator)
@@ -0,0 +1,163 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class DirNode:
+    """
+    One directory. own_* count the files directly in it; files, tokens and
+    bytes are the totals of its whole subtree (see DirTree.totals).
+    """
+
+    __slots__ = ('name', 'path', 'parent', 'children', 'own_files', 'own_tokens', 'own_bytes', 'files', 'tokens', 'bytes')
+
+    def __init__(self, name: str, path: str, parent: Optional['DirNode']) -> None:
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.children: Dict[str, 'DirNode'] = {}
+        self.own_files = self.own_tokens = self.own_bytes = 0
+        self.files = self.tokens = self.bytes = 0
+
+    def __repr__(self) -> str:
+        return f"DirNode({self.path or '.'!r}, files={self.files}, tokens={self.tokens}, bytes={self.bytes})"
+
+
+class DirTree:
+    """
+    Per-directory file, token and byte totals, built in one pass.
+
+    add() interns each directory once as a node and counts the file only
+    in its own directory, so a file costs one dictionary lookup and no
+    path joins. Subtree totals are summed bottom-up in a single pass over
+    the nodes when first needed after a change. Nodes are kept in creation
+    order, which always puts a parent before its children. Adding with
+    sign=-1 removes a file again and drops directories left empty.
+    """
+
+    def __init__(self) -> None:
+        self.root = DirNode('.', '', None)
+        self._nodes: Dict[str, DirNode] = {'': self.root}
+        self._dirty = False
+
+    @classmethod
+    def from_infos(cls, file_infos: Iterable[Dict[str, Any]]) -> 'DirTree':
+        tree = cls()
+        for info in file_infos:
+            tree.add(info["path"], int(info["tokens"]), int(info["bytes"]))
+        return tree
+
+    @classmethod
+    def from_aggregates(cls, aggregates: Dict[str, Dict[str, int]]) -> 'DirTree':
+        """Rebuild a tree from subtree totals keyed by directory path, as aggregates() returns them."""
+        tree = cls()
+        for path in aggregates:
+            tree._node('' if path == '.' else path)
+        for path, node in tree._nodes.items():
+            data = aggregates.get(path or '.', {"files": 0, "tokens": 0, "bytes": 0})
+            kids = [aggregates.get(c.path, {"files": 0, "tokens": 0, "bytes": 0}) for c in node.children.values()]
+            node.own_files = data["files"] - sum(k["files"] for k in kids)
+            node.own_tokens = data["tokens"] - sum(k["tokens"] for k in kids)
+            node.own_bytes = data["bytes"] - sum(k["bytes"] for k in kids)
+        tree._dirty = True
+        return tree
+
+    def _node(self, rel_dir: str) -> DirNode:
+        node = self._nodes.get(rel_dir)
+        if node is not None:
+            return node
+        missing: List[str] = []
+        while rel_dir not in self._nodes:
+            missing.append(rel_dir)
+            rel_dir = rel_dir.rpartition(os.sep)[0]
+        parent = self._nodes[rel_dir]
+        for path in reversed(missing):
+            node = DirNode(path.rpartition(os.sep)[2], path, parent)
+            parent.children[node.name] = node
+            self._nodes[path] = parent = node
+        return parent
+
+    def add(self, rel_path: str, tokens: int, size: int, sign: int = 1) -> None:
+        node = self._node(rel_path.rpartition(os.sep)[0])
+        node.own_files += sign
+        node.own_tokens += sign * tokens
+        node.own_bytes += sign * size
+        self._dirty = True
+        while node.parent is not None and not node.own_files and not node.children:
+            del node.parent.children[node.name]
+            del self._nodes[node.path]
+            node = node.parent
+
+    def totals(self) -> None:
+        """Bring every node's subtree totals up to date."""
+        if not self._dirty:
+            return
+        nodes = list(self._nodes.values())
+        for node in nodes:
+            node.files, node.tokens, node.bytes = node.own_files, node.own_tokens, node.own_bytes
+        for node in reversed(nodes):
+            parent = node.parent
+            if parent is not None:
+                parent.files += node.files
+                parent.tokens += node.tokens
+                parent.bytes += node.bytes
+        self._dirty = False
+
+    def get(self, rel_dir: str) -> Optional[DirNode]:
+        self.totals()
+        return self._nodes.get('' if rel_dir == '.' else rel_dir)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def aggregates(self) -> Dict[str, Dict[str, int]]:
+        """Totals keyed by directory path ('.' for the root)."""
+        self.totals()
+        return {path or '.': {"files": n.files, "tokens": n.tokens, "bytes": n.bytes} for path, n in self._nodes.items()}
+
+    def children(self) -> Dict[str, List[str]]:
+        """Sorted subdirectory paths of every directory ('.' for the root)."""
+        return {path or '.': sorted(c.path for c in n.children.values()) for path, n in self._nodes.items()}
+
+    def render(self, out, max_depth: Optional[int] = None, min_tokens: Optional[int] = None) -> None:
+        """
+        Write the tree below the root, one line per directory. Directories
+        deeper than max_depth are not listed; the last listed level notes
+        how many subdirectories it hides. Sibling directories with fewer
+        than min_tokens tokens are folded into one summary line. Rendering
+        uses an explicit stack, so depth is not limited by recursion.
+        """
+        self.totals()
+        # (node or folded siblings, line prefix, prefix for its children, depth)
+        stack: List[Any] = []
+
+        def push_children(node: DirNode, continuation: str, depth: int) -> None:
+            kids = sorted(node.children.values(), key=lambda n: n.name)
+            small: List[DirNode] = []
+            if min_tokens is not None:
+                small = [k for k in kids if k.tokens < min_tokens]
+                kids = [k for k in kids if k.tokens >= min_tokens]
+            entries: List[Any] = list(kids)
+            if small:
+                entries.append(small)
+            for i in range(len(entries) - 1, -1, -1):
+                last = i == len(entries) - 1
+                stack.append((entries[i], continuation + ("└── " if last else "├── "), continuation + ("    " if last else "│   "), depth))
+
+        if max_depth is None or max_depth >= 1:
+            push_children(self.root, "", 1)
+        while stack:
+            entry, prefix, continuation, depth = stack.pop()
+            if isinstance(entry, list):
+                files = sum(n.files for n in entry)
+                tokens = sum(n.tokens for n in entry)
+                size = sum(n.bytes for n in entry)
+                out.write(f"{prefix}({len(entry)} more directories under {min_tokens} tokens) (files: {files}, tokens: {tokens}, bytes: {size})\n")
+                continue
+            line = f"{prefix}{entry.name}/ (files: {entry.files}, tokens: {entry.tokens}, bytes: {entry.bytes})"
+            if max_depth is not None and depth >= max_depth:
+                if entry.children:
+                    line += f" [+{len(entry.children)} subdirectories]"
+                out.write(line + "\n")
+                continue
+            out.write(line + "\n")
+            push_children(entry, continuation, depth + 1)
@@ -0,0 +1,213 @@
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .fileio import is_minified
+from .gitindex import read_git_index
+from .ignore import GITIGNORE, IgnoreMatcher
+
+
+class FileStat:
+    """The fields of a stat result the read pass, cache and manifest use, kept compactly per file."""
+
+    __slots__ = ('st_size', 'st_mtime_ns', 'st_ino', 'st_dev')
+
+    def __init__(self, st_size: int, st_mtime_ns: int, st_ino: int, st_dev: int = 0) -> None:
+        self.st_size = st_size
+        self.st_mtime_ns = st_mtime_ns
+        self.st_ino = st_ino
+        self.st_dev = st_dev
+
+    @classmethod
+    def from_stat(cls, st: os.stat_result) -> 'FileStat':
+        return cls(st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+    def __repr__(self) -> str:
+        return f"FileStat(size={self.st_size}, mtime_ns={self.st_mtime_ns}, ino={self.st_ino})"
+
+
+def walk_files(
+    root_dir: str,
+    matcher: Optional[IgnoreMatcher] = None,
+    *,
+    stat: bool = False,
+    follow_symlinks: bool = False,
+    max_depth: Optional[int] = None,
+    max_dir_entries: Optional[int] = None,
+    skipped: Optional[List[Tuple[str, str]]] = None,
+    dirs: Optional[Set[str]] = None,
+    start: str = '',
+    links: Optional[Dict[Tuple[int, int], str]] = None,
+) -> Iterator[Tuple[str, Optional[FileStat]]]:
+    """
+    Yield (rel_path, stat) for every file an export considers, in the
+    order os.walk would visit them: each directory's files sorted by name,
+    then its subdirectories in listing order.
+
+    The walk is built on os.scandir. Directory and symlink checks come from
+    the directory entries, and relative paths are extended one level at a
+    time. A file reached a second time through a hard link or a symlink
+    (same device and inode) is skipped, as are directory symlinks (unless
+    follow_symlinks) and symlink loops. Directories are stat-ed once each.
+    Files are not, unless they are symlinks or stat is set. With stat,
+    each file's FileStat comes from its DirEntry. That is the only stat
+    call per file, and it is free on Windows. Without stat it is None.
+    A file whose stat fails is yielded with None, so the read reports the
+    error.
+
+    Directories deeper than max_depth levels below the root, and
+    directories with more than max_dir_entries entries, are not listed.
+    What was left out is appended to skipped as (rel_path, reason).
+    Every directory that was listed ('' for the root) is added to dirs.
+    Without a matcher the rules are IgnoreMatcher.for_root's.
+
+    start (a directory relative to root_dir) walks only that subtree;
+    paths stay relative to root_dir and depth still counts from the root.
+    links maps the (device, inode) of each yielded file to its path.
+    Passing the links of an earlier walk keeps skipping files that walk
+    already reached through another link, e.g. when re-walking part of a
+    tree.
+    """
+    if matcher is None:
+        matcher = IgnoreMatcher.for_root(root_dir)
+
+    def skip(rel_path: str, reason: str) -> None:
+        if skipped is not None:
+            skipped.append((rel_path, reason))
+
+    start = '' if start in ('', '.') else os.path.normpath(start)
+    parts = start.split(os.sep) if start else []
+    try:
+        chain = [os.stat(os.path.join(root_dir, *parts[:i])) for i in range(len(parts) + 1)]
+    except OSError:
+        return
+    seen_files: Dict[Tuple[int, int], str] = {} if links is None else links
+    # directories on the path from the root, by (dev, inode), to break symlink loops
+    top = chain.pop()
+    stack: List[Tuple[str, str, int, Tuple[int, int], frozenset]] = [
+        (os.path.join(root_dir, *parts), start, len(parts), (top.st_dev, top.st_ino), frozenset((st.st_dev, st.st_ino) for st in chain))
+    ]
+    while stack:
+        abs_dir, rel_dir, depth, dir_key, ancestors = stack.pop()
+        ancestors = ancestors | {dir_key}
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = list(it) if max_dir_entries is None else _take(it, max_dir_entries + 1)
+        except OSError:
+            continue
+        if max_dir_entries is not None and len(entries) > max_dir_entries:
+            skip(rel_dir or '.', f"more than {max_dir_entries} entries")
+            continue
+        if dirs is not None:
+            dirs.add(rel_dir)
+        prefix = rel_dir + os.sep if rel_dir else ''
+        files: List[os.DirEntry] = []
+        subdirs: List[os.DirEntry] = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            (subdirs if is_dir else files).append(entry)
+        if rel_dir and any(entry.name == GITIGNORE for entry in files):
+            matcher.load_dir(rel_dir)
+
+        files.sort(key=lambda e: e.name)
+        for entry in files:
+            rel_path = prefix + entry.name
+            # Skip if ignored by any rule (but don't check sensitive patterns here)
+            if matcher.is_file_ignored(rel_path) or is_minified(entry.name):
+                continue
+            st: Optional[FileStat] = None
+            try:
+                if entry.is_symlink():
+                    target = entry.stat()
+                    key = (target.st_dev, target.st_ino)
+                    if stat:
+                        st = FileStat.from_stat(target)
+                else:
+                    # inode() comes from the directory listing; a file shares its directory's device
+                    key = (dir_key[0], entry.inode())
+                    if stat:
+                        st = FileStat.from_stat(entry.stat())
+            except OSError:
+                yield rel_path, None
+                continue
+            if seen_files.get(key, rel_path) != rel_path:
+                skip(rel_path, "already included through another link")
+                continue
+            seen_files[key] = rel_path
+            yield rel_path, st
+
+        children = []
+        for entry in subdirs:
+            rel_path = prefix + entry.name
+            if matcher.is_dir_ignored(rel_path):
+                continue
+            if not follow_symlinks and entry.is_symlink():
+                continue
+            if max_depth is not None and depth >= max_depth:
+                skip(rel_path, f"deeper than {max_depth} levels")
+                continue
+            try:
+                # one stat per directory gives its device, which its files share
+                target = entry.stat()
+            except OSError:
+                continue
+            key = (target.st_dev, target.st_ino)
+            if key in ancestors:
+                skip(rel_path, "symlink loop")
+                continue
+            children.append((entry.path, rel_path, depth + 1, key, ancestors))
+        stack.extend(reversed(children))
+
+
+def _take(it: Iterator[os.DirEntry], n: int) -> List[os.DirEntry]:
+    entries = []
+    for entry in it:
+        entries.append(entry)
+        if len(entries) >= n:
+            break
+    return entries
+
+
+def iter_files(root_dir: str, patterns: Optional[Iterable[str]] = None, matcher: Optional[IgnoreMatcher] = None, respect_gitignore: bool = True) -> Iterable[str]:
+    """
+    Yield the relative path of every file an export considers (see
+    walk_files). Without a matcher the rules are IgnoreMatcher.for_root's,
+    as in an export: the root .gitignore (or patterns in its place) and
+    nested .gitignore files, unless respect_gitignore is off.
+    """
+    if matcher is None:
+        matcher = IgnoreMatcher.for_root(root_dir, respect_gitignore, patterns)
+    for rel_path, _ in walk_files(root_dir, matcher):
+        yield rel_path
+
+
+def iter_index_files(root_dir: str, matcher: Optional[IgnoreMatcher] = None) -> Iterable[str]:
+    """
+    Yield tracked files from .git/index instead of walking the tree.
+
+    Git has already applied .gitignore, so only the exclude, extension and
+    minified-file checks run here; directory verdicts are memoized. As in
+    git, a tracked file is kept even when a .gitignore rule matches it or
+    one of its directories.
+    """
+    if matcher is None:
+        matcher = IgnoreMatcher(root_dir)
+    dir_ignored: Dict[str, bool] = {'': False}
+
+    def ignored_dir(rel_dir: str) -> bool:
+        verdict = dir_ignored.get(rel_dir)
+        if verdict is None:
+            parent = rel_dir.rsplit('/', 1)[0] if '/' in rel_dir else ''
+            verdict = ignored_dir(parent) or matcher.is_dir_excluded(rel_dir)
+            dir_ignored[rel_dir] = verdict
+        return verdict
+
+    for entry in read_git_index(root_dir):
+        rel_dir, _, filename = entry.path.rpartition('/')
+        if ignored_dir(rel_dir):
+            continue
+        if matcher.excluded_name(filename) or matcher.excluded_extension(filename) or is_minified(filename):
+            continue
+        yield entry.path.replace('/', os.sep)
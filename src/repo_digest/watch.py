@@ -0,0 +1,542 @@
+import io
+import os
+import sys
+import time
+import errno
+import select
+import struct
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from .core import report_blocked, write_dir_tree, write_extension_summary, write_file_tables, write_skipped_sections
+from .fileio import is_minified, write_file_section
+from .ignore import GITIGNORE, IgnoreMatcher
+from .reader import ReadOptions, read_file_info
+from .scan import FileRecord, scan_repo, select_encoder
+from .tree import DirTree
+from .walk import walk_files
+
+
+class LiveIndex:
+    """
+    The records of a repository kept in memory and updated file by file.
+
+    build() scans the whole tree once; apply(paths) then re-reads only the
+    given files (or re-walks the given directories) and adjusts the
+    per-extension counters and the directory tree by the difference. Rendered FILE sections are cached per file, so write()
+    re-renders only what changed. A change to any .gitignore rebuilds the
+    index, since it can change which files are included at all. Walks go
+    through walk_files, so files reached through another link stay out
+    and follow_symlinks, max_dir_depth and max_dir_entries apply as in an
+    export.
+
+    skip_paths (relative paths) are never indexed, e.g. the digest itself
+    when it is written inside the tree.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        *,
+        allow_secrets: bool = False,
+        respect_gitignore: bool = True,
+        tokenizer: Optional[str] = None,
+        sniff_binary: bool = True,
+        max_file_bytes: Optional[int] = None,
+        max_file_tokens: Optional[int] = None,
+        oversize: str = 'skip',
+        follow_symlinks: bool = False,
+        max_dir_depth: Optional[int] = None,
+        max_dir_entries: Optional[int] = None,
+        jobs: int = 1,
+        skip_paths: Iterable[str] = (),
+    ) -> None:
+        self.root_dir = root_dir
+        self.skip_paths = frozenset(skip_paths)
+        self.allow_secrets = allow_secrets
+        self.respect_gitignore = respect_gitignore
+        self.tokenizer = tokenizer
+        self.jobs = jobs
+        self.follow_symlinks = follow_symlinks
+        self.max_dir_depth = max_dir_depth
+        self.max_dir_entries = max_dir_entries
+        self._limits = dict(sniff_binary=sniff_binary, max_file_bytes=max_file_bytes, max_file_tokens=max_file_tokens, oversize=oversize)
+        self.encoder, self.tokenizer_name = select_encoder(tokenizer)
+        self._reset()
+
+    def _reset(self) -> None:
+        self.matcher = IgnoreMatcher.for_root(self.root_dir, self.respect_gitignore)
+        self.records: Dict[str, FileRecord] = {}
+        self.skipped_binary: Dict[str, FileRecord] = {}
+        self.skipped_large: Dict[str, FileRecord] = {}
+        self.blocked_sensitive: Set[str] = set()
+        self.dirs: Set[str] = set()
+        # (device, inode) -> the path the walk included it under
+        self.links: Dict[Tuple[int, int], str] = {}
+        self.tree = DirTree()
+        self.by_ext_files: Counter = Counter()
+        self.by_ext_tokens: Counter = Counter()
+        self.by_ext_bytes: Counter = Counter()
+        self.total_tokens = 0
+        self.total_bytes = 0
+        self._sections: Dict[str, str] = {}
+
+    # -- building ----------------------------------------------------------
+
+    def build(self) -> None:
+        """Scan the whole tree; afterwards blocked_sensitive lists what was held back."""
+        self._reset()
+        # the scan's walk loads nested .gitignore files into self.matcher and fills dirs and links
+        scanned = scan_repo(
+            self.root_dir, allow_secrets=self.allow_secrets, jobs=self.jobs, keep_content=True, tokenizer=self.tokenizer, track=True,
+            follow_symlinks=self.follow_symlinks, max_dir_depth=self.max_dir_depth, max_dir_entries=self.max_dir_entries,
+            matcher=self.matcher, dirs=self.dirs, links=self.links, **self._limits,
+        )
+        for item in scanned:
+            if isinstance(item, FileRecord):
+                if item.path not in self.skip_paths:
+                    self._add(item)
+            else:
+                self.blocked_sensitive.update(item.blocked_sensitive)
+                self.skipped_binary.update((r.path, r) for r in item.skipped_binary)
+                self.skipped_large.update((r.path, r) for r in item.skipped_large)
+
+    def _file_key(self, rel_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(os.path.join(self.root_dir, rel_path))
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def _indexed(self, rel_path: str) -> bool:
+        return rel_path in self.records or rel_path in self.skipped_binary or rel_path in self.skipped_large or rel_path in self.blocked_sensitive
+
+    # -- incremental updates ---------------------------------------------------
+
+    def _account(self, record: FileRecord, sign: int) -> None:
+        tokens, size = sign * record.tokens, sign * record.bytes
+        self.total_tokens += tokens
+        self.total_bytes += size
+        ext = os.path.splitext(record.path)[1].lower() or "<no-ext>"
+        for counter, value in ((self.by_ext_files, sign), (self.by_ext_tokens, tokens), (self.by_ext_bytes, size)):
+            counter[ext] += value
+        if not self.by_ext_files[ext]:
+            for counter in (self.by_ext_files, self.by_ext_tokens, self.by_ext_bytes):
+                del counter[ext]
+        self.tree.add(record.path, record.tokens, record.bytes, sign)
+
+    def _add(self, record: FileRecord) -> None:
+        self.records[record.path] = record
+        self._account(record, 1)
+        buf = io.StringIO()
+        write_file_section(buf, self.root_dir, record)
+        self._sections[record.path] = buf.getvalue()
+        # the rendered section holds the text; the record does not need to
+        record.drop_content()
+
+    def _discard(self, rel_path: str) -> bool:
+        record = self.records.pop(rel_path, None)
+        if record is not None:
+            self._account(record, -1)
+            del self._sections[rel_path]
+        found = record is not None
+        for table in (self.skipped_binary, self.skipped_large):
+            found = table.pop(rel_path, None) is not None or found
+        if rel_path in self.blocked_sensitive:
+            self.blocked_sensitive.discard(rel_path)
+            found = True
+        return found
+
+    def _discard_tree(self, rel_dir: str) -> Set[str]:
+        prefix = rel_dir + os.sep
+        gone = {p for table in (self.records, self.skipped_binary, self.skipped_large) for p in table if p.startswith(prefix)}
+        gone |= {p for p in self.blocked_sensitive if p.startswith(prefix)}
+        for p in gone:
+            self._discard(p)
+        self.dirs = {d for d in self.dirs if d != rel_dir and not d.startswith(prefix)}
+        return gone
+
+    def _update_file(self, rel_path: str) -> bool:
+        if rel_path in self.skip_paths or self.matcher.is_ignored(rel_path, check_sensitive=False) or is_minified(os.path.basename(rel_path)):
+            return self._discard(rel_path)
+        if self.matcher.is_sensitive(rel_path) and not self.allow_secrets:
+            if rel_path in self.blocked_sensitive:
+                return False
+            self._discard(rel_path)
+            self.blocked_sensitive.add(rel_path)
+            print(f"[SAFETY] {rel_path}: sensitive-looking file not included")
+            return True
+        key = self._file_key(rel_path)
+        if key is None:
+            return self._discard(rel_path)
+        owner = self.links.get(key, rel_path)
+        if owner != rel_path and self._indexed(owner) and self._file_key(owner) == key:
+            # another link to this file is already in the index
+            return self._discard(rel_path)
+        self.links[key] = rel_path
+        options = ReadOptions(keep_content=True, track=True, **self._limits)
+        try:
+            info = read_file_info(self.root_dir, rel_path, self.encoder, options)
+        except OSError:
+            return self._discard(rel_path)
+        old = self.records.get(rel_path)
+        if old is not None and old.digest == info.get("digest") and old.bytes == info["bytes"]:
+            # touched or rewritten with the same content
+            old.mtime_ns, old.inode = info["mtime_ns"], info["inode"]
+            return False
+        self._discard(rel_path)
+        record = FileRecord.from_info(self.root_dir, info)
+        if info.get("binary"):
+            self.skipped_binary[rel_path] = record
+        elif info.get("oversized"):
+            self.skipped_large[rel_path] = record
+        else:
+            self._add(record)
+        return True
+
+    def _sync_dir(self, rel_dir: str) -> Set[str]:
+        if rel_dir and self.matcher.is_ignored(rel_dir, check_sensitive=False, is_dir=True):
+            return self._discard_tree(rel_dir)
+        prefix = rel_dir + os.sep if rel_dir else ''
+        known = {p for table in (self.records, self.skipped_binary, self.skipped_large) for p in table if p.startswith(prefix)}
+        known |= {p for p in self.blocked_sensitive if p.startswith(prefix)}
+        # links inside the subtree are decided again by the walk, in walk order
+        self.links = {key: p for key, p in self.links.items() if not p.startswith(prefix) and self._indexed(p)}
+        changed: Set[str] = set()
+        seen: Set[str] = set()
+        dirs: Set[str] = set()
+        walked = walk_files(
+            self.root_dir, self.matcher, start=rel_dir, dirs=dirs, links=self.links,
+            follow_symlinks=self.follow_symlinks, max_depth=self.max_dir_depth, max_dir_entries=self.max_dir_entries,
+        )
+        for rel_path, _ in walked:
+            seen.add(rel_path)
+            if rel_path in known and not self._stat_changed(rel_path):
+                continue
+            if self._update_file(rel_path):
+                changed.add(rel_path)
+        self.dirs = {d for d in self.dirs if d != rel_dir and not d.startswith(prefix)} | dirs
+        for rel_path in known - seen:
+            self._discard(rel_path)
+            changed.add(rel_path)
+        return changed
+
+    def _stat_changed(self, rel_path: str) -> bool:
+        record = self.records.get(rel_path) or self.skipped_binary.get(rel_path) or self.skipped_large.get(rel_path)
+        if record is None or record.mtime_ns is None:
+            return True
+        try:
+            st = os.stat(os.path.join(self.root_dir, rel_path))
+        except OSError:
+            return True
+        return (st.st_size, st.st_mtime_ns, st.st_ino) != (record.bytes, record.mtime_ns, record.inode)
+
+    def apply(self, paths: Iterable[str]) -> Set[str]:
+        """
+        Bring the index up to date for paths that may have changed (files or
+        directories, added, modified or removed) and return the files whose
+        record changed.
+        """
+        paths = set(paths)
+        if any(os.path.basename(p) == GITIGNORE for p in paths):
+            before = set(self.records)
+            self.build()
+            return before | set(self.records)
+        changed: Set[str] = set()
+        for rel_path in sorted(paths):
+            abs_path = os.path.join(self.root_dir, rel_path)
+            if os.path.isdir(abs_path):
+                changed |= self._sync_dir(rel_path)
+            elif os.path.isfile(abs_path):
+                if self._update_file(rel_path):
+                    changed.add(rel_path)
+            else:
+                if self._discard(rel_path):
+                    changed.add(rel_path)
+                if rel_path in self.dirs:
+                    changed |= self._discard_tree(rel_path)
+        return changed
+
+    # -- output --------------------------------------------------------------
+
+    @property
+    def aggregates(self) -> Dict[str, Dict[str, int]]:
+        return self.tree.aggregates()
+
+    def render(self, out) -> None:
+        """Write the digest in the layout of export_repo_as_text's single-file output."""
+        out.write('===== REPO SUMMARY =====\n')
+        out.write(f"Generated: {datetime.now().isoformat()}\n")
+        out.write(f"Tokenizer: {self.tokenizer_name}\n")
+        out.write(f"Total files: {len(self.records)}\n")
+        out.write(f"Total tokens: {self.total_tokens}\n")
+        if hasattr(self.encoder, 'bounds'):
+            low, high = self.encoder.bounds(self.by_ext_tokens)
+            out.write(f"Estimate bounds: {low}-{high} tokens\n")
+        out.write(f"Total bytes: {self.total_bytes}\n")
+        write_extension_summary(out, self.by_ext_files, self.by_ext_tokens, self.by_ext_bytes)
+        write_dir_tree(out, self.tree)
+        out.write('\n===== FILES =====\n')
+        for path in sorted(self._sections):
+            out.write(self._sections[path])
+        records = list(self.records.values())
+        write_file_tables(out, records, records)
+        write_skipped_sections(out, list(self.skipped_binary.values()), list(self.skipped_large.values()))
+
+    def write(self, output_file: str) -> None:
+        """Rewrite output_file atomically, so readers never see a partial digest."""
+        tmp = f"{output_file}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as out:
+            self.render(out)
+        os.replace(tmp, output_file)
+
+
+class PollingWatcher:
+    """
+    Stdlib-only change detection. Each poll stats every watched directory
+    and lists the ones whose mtime moved (files added, removed or renamed),
+    and stats every indexed file to catch in-place edits, which do not
+    touch the directory.
+    """
+
+    def __init__(self, index: LiveIndex, interval: float = 0.5) -> None:
+        self.index = index
+        self.interval = interval
+        self._dirs: Dict[str, Tuple[int, Set[str]]] = {}
+        self._files: Dict[str, Tuple[int, int, int]] = {}
+        self.poll()
+
+    def _paths(self) -> Set[str]:
+        idx = self.index
+        return set(idx.records) | set(idx.skipped_binary) | set(idx.skipped_large) | idx.blocked_sensitive
+
+    def poll(self) -> Set[str]:
+        changed: Set[str] = set()
+        root = self.index.root_dir
+        for rel_dir in list(self.index.dirs):
+            abs_dir = os.path.join(root, rel_dir)
+            try:
+                mtime = os.stat(abs_dir).st_mtime_ns
+                prev = self._dirs.get(rel_dir)
+                if prev is not None and prev[0] == mtime:
+                    continue
+                names = set(os.listdir(abs_dir))
+            except OSError:
+                self._dirs.pop(rel_dir, None)
+                changed.add(rel_dir)
+                continue
+            if prev is not None:
+                changed.update(os.path.join(rel_dir, name) for name in names ^ prev[1])
+            self._dirs[rel_dir] = (mtime, names)
+        for rel_dir in set(self._dirs) - self.index.dirs:
+            del self._dirs[rel_dir]
+
+        paths = self._paths()
+        for rel_path in paths:
+            try:
+                st = os.stat(os.path.join(root, rel_path))
+            except OSError:
+                self._files.pop(rel_path, None)
+                changed.add(rel_path)
+                continue
+            sig = (st.st_size, st.st_mtime_ns, st.st_ino)
+            prev_sig = self._files.get(rel_path)
+            if prev_sig != sig:
+                self._files[rel_path] = sig
+                if prev_sig is not None:
+                    changed.add(rel_path)
+        for rel_path in set(self._files) - paths:
+            del self._files[rel_path]
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        return self.poll()
+
+    def sync(self) -> Set[str]:
+        return set()
+
+    def close(self) -> None:
+        pass
+
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct('iIII')
+
+
+def _libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """
+    Linux inotify through ctypes: one watch per indexed directory, so
+    changes arrive as soon as files are closed instead of on the next poll.
+    Events are coalesced for settle seconds after the first one. A queue
+    overflow reports the root directory, which re-walks the whole tree.
+    """
+
+    def __init__(self, index: LiveIndex, settle: float = 0.02) -> None:
+        libc = _libc()
+        if libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = libc
+        self.index = index
+        self.settle = settle
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(errno.ENOSYS, "inotify_init1 failed")
+        self._wds: Dict[int, str] = {}
+        self._by_dir: Dict[str, int] = {}
+        self.sync()
+
+    @classmethod
+    def available(cls) -> bool:
+        return _libc() is not None
+
+    def sync(self) -> Set[str]:
+        """
+        Watch directories the index gained and forget the ones it lost.
+        Returns the directories that could not be watched.
+        """
+        failed: Set[str] = set()
+        for rel_dir in self.index.dirs - set(self._by_dir):
+            path = os.path.join(self.index.root_dir, rel_dir).encode(sys.getfilesystemencoding(), 'surrogateescape')
+            wd = self._libc.inotify_add_watch(self._fd, path, _WATCH_MASK)
+            if wd >= 0:
+                self._wds[wd] = rel_dir
+                self._by_dir[rel_dir] = wd
+            else:
+                failed.add(rel_dir)
+        for rel_dir in set(self._by_dir) - self.index.dirs:
+            wd = self._by_dir.pop(rel_dir)
+            self._wds.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+        return failed
+
+    def _drain(self, changed: Set[str]) -> None:
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.add('')
+                    continue
+                rel_dir = self._wds.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._wds.pop(wd, None)
+                    self._by_dir.pop(rel_dir, None)
+                    continue
+                if name:
+                    changed.add(os.path.join(rel_dir, os.fsdecode(name)))
+                else:
+                    changed.add(rel_dir)
+
+    def poll(self) -> Set[str]:
+        """Return the changes queued so far, without waiting."""
+        changed: Set[str] = set()
+        self._drain(changed)
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        self._drain(changed)
+        # let a burst of writes (an editor's save, a checkout) settle
+        while select.select([self._fd], [], [], self.settle)[0]:
+            self._drain(changed)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(index: LiveIndex, *, poll: bool = False, interval: float = 0.5):
+    """inotify when available (and not disabled with poll), otherwise polling."""
+    if not poll and InotifyWatcher.available():
+        try:
+            return InotifyWatcher(index)
+        except OSError:
+            pass
+    return PollingWatcher(index, interval)
+
+
+def watch_repo(root_dir: str, output_file: str, *, poll: bool = False, interval: float = 0.5, max_updates: Optional[int] = None, **options: Any) -> int:
+    """
+    Build the index of root_dir, write output_file, then keep rewriting it
+    as files change until interrupted (or after max_updates rewrites).
+
+    options are LiveIndex's. Returns 2 if sensitive files block the initial
+    build, like export_repo_as_text.
+    """
+    rel_output = os.path.relpath(os.path.abspath(output_file), os.path.abspath(root_dir))
+    index = LiveIndex(root_dir, skip_paths=(rel_output, rel_output + '.tmp'), **options)
+    start = time.perf_counter()
+    index.build()
+    if index.blocked_sensitive and not index.allow_secrets:
+        report_blocked("Sensitive-looking files were blocked by default", sorted(index.blocked_sensitive))
+        return 2
+    index.write(output_file)
+    print(f"[watch] indexed {len(index.records)} files in {(time.perf_counter() - start) * 1000:.0f} ms, wrote {output_file}")
+
+    watcher = make_watcher(index, poll=poll, interval=interval)
+    print(f"[watch] watching {root_dir} ({type(watcher).__name__}); Ctrl-C to stop")
+    updates = 0
+    try:
+        while max_updates is None or updates < max_updates:
+            paths = watcher.wait(interval)
+            if not paths:
+                continue
+            start = time.perf_counter()
+            changed = index.apply(paths)
+            watcher.sync()
+            if not changed:
+                continue
+            index.write(output_file)
+            updates += 1
+            print(f"[watch] {len(changed)} file(s) changed, rewrote {output_file} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
@@ -0,0 +1,86 @@
+import json
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.batch import BatchJob, batch_exit_code, load_batch, run_batch
+from src.repo_digest.cli import main
+from src.repo_digest.core import export_repo_as_text
+
+
+class TestBatch:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.base / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def make_repos(self):
+        self.create_test_file("repos/good/main.py", "print('hello')\n")
+        self.create_test_file("repos/good/src/app.py", "def run():\n    return 1\n")
+        self.create_test_file("repos/secret/main.py", "x = 1\n")
+        self.create_test_file("repos/secret/.env", "TOKEN=abc\n")
+        self.create_test_file("repos/large/data.txt", "x" * 2000)
+
+    def test_load_batch_text(self):
+        self.create_test_file("list.txt", "# nightly\nrepos/a\nrepos/b  out/b.txt\n\nother/a  # same name\n")
+        jobs = load_batch(str(self.base / "list.txt"), str(self.base / "out"))
+        assert [j.repo for j in jobs] == [str(self.base / "repos/a"), str(self.base / "repos/b"), str(self.base / "other/a")]
+        assert [j.output for j in jobs] == [str(self.base / "out/a.txt"), str(self.base / "out/b.txt"), str(self.base / "out/a-2.txt")]
+
+    def test_load_batch_json(self):
+        self.create_test_file("list.json", json.dumps({"repos": [{"repo": "r", "max_bytes": 10}]}))
+        jobs = load_batch(str(self.base / "list.json"))
+        assert jobs[0].options == {"max_bytes": 10}
+        self.create_test_file("bad.json", json.dumps([{"repo": "r", "jobs": 4}]))
+        with pytest.raises(ValueError):
+            load_batch(str(self.base / "bad.json"))
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_run_batch_exit_codes(self, workers):
+        self.make_repos()
+        out = self.base / "out"
+        out.mkdir()
+        jobs = [
+            BatchJob(str(self.base / "repos/good"), str(out / "good.txt")),
+            BatchJob(str(self.base / "repos/secret"), str(out / "secret.txt")),
+            BatchJob(str(self.base / "repos/large"), str(out / "large.txt"), {"max_bytes": 1000}),
+            BatchJob(str(self.base / "repos/missing"), str(out / "missing.txt")),
+        ]
+        results = run_batch(jobs, workers=workers, options={"respect_gitignore": False})
+        assert [r["exit_code"] for r in results] == [0, 2, 3, 1]
+        assert results[0]["files"] == 2 and results[0]["tokens"] > 0
+        assert "[SAFETY]" in results[1]["log"]
+        assert "not a directory" in results[3]["error"]
+        assert batch_exit_code(results) == 2
+        assert batch_exit_code(results[:1]) == 0
+        assert batch_exit_code([results[0], results[3], results[2]]) == 3
+
+        single = self.base / "single.txt"
+        assert export_repo_as_text(str(self.base / "repos/good"), str(single), respect_gitignore=False) == 0
+        strip = lambda p: [l for l in p.read_text().splitlines() if not l.startswith("Generated:")]
+        assert strip(out / "good.txt") == strip(single)
+        assert not (out / "secret.txt").exists()
+
+    def test_cli_report(self, capsys):
+        self.make_repos()
+        self.create_test_file("list.txt", "repos/good\nrepos/large\n")
+        report = self.base / "report.json"
+        with pytest.raises(SystemExit) as e:
+            main(["batch", str(self.base / "list.txt"), "--output-dir", str(self.base / "out"), "-j", "2", "--max-bytes", "1000", "--report", str(report)])
+        assert e.value.code == 3
+        assert "===== BATCH SUMMARY =====" in capsys.readouterr().out
+        data = json.loads(report.read_text())
+        assert [r["exit_code"] for r in data["repos"]] == [0, 3]
+        assert (self.base / "out" / "good.txt").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from benchmarks.run import compare, run_benchmarks
+from benchmarks.synth import SynthSpec, generate_repo
+from src.repo_digest.core import iter_files
+from src.repo_digest.ignore import IgnoreMatcher
+
+
+class TestBenchmarks:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def snapshot(self, root: Path):
+        return {str(p.relative_to(root)): p.read_bytes() for p in root.rglob("*") if p.is_file()}
+
+    def test_generator_is_reproducible(self):
+        spec = SynthSpec(files=60, depth=2, fanout=3, size_median=200, seed=7)
+        a, b = self.test_repo / "a", self.test_repo / "b"
+        counts = generate_repo(str(a), spec)
+        generate_repo(str(b), spec)
+
+        assert self.snapshot(a) == self.snapshot(b)
+        assert counts["text"] + counts["binary"] + counts["ignored"] == 60
+
+    def test_generated_ignores_apply(self):
+        spec = SynthSpec(files=200, ignore_density=0.3, binary_fraction=0.0, size_median=100, seed=1)
+        counts = generate_repo(self.temp_dir, spec)
+        selected = list(iter_files(self.temp_dir, matcher=IgnoreMatcher.for_root(self.temp_dir, True)))
+
+        assert counts["ignored"] > 0
+        # everything but the ignored files (and the .gitignore itself)
+        assert len(selected) == counts["text"] + 1
+
+    def test_compare_flags_regressions(self):
+        baseline = {"stages": {"fast": {"median": 0.001}, "read": {"median": 1.0}, "export": {"median": 2.0}, "gone": {"median": 1.0}}}
+        current = {"stages": {"fast": {"median": 0.01}, "read": {"median": 1.1}, "export": {"median": 3.0}, "gone": {"skipped": "n/a"}}}
+
+        regressions = compare(baseline, current, threshold=0.2)
+        assert [r["stage"] for r in regressions] == ["export"]
+        assert compare(baseline, current, threshold=0.2, thresholds={"export": 0.6}) == []
+
+    def test_run_benchmarks_smoke(self):
+        results = run_benchmarks(SynthSpec(files=30, depth=1, size_median=100), repeat=1, workdir=self.temp_dir)
+
+        assert results["repo"]["text"] > 0
+        assert "median" in results["stages"]["iter_files"]
+        assert "median" in results["stages"]["export[words_approx]"]
+        assert os.listdir(self.temp_dir) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,86 @@
+import tempfile
+import shutil
+import time
+from pathlib import Path
+import pytest
+from src.repo_digest.budget import BudgetPolicy, parse_weight, select_within_budget
+from src.repo_digest.core import export_repo_as_text
+
+
+def infos(*items):
+    return [{"path": path, "tokens": tokens, "bytes": tokens, "lines": 1} for path, tokens in items]
+
+
+class TestSelectWithinBudget:
+    def test_fits_budget_and_keeps_order(self):
+        files = infos(("a.py", 50), ("b.py", 40), ("c.py", 30), ("d.py", 20))
+        selected, dropped = select_within_budget(files, 90)
+        assert sum(f["tokens"] for f in selected) <= 90
+        assert [f["path"] for f in selected] == ["a.py", "b.py"]
+        assert [f["path"] for f in dropped] == ["c.py", "d.py"]
+
+    def test_back_fills_remaining_budget(self):
+        files = infos(("big.py", 80), ("huge.py", 200), ("small.py", 15), ("tiny.py", 5))
+        selected, _ = select_within_budget(files, 100)
+        assert [f["path"] for f in selected] == ["big.py", "small.py", "tiny.py"]
+
+    def test_fill_beats_largest_first(self):
+        files = infos(("a.py", 60), ("b.py", 50), ("c.py", 50))
+        selected, dropped = select_within_budget(files, 100)
+        assert [f["path"] for f in selected] == ["b.py", "c.py"]
+        assert [f["path"] for f in dropped] == ["a.py"]
+
+    def test_smallest_first(self):
+        files = infos(("a.py", 60), ("b.py", 30), ("c.py", 30), ("d.py", 10))
+        selected, _ = select_within_budget(files, 70, BudgetPolicy(smallest_first=True))
+        assert [f["path"] for f in selected] == ["b.py", "c.py", "d.py"]
+
+    def test_weights(self):
+        files = infos(("docs/guide.md", 50), ("src/app.py", 50), ("tests/test_app.py", 50))
+        policy = BudgetPolicy(ext_weights={".md": 0.5}, path_weights=[("tests/*", 0)])
+        selected, dropped = select_within_budget(files, 100, policy)
+        assert [f["path"] for f in selected] == ["docs/guide.md", "src/app.py"]
+        assert [f["path"] for f in dropped] == ["tests/test_app.py"]
+
+        selected, _ = select_within_budget(files, 50, policy)
+        assert [f["path"] for f in selected] == ["src/app.py"]
+
+    def test_parse_weight(self):
+        assert parse_weight(".py=2") == (".py", 2.0)
+        assert parse_weight("a=b/*=0.5") == ("a=b/*", 0.5)
+        with pytest.raises(ValueError):
+            parse_weight("noweight")
+
+    def test_large_candidate_set(self):
+        files = infos(*((f"pkg{i % 100}/mod{i}.py", (i * 7919) % 5000) for i in range(100_000)))
+        start = time.perf_counter()
+        selected, dropped = select_within_budget(files, 1_000_000)
+        assert time.perf_counter() - start < 2.0
+        assert len(selected) + len(dropped) == len(files)
+
+
+class TestBudgetExport:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_export_reports_dropped_files(self):
+        (self.test_repo / "keep.py").write_text("a b c")
+        (self.test_repo / "drop.py").write_text(" ".join(["word"] * 100))
+        output_file = self.test_repo / "output.txt"
+
+        result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, max_tokens=10)
+
+        assert result == 0
+        content = output_file.read_text()
+        assert "FILE: keep.py" in content
+        assert "FILE: drop.py" not in content
+        assert "Total tokens: 3" in content
+        assert "===== DROPPED BY TOKEN BUDGET =====\ndrop.py : 100 tokens" in content
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
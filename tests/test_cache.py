@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.cache import TokenCache, CACHE_DB, CACHE_DIR
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.estimate import TokenEstimator
+from src.repo_digest.reader import read_files
+
+
+class TestTokenCache:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def run_pass(self, paths, keep_content=False):
+        cache = TokenCache.for_root(self.temp_dir, "words_approx")
+        infos = [info for _, info, _ in read_files(self.temp_dir, paths, keep_content=keep_content, cache=cache)]
+        cache.close()
+        return cache.stats, infos
+
+    def test_warm_cache_hits_by_stat(self):
+        paths = [self.create_test_file("a.py", "one two three"), self.create_test_file("b.py", "four")]
+
+        cold, infos = self.run_pass(paths)
+        assert cold.misses == 2 and cold.hits == 0
+
+        warm, cached = self.run_pass(paths)
+        assert warm.hits == 2 and warm.misses == 0
+        assert [i["tokens"] for i in cached] == [i["tokens"] for i in infos] == [3, 1]
+
+    def test_content_hash_fallback(self):
+        paths = [self.create_test_file("a.py", "one two three")]
+        self.run_pass(paths)
+
+        # Same content with a different stat signature
+        st = os.stat(self.test_repo / "a.py")
+        os.utime(self.test_repo / "a.py", ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+        stats, infos = self.run_pass(paths)
+        assert stats.hash_hits == 1 and stats.misses == 0
+        assert infos[0]["tokens"] == 3
+
+        stats, _ = self.run_pass(paths)
+        assert stats.hits == 1
+
+    def test_changed_content_is_a_miss(self):
+        paths = [self.create_test_file("a.py", "one two three")]
+        self.run_pass(paths)
+        self.create_test_file("a.py", "one two three four five")
+
+        stats, infos = self.run_pass(paths)
+        assert stats.misses == 1
+        assert infos[0]["tokens"] == 5
+
+    def test_eviction_bounds_size(self):
+        paths = [self.create_test_file(f"f{i}.py", f"content {i} " * 5) for i in range(400)]
+        cache = TokenCache.for_root(self.temp_dir, "words_approx", max_bytes=32 * 1024)
+        list(read_files(self.temp_dir, paths, keep_content=False, cache=cache))
+        cache.close()
+
+        assert cache.stats.evicted > 0
+        assert os.path.getsize(cache.path) <= 32 * 1024
+
+    def test_export_with_cache(self):
+        self.create_test_file("main.py", "print('hello')")
+        output_file = self.test_repo / "output.txt"
+
+        for _ in range(2):
+            result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, cache=True)
+            assert result == 0
+
+        assert (self.test_repo / CACHE_DIR).is_dir()
+        content = output_file.read_text()
+        assert "print('hello')" in content
+        assert CACHE_DIR not in content
+
+    def test_estimates_are_cached_per_ratio_table(self):
+        assert TokenEstimator().cache_key() == TokenEstimator().cache_key()
+        assert TokenEstimator().cache_key() != TokenEstimator(ratios={".py": 2.0}).cache_key()
+        self.create_test_file("repo/main.py", "x" * 340)
+        cache_dir = str(self.test_repo / "cache")
+        assert export_repo_as_text(str(self.test_repo / "repo"), str(self.test_repo / "out.txt"), respect_gitignore=False, tokenizer="estimate", cache_dir=cache_dir) == 0
+        with sqlite3.connect(os.path.join(cache_dir, CACHE_DB)) as conn:
+            assert conn.execute("SELECT DISTINCT tokenizer FROM entries").fetchall() == [(TokenEstimator().cache_key(),)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
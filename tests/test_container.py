@@ -0,0 +1,98 @@
+import tempfile
+import shutil
+from io import StringIO
+from pathlib import Path
+import pytest
+from src.repo_digest.cli import main
+from src.repo_digest.container import ContainerError, DigestContainer, is_container
+from src.repo_digest.core import export_repo_as_text
+
+
+class TestDigestContainer:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir) / "repo"
+        self.test_repo.mkdir()
+        self.out_dir = Path(self.temp_dir) / "out"
+        self.out_dir.mkdir()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def make_tree(self):
+        self.create_test_file("main.py", "print('hello')\n")
+        self.create_test_file("src/app.py", "def run():\n    return 'é'\n")
+        self.create_test_file("src/copy.py", "def run():\n    return 'é'\n")
+        self.create_test_file("docs/readme.md", "# title\nno trailing newline")
+        self.create_test_file("big.txt", "".join(f"line {i}\n" for i in range(500)))
+
+    def export(self, name: str, **options) -> Path:
+        output_file = self.out_dir / name
+        assert export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, **options) == 0
+        return output_file
+
+    def strip(self, text: str):
+        return [l for l in text.splitlines() if not l.startswith("Generated:")]
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_render_matches_text_export(self, compress):
+        self.make_tree()
+        options = dict(dedup=True, max_file_bytes=300, oversize="head-tail")
+        text = self.export("out.txt", **options).read_text()
+        path = self.export("out.rdc", output_format="container", compress=compress, **options)
+        assert is_container(str(path))
+        with DigestContainer(str(path)) as container:
+            assert container.compressed == compress
+            buf = StringIO()
+            container.render(buf)
+        assert self.strip(buf.getvalue()) == self.strip(text)
+
+    def test_random_access(self):
+        self.make_tree()
+        path = self.export("out.rdc", output_format="container", dedup=True)
+        with DigestContainer(str(path)) as container:
+            assert len(container) == 5
+            assert "src/app.py" in container
+            assert container.read("src/app.py") == "def run():\n    return 'é'\n"
+            assert container.entry("src/copy.py")["duplicate_of"] == "src/app.py"
+            assert container.read("src/copy.py") == container.read("src/app.py")
+            assert container.entry("main.py")["tokens"] > 0
+            tokens = container.entry("main.py")["tokens"]
+            sections = "".join(container.iter_sections(["main.py"]))
+            assert sections == f"\n===== FILE: main.py =====\n[TOKENS: {tokens} | LINES: 1 | BYTES: 15]\nprint('hello')\n\n"
+            with pytest.raises(KeyError):
+                container.read("missing.py")
+
+    def test_not_a_container(self):
+        self.make_tree()
+        text = self.export("out.txt")
+        assert not is_container(str(text))
+        with pytest.raises(ContainerError):
+            DigestContainer(str(text))
+
+    def test_cli(self, capsys):
+        self.make_tree()
+        path = str(self.export("out.rdc", output_format="container"))
+        main(["container", "list", path])
+        listing = capsys.readouterr().out
+        assert "src/app.py : " in listing
+
+        main(["container", "extract", path, "docs/readme.md", "-d", str(self.out_dir / "x")])
+        assert (self.out_dir / "x" / "docs" / "readme.md").read_text() == "# title\nno trailing newline"
+
+        rendered = self.out_dir / "render.txt"
+        main(["container", "render", path, "-o", str(rendered)])
+        assert self.strip(rendered.read_text()) == self.strip(self.export("out.txt").read_text())
+
+        with pytest.raises(SystemExit):
+            main(["container", "extract", path, "../escape.py"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,3 +1,4 @@
+import io
 import os
 import tempfile
 import shutil
@@ -8,9 +9,12 @@ from src.repo_digest.core import (
     is_ignored,
     load_gitignore,
     iter_files,
+    build_dir_aggregates,
+    print_dir_tree,
     SENSITIVE_PATTERNS,
     EXCLUDES
 )
+from src.repo_digest.fileio import looks_binary
 
 
 class TestRepoDigest:
@@ -193,6 +197,159 @@ class TestRepoDigest:
         assert "video.mp4" not in content
         assert "archive.zip" not in content
 
+    def test_parallel_export_matches_serial(self):
+        """Test that jobs > 1 produces the same output as a serial run"""
+        for i in range(12):
+            self.create_test_file(f"pkg{i % 3}/mod{i}.py", f"value = {i}\n" * (i + 1))
+        self.create_test_file("README.md", "# Test")
+
+        outputs = []
+        for jobs in (1, 2):
+            output_file = self.test_repo / f"output{jobs}.txt"
+            result = export_repo_as_text(
+                str(self.test_repo),
+                str(output_file),
+                respect_gitignore=False,
+                jobs=jobs
+            )
+            assert result == 0
+            lines = output_file.read_text().splitlines()
+            outputs.append([l for l in lines if not l.startswith("Generated:")])
+            output_file.unlink()
+
+        assert outputs[0] == outputs[1]
+
+    def test_stream_export_matches_buffered(self):
+        """Test that streaming file bodies from disk keeps the output format"""
+        self.create_test_file("main.py", "print('hello')\n" * 50)
+        self.create_test_file("src/utils.py", "def helper():\n    return 'é'\n")
+        self.create_test_file("notes.txt", "no trailing newline")
+
+        outputs = []
+        for stream in (False, True):
+            output_file = self.test_repo / f"output_{stream}.txt"
+            result = export_repo_as_text(
+                str(self.test_repo),
+                str(output_file),
+                respect_gitignore=False,
+                stream=stream
+            )
+            assert result == 0
+            lines = output_file.read_text(encoding="utf-8").splitlines()
+            outputs.append([l for l in lines if not l.startswith("Generated:")])
+            output_file.unlink()
+
+        assert outputs[0] == outputs[1]
+        assert "    return 'é'" in outputs[1]
+
+    def test_binary_sniffing(self):
+        """Test that unlisted binary files are detected by content and reported"""
+        (self.test_repo / "model.wasm").write_bytes(b"\0asm\x01\0\0\0" + bytes(range(256)) * 40)
+        (self.test_repo / "blob").write_bytes(bytes(range(1, 32)) * 100)
+        self.create_test_file("main.py", "print('hello')")
+        self.create_test_file("notes.md", "caf\u00e9 na\u00efve r\u00e9sum\u00e9\n" * 50)
+
+        output_file = self.test_repo / "output.txt"
+        result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False)
+
+        assert result == 0
+        content = output_file.read_text(encoding="utf-8")
+        assert "FILE: main.py" in content
+        assert "FILE: notes.md" in content
+        assert "FILE: model.wasm" not in content
+        assert "FILE: blob" not in content
+        skipped = content.split("===== SKIPPED BINARY FILES =====\n")[1]
+        assert "model.wasm : " in skipped
+        assert "blob : " in skipped
+
+    def test_oversized_files_skipped(self):
+        """Test that files over --max-file-bytes are skipped and listed"""
+        self.create_test_file("big.py", "x = 1\n" * 1000)
+        self.create_test_file("small.py", "y = 2\n")
+
+        output_file = self.test_repo / "output.txt"
+        result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, max_file_bytes=1024)
+
+        assert result == 0
+        content = output_file.read_text()
+        assert "FILE: small.py" in content
+        assert "FILE: big.py" not in content
+        assert "big.py : 6000 bytes" in content.split("===== SKIPPED LARGE FILES =====\n")[1]
+
+        # the size limit is checked before the binary sniff
+        (self.test_repo / "big.bin").write_bytes(b"\0" * 2048)
+        export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, max_file_bytes=1024)
+        assert "big.bin : 2048 bytes" in output_file.read_text().split("===== SKIPPED LARGE FILES =====\n")[-1]
+
+    def test_oversized_files_truncated(self):
+        """Test head and head-tail truncation of oversized files, buffered and streamed"""
+        body = "".join(f"line {i}\n" for i in range(1000))
+        self.create_test_file("big.txt", body)
+
+        for oversize in ("head", "head-tail"):
+            outputs = []
+            for stream in (False, True):
+                output_file = self.test_repo / "output.txt"
+                result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, max_file_bytes=200, oversize=oversize, stream=stream)
+                assert result == 0
+                content = output_file.read_text()
+                output_file.unlink()
+                outputs.append([l for l in content.splitlines() if not l.startswith("Generated:")])
+
+                assert "line 0\n" in content
+                assert "TRUNCATED: " + oversize in content
+                assert "truncated (" + oversize in content.split("===== SUMMARY BY FILE =====\n")[1]
+                section = content.split("===== FILE: big.txt =====\n")[1].split("\n===== ")[0]
+                assert len(section) < 400
+                if oversize == "head":
+                    assert "line 999" not in section
+                else:
+                    assert "line 999\n" in section
+                    assert "bytes omitted] ..." in section
+            assert outputs[0] == outputs[1]
+
+    def test_max_file_tokens_uses_stat_estimate(self):
+        """Test that the token limit is applied from file size without reading"""
+        self.create_test_file("big.md", "word " * 2000)
+        self.create_test_file("small.md", "word")
+
+        output_file = self.test_repo / "output.txt"
+        result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, max_file_tokens=100)
+
+        assert result == 0
+        content = output_file.read_text()
+        assert "FILE: small.md" in content
+        assert "big.md : " in content.split("===== SKIPPED LARGE FILES =====\n")[1]
+
+    def test_dedup_writes_each_body_once(self):
+        """Test that identical files are written once and referenced afterwards"""
+        config = "setting = 1\nother = 'two three four'\n"
+        self.create_test_file("a/config.py", config)
+        self.create_test_file("b/config.py", config)
+        self.create_test_file("lib/config.py", config)
+        self.create_test_file("main.py", "print('hello')\n")
+
+        outputs = []
+        for stream in (False, True):
+            output_file = self.test_repo.parent / f"dedup_{os.getpid()}.txt"
+            try:
+                result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, dedup=True, stream=stream)
+                assert result == 0
+                content = output_file.read_text()
+            finally:
+                output_file.unlink()
+            outputs.append([l for l in content.splitlines() if not l.startswith("Generated:")])
+
+        assert outputs[0] == outputs[1]
+        assert content.count("other = 'two three four'") == 1
+        assert "DUPLICATE OF: a/config.py]" in content.split("===== FILE: b/config.py =====\n")[1].split("\n")[0]
+        assert "lib/config.py : " in content and ", duplicate of a/config.py" in content
+        header = dict(l.split(": ", 1) for l in content.split("\n\n")[0].splitlines()[1:])
+        per_copy = int(content.split("===== FILE: main.py =====\n[TOKENS: ")[0].split("===== FILE: a/config.py =====\n[TOKENS: ")[1].split(" ")[0])
+        assert int(header["Deduplicated tokens"]) == int(header["Total tokens"]) - 2 * per_copy
+        assert int(header["Deduplicated bytes"]) == int(header["Total bytes"]) - 2 * len(config)
+        assert header["Duplicate files"] == "2"
+
 
 class TestUtilityFunctions:
     def test_is_ignored_sensitive_patterns(self):
@@ -212,6 +369,17 @@ class TestUtilityFunctions:
         assert is_ignored("dist/bundle.js", [])
         assert not is_ignored("src/main.py", [])
     
+    def test_looks_binary(self):
+        """Test content sniffing on sample heads"""
+        assert looks_binary(b"ELF\0\0\x01")
+        assert looks_binary(bytes(range(1, 32)) * 4)
+        assert looks_binary(bytes(range(128, 256)) * 4)
+        assert not looks_binary(b"")
+        assert not looks_binary(b"def main():\n\treturn 1\r\n")
+        assert not looks_binary("na\u00efve caf\u00e9".encode("utf-8"))
+        # a multi-byte character cut off at the end of the sample
+        assert not looks_binary("caf\u00e9".encode("utf-8")[:-1])
+
     def test_load_gitignore(self):
         """Test gitignore loading"""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -226,6 +394,28 @@ class TestUtilityFunctions:
             assert "# comment" not in patterns  # Comments should be filtered
             assert "" not in patterns  # Empty lines should be filtered
 
+    def test_print_dir_tree(self):
+        """The old tree printer still writes the lines below the given directory"""
+        infos = [
+            {"path": os.path.join("a", "b", "c.py"), "tokens": 10, "bytes": 40},
+            {"path": os.path.join("a", "d.py"), "tokens": 3, "bytes": 12},
+            {"path": os.path.join("x", "y.md"), "tokens": 2, "bytes": 8},
+        ]
+        aggregates, children = build_dir_aggregates(infos)
+        out = io.StringIO()
+        print_dir_tree(out, aggregates, children)
+        assert out.getvalue() == (
+            "├── a/ (files: 2, tokens: 13, bytes: 52)\n"
+            "│   └── b/ (files: 1, tokens: 10, bytes: 40)\n"
+            "└── x/ (files: 1, tokens: 2, bytes: 8)\n"
+        )
+        out = io.StringIO()
+        print_dir_tree(out, aggregates, children, current="a", prefix="├── ")
+        assert out.getvalue() == (
+            "├── a/ (files: 2, tokens: 13, bytes: 52)\n"
+            "│   └── b/ (files: 1, tokens: 10, bytes: 40)\n"
+        )
+
 
 if __name__ == "__main__":
     pytest.main([__file__])
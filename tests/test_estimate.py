@@ -0,0 +1,97 @@
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest import core
+from src.repo_digest.cli import main
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.estimate import TokenEstimator, DEFAULT_ERROR
+
+
+class FixedRatioEncoder:
+    """Stands in for a real encoder: one token per `ratio` characters."""
+
+    def __init__(self, ratio):
+        self.ratio = ratio
+
+    def encode(self, text):
+        return [0] * max(1, len(text) // self.ratio)
+
+
+class TestTokenEstimator:
+    def test_estimate_from_size(self):
+        est = TokenEstimator(ratios={".py": 4.0}, default_ratio=2.0)
+        assert est.estimate_bytes(400, "a.py") == 100
+        assert est.estimate_bytes(400, "a.unknown") == 200
+        assert est.estimate_bytes(0, "a.py") == 0
+        assert est.count("x" * 40, "pkg/a.py") == 10
+
+    def test_bounds(self):
+        est = TokenEstimator(errors={".py": 0.1})
+        low, high = est.bounds({".py": 1000, ".md": 100})
+        assert low == 1100 - 100 - int(100 * DEFAULT_ERROR)
+        assert high == 1100 + 100 + int(100 * DEFAULT_ERROR)
+
+    def test_calibrate(self):
+        samples = [(f"m{i}.py", "abcdefgh" * (10 + i)) for i in range(5)]
+        samples.append(("one.md", "a few words"))
+        est = TokenEstimator.calibrate(samples, FixedRatioEncoder(8))
+        assert est.ratio(".py") == pytest.approx(8.0)
+        assert est.error(".py") == pytest.approx(0.0)
+        # too few samples: defaults kept
+        assert est.error(".md") == DEFAULT_ERROR
+
+
+class TestEstimateExport:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_preview_with_estimator(self, capsys):
+        (self.test_repo / "main.py").write_text("x" * 340)
+        result = export_repo_as_text(str(self.test_repo), "unused.txt", respect_gitignore=False, preview=True, tokenizer="estimate")
+        assert result == 0
+        out = capsys.readouterr().out
+        assert "Tokenizer: estimate" in out
+        assert "Estimated total tokens: 100" in out
+        assert "Estimate bounds: 75-125 tokens" in out
+
+    def test_export_with_estimator_and_budget(self):
+        (self.test_repo / "a.py").write_text("x" * 340)
+        (self.test_repo / "b.py").write_text("y" * 3400)
+        output_file = self.test_repo / "output.txt"
+        result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, tokenizer="estimate", max_tokens=500)
+        assert result == 0
+        content = output_file.read_text()
+        assert "FILE: a.py" in content
+        assert "FILE: b.py" not in content
+        assert "Estimate bounds:" in content
+
+    def test_exact_selected_skips_binary_files(self, monkeypatch, capsys):
+        monkeypatch.setattr(core, "load_encoder", lambda: FixedRatioEncoder(4))
+        (self.test_repo / "main.py").write_text("x" * 340)
+        (self.test_repo / "blob.py").write_bytes(b"\x00\x01" * 200)
+        result = export_repo_as_text(str(self.test_repo), "unused.txt", respect_gitignore=False, preview=True, tokenizer="estimate", exact_selected=True)
+        assert result == 0
+        out = capsys.readouterr().out
+        assert "Total candidate files: 1" in out
+        assert "Estimated total tokens: 85" in out
+        assert "Binary files skipped: 1" in out
+
+    def test_calibrate_needs_estimate_tokenizer(self, capsys):
+        for flag in ("--calibrate", "--exact-selected"):
+            with pytest.raises(SystemExit) as exc:
+                main([str(self.test_repo), flag, "--preview"])
+            assert exc.value.code == 2
+            assert "need --tokenizer estimate" in capsys.readouterr().err
+
+    def test_unknown_tokenizer(self):
+        with pytest.raises(ValueError):
+            export_repo_as_text(str(self.test_repo), "unused.txt", tokenizer="nope")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
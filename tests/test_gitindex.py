@@ -0,0 +1,96 @@
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.gitindex import GitIndexError, parse_index, read_git_index
+from src.repo_digest.ignore import IgnoreMatcher
+from src.repo_digest.walk import iter_index_files
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=repo, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+class TestGitIndex:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+    def test_rejects_non_index_data(self):
+        with pytest.raises(GitIndexError):
+            parse_index(b"not an index")
+        with pytest.raises(GitIndexError):
+            parse_index(struct.pack(">4sLL", b"DIRC", 9, 0))
+
+    def test_missing_repository(self):
+        with pytest.raises(GitIndexError):
+            read_git_index(self.temp_dir)
+
+    @requires_git
+    @pytest.mark.parametrize("version", ["2", "3", "4"])
+    def test_matches_git_ls_files(self, version):
+        self.create_test_file("main.py", "print('hello')")
+        self.create_test_file("src/pkg/deep/module.py", "x = 1")
+        self.create_test_file("src/pkg/deep/other.py", "y = 2")
+        self.create_test_file("node_modules/lib/index.js", "tracked anyway")
+        self.create_test_file("untracked.py", "not added")
+        git(self.test_repo, "init", "-q")
+        git(self.test_repo, "add", "main.py", "src", "node_modules")
+        git(self.test_repo, "update-index", "--index-version", version)
+
+        paths = [e.path for e in read_git_index(self.temp_dir)]
+        expected = subprocess.run(
+            ["git", "ls-files"], cwd=self.test_repo, check=True, capture_output=True, text=True
+        ).stdout.split()
+        assert paths == expected
+
+        files = [p.replace(os.sep, "/") for p in iter_index_files(self.temp_dir)]
+        assert files == ["main.py", "src/pkg/deep/module.py", "src/pkg/deep/other.py"]
+
+    @requires_git
+    def test_tracked_files_under_gitignored_dirs_are_kept(self):
+        self.create_test_file("generated/schema.py", "tracked")
+        self.create_test_file("generated/scratch.py", "untracked")
+        git(self.test_repo, "init", "-q")
+        git(self.test_repo, "add", "generated/schema.py")
+        self.create_test_file(".gitignore", "generated/\n")
+
+        matcher = IgnoreMatcher.for_root(self.temp_dir)
+        files = [p.replace(os.sep, "/") for p in iter_index_files(self.temp_dir, matcher)]
+        assert files == ["generated/schema.py"]
+
+    @requires_git
+    def test_export_from_git_index(self):
+        self.create_test_file("main.py", "print('hello')")
+        self.create_test_file("scratch.py", "untracked")
+        git(self.test_repo, "init", "-q")
+        git(self.test_repo, "add", "main.py")
+
+        output_file = self.test_repo / "output.txt"
+        result = export_repo_as_text(str(self.test_repo), str(output_file), source="git-index")
+
+        assert result == 0
+        content = output_file.read_text()
+        assert "FILE: main.py" in content
+        assert "scratch.py" not in content
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
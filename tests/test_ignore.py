@@ -0,0 +1,113 @@
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import iter_files
+from src.repo_digest.ignore import IgnoreMatcher, GitignoreRules
+
+
+class TestGitignoreRules:
+    def test_unanchored_matches_any_level(self):
+        rules = GitignoreRules('', ["*.log"])
+        assert rules.match("debug.log", False)
+        assert rules.match("a/b/debug.log", False)
+        assert rules.match("main.py", False) is None
+
+    def test_anchored_and_dir_only(self):
+        rules = GitignoreRules('', ["/build.txt", "cache/"])
+        assert rules.match("build.txt", False)
+        assert rules.match("sub/build.txt", False) is None
+        assert rules.match("cache", True)
+        assert rules.match("cache", False) is None
+
+    def test_negation_last_rule_wins(self):
+        rules = GitignoreRules('', ["*.txt", "!keep.txt"])
+        assert rules.match("drop.txt", False) is True
+        assert rules.match("keep.txt", False) is False
+
+    def test_double_star(self):
+        rules = GitignoreRules('', ["docs/**/*.md"])
+        assert rules.match("docs/a.md", False)
+        assert rules.match("docs/x/y/a.md", False)
+        assert rules.match("other/a.md", False) is None
+
+    def test_nested_base(self):
+        rules = GitignoreRules('pkg', ["/gen.py", "*.out"])
+        assert rules.match("pkg/gen.py", False)
+        assert rules.match("gen.py", False) is None
+        assert rules.match("pkg/sub/x.out", False)
+
+
+class TestIgnoreMatcher:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, path: str, content: str = "x"):
+        p = self.root / path
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(content)
+
+    def test_name_extension_and_sensitive(self):
+        matcher = IgnoreMatcher(self.temp_dir)
+        assert matcher.is_ignored("node_modules/pkg/index.js")
+        assert matcher.is_ignored("src/app.pyc")
+        assert matcher.is_ignored("img/logo.PNG")
+        assert matcher.is_ignored(".env.local")
+        assert not matcher.is_ignored(".env.local", check_sensitive=False)
+        assert not matcher.is_ignored("src/main.py")
+
+    def test_nested_gitignore_and_negation(self):
+        self.write(".gitignore", "*.gen\n")
+        self.write("pkg/.gitignore", "!keep.gen\nlocal/\n")
+        self.write("a.gen")
+        self.write("pkg/drop.gen")
+        self.write("pkg/keep.gen")
+        self.write("pkg/local/file.py")
+        self.write("pkg/mod.py")
+
+        matcher = IgnoreMatcher.for_root(self.temp_dir)
+        files = sorted(p.replace("\\", "/") for p in iter_files(self.temp_dir, matcher=matcher))
+
+        assert "a.gen" not in files
+        assert "pkg/drop.gen" not in files
+        assert "pkg/keep.gen" in files
+        assert "pkg/local/file.py" not in files
+        assert "pkg/mod.py" in files
+
+    def test_escaped_trailing_space(self):
+        self.write(".gitignore", "foo\\ \nbar  \r\n")
+        self.write("foo ")
+        self.write("foo")
+        self.write("bar")
+
+        matcher = IgnoreMatcher.for_root(self.temp_dir)
+        assert matcher.is_ignored("foo ")
+        assert not matcher.is_ignored("foo")
+        assert matcher.is_ignored("bar")
+
+    def test_nested_gitignore_disabled(self):
+        self.write("pkg/.gitignore", "*.py\n")
+        self.write("pkg/mod.py")
+
+        matcher = IgnoreMatcher.for_root(self.temp_dir, respect_gitignore=False)
+        files = [p.replace("\\", "/") for p in iter_files(self.temp_dir, matcher=matcher)]
+
+        assert "pkg/mod.py" in files
+
+    def test_iter_files_defaults_to_export_rules(self):
+        self.write("pkg/.gitignore", "*.gen\n")
+        self.write("pkg/drop.gen")
+        self.write("pkg/mod.py")
+
+        files = [p.replace("\\", "/") for p in iter_files(self.temp_dir)]
+        assert files == ["pkg/.gitignore", "pkg/mod.py"]
+        files = [p.replace("\\", "/") for p in iter_files(self.temp_dir, respect_gitignore=False)]
+        assert "pkg/drop.gen" in files
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
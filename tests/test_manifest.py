@@ -0,0 +1,85 @@
+import json
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.manifest import Manifest, ManifestError
+
+
+class TestDeltaExport:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir) / "repo"
+        self.test_repo.mkdir()
+        self.output_file = Path(self.temp_dir) / "output.txt"
+        self.manifest = Path(self.temp_dir) / "manifest.json"
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+    def export(self, **kwargs):
+        return export_repo_as_text(str(self.test_repo), str(self.output_file), respect_gitignore=False, **kwargs)
+
+    def test_manifest_written(self):
+        self.create_test_file("main.py", "print('hello')")
+        assert self.export(manifest_file=str(self.manifest)) == 0
+
+        data = json.loads(self.manifest.read_text())
+        entry = data["files"]["main.py"]
+        assert entry["bytes"] == len("print('hello')")
+        assert entry["tokens"] == 1
+        assert {"digest", "mtime_ns", "inode", "lines"} <= set(entry)
+
+    def test_delta_contains_only_changes(self):
+        self.create_test_file("keep.py", "unchanged = True")
+        self.create_test_file("edit.py", "value = 1")
+        self.create_test_file("gone.py", "old = True")
+        assert self.export(manifest_file=str(self.manifest)) == 0
+
+        self.create_test_file("edit.py", "value = 2")
+        self.create_test_file("new.py", "fresh = True")
+        (self.test_repo / "gone.py").unlink()
+
+        result = self.export(previous_manifest=str(self.manifest), manifest_file=str(self.manifest))
+        assert result == 0
+
+        content = self.output_file.read_text()
+        assert "===== REPO DELTA =====" in content
+        assert "A new.py" in content
+        assert "M edit.py" in content
+        assert "D gone.py" in content
+        assert "FILE: edit.py" in content
+        assert "FILE: new.py" in content
+        assert "FILE: keep.py" not in content
+        assert "Total files: 3" in content
+
+        # The rewritten manifest is the base for the next delta
+        assert "gone.py" not in Manifest.load(str(self.manifest)).files
+        assert self.export(previous_manifest=str(self.manifest)) == 0
+        assert "Unchanged: 3" in self.output_file.read_text()
+
+    def test_delta_sees_truncated_files_change(self):
+        self.create_test_file("big.txt", "".join(f"line {i}\n" for i in range(100)))
+        assert self.export(manifest_file=str(self.manifest), max_file_bytes=200, oversize="head") == 0
+        assert "digest" in Manifest.load(str(self.manifest)).files["big.txt"]
+
+        self.create_test_file("big.txt", "".join(f"edited {i}\n" for i in range(100)))
+        assert self.export(previous_manifest=str(self.manifest), max_file_bytes=200, oversize="head") == 0
+        content = self.output_file.read_text()
+        assert "M big.txt" in content
+        assert "edited 0" in content
+
+    def test_invalid_manifest(self):
+        self.manifest.write_text("{}")
+        with pytest.raises(ManifestError):
+            Manifest.load(str(self.manifest))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
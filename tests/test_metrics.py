@@ -0,0 +1,79 @@
+import json
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.metrics import RunMetrics
+
+
+class TestRunMetrics:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def export(self, **kwargs):
+        output_file = self.test_repo / "output.txt"
+        result = export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, **kwargs)
+        lines = output_file.read_text().splitlines()
+        output_file.unlink()
+        return result, [l for l in lines if not l.startswith("Generated:")]
+
+    def test_phases_and_report(self):
+        for i in range(5):
+            self.create_test_file(f"src/m{i}.py", "x = 1\n" * (i + 1) * 100)
+        (self.test_repo / "blob").write_bytes(b"\0" * 100)
+
+        events = []
+        metrics = RunMetrics(slowest=3, hooks=[lambda event, data: events.append((event, data))])
+        result, _ = self.export(metrics=metrics)
+        assert result == 0
+
+        report = metrics.finish()
+        assert report["exit_code"] == 0
+        for phase in ("encoder_load", "walk", "read", "aggregate", "write"):
+            assert report["phases"][phase]["wall"] >= 0
+        assert report["phases"]["ignore"]["parent"] == "walk"
+        assert report["phases"]["tokenize"]["parent"] == "read"
+        assert report["files"] == 6
+        assert len(report["slowest_files"]) == 3
+        assert report["files_per_second"] > 0
+
+        names = [e for e, _ in events]
+        assert names[-1] == "run_end"
+        assert ("skip", {"path": "blob", "reason": "binary"}) in events
+        assert names.count("phase_start") == names.count("phase_end")
+
+    def test_metrics_do_not_change_output(self):
+        self.create_test_file("main.py", "print('hello')\n")
+        self.create_test_file("docs/readme.md", "# title\n")
+
+        plain = self.export()
+        measured = self.export(metrics=RunMetrics(), jobs=2)
+        assert plain == measured
+
+    def test_save_and_format(self):
+        self.create_test_file("main.py", "print('hello')\n")
+        metrics = RunMetrics()
+        result = export_repo_as_text(str(self.test_repo), str(self.test_repo / "output.txt"), respect_gitignore=False, preview=True, metrics=metrics)
+        assert result == 0
+
+        path = self.test_repo / "metrics.json"
+        metrics.save(str(path))
+        data = json.loads(path.read_text())
+        assert data["files"] == 1
+        assert "read_seconds" not in json.dumps(data)
+        assert "===== RUN STATS =====" in metrics.format()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
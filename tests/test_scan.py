@@ -0,0 +1,87 @@
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.scan import FileRecord, ScanSummary, scan_repo
+from src.repo_digest.tokenizers import tiktoken_available
+
+
+class TestScanRepo:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def test_yields_records_then_summary(self):
+        self.create_test_file("main.py", "print('hello')\n")
+        self.create_test_file("src/util.py", "a b c\nd\n")
+        (self.test_repo / "blob").write_bytes(b"\0" * 64)
+
+        items = list(scan_repo(self.temp_dir, respect_gitignore=False))
+        records, summary = items[:-1], items[-1]
+
+        assert isinstance(summary, ScanSummary) and summary.complete
+        assert all(isinstance(r, FileRecord) for r in records)
+        assert sorted(r.path for r in records) == ["main.py", "src/util.py"]
+        assert summary.files == 2
+        assert summary.tokens == sum(r.tokens for r in records)
+        assert summary.by_ext_files[".py"] == 2
+        assert [r.path for r in summary.skipped_binary] == ["blob"]
+
+    def test_record_content_is_lazy(self):
+        self.create_test_file("main.py", "print('hello')\n")
+
+        record = next(scan_repo(self.temp_dir, respect_gitignore=False))
+        assert "content" not in record
+        assert record.content == "print('hello')\n"
+        assert not hasattr(record, "__dict__")
+
+        kept = next(scan_repo(self.temp_dir, respect_gitignore=False, keep_content=True))
+        assert kept["content"] == "print('hello')\n"
+        kept.drop_content()
+        assert "content" not in kept
+
+    def test_record_mapping_access(self):
+        self.create_test_file("main.py", "one two\n")
+
+        record = next(scan_repo(self.temp_dir, respect_gitignore=False))
+        assert record["tokens"] == record.tokens == 2
+        assert record.get("digest") is None and "digest" not in record
+        with pytest.raises(KeyError):
+            record["digest"]
+
+        tracked = next(scan_repo(self.temp_dir, respect_gitignore=False, track=True))
+        assert "digest" in tracked and "mtime_ns" in tracked
+        assert tracked.as_dict()["lines"] == 1
+
+    def test_stop_on_blocked(self):
+        self.create_test_file("main.py", "print('hello')")
+        self.create_test_file(".env", "SECRET=1")
+
+        items = list(scan_repo(self.temp_dir, respect_gitignore=False, stop_on_blocked=True))
+        assert len(items) == 1
+        assert not items[0].complete
+        assert items[0].blocked_sensitive == [".env"]
+
+        items = list(scan_repo(self.temp_dir, respect_gitignore=False))
+        assert [r.path for r in items[:-1]] == ["main.py"]
+
+    @pytest.mark.skipif(tiktoken_available(), reason="needs tiktoken to be missing")
+    def test_calibration_fallback_is_a_notice(self, capsys):
+        self.create_test_file("main.py", "print('hello')")
+
+        summary = list(scan_repo(self.temp_dir, respect_gitignore=False, tokenizer="estimate", calibrate=True))[-1]
+        assert summary.notices == ["[estimate] tiktoken is not installed; using default ratios"]
+        assert capsys.readouterr().out == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,217 @@
+import os
+import json
+import tempfile
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlencode
+import pytest
+from src.repo_digest.cli import main
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.serve import DigestService, ResultCache, make_server, tree_fingerprint
+from src.repo_digest.watch import InotifyWatcher
+
+
+class TestResultCache:
+    def test_lru_eviction_by_bytes(self):
+        cache = ResultCache(max_bytes=10)
+        cache.put(("a",), (200, "text/plain", b"1234"))
+        cache.put(("b",), (200, "text/plain", b"5678"))
+        assert cache.get(("a",)) is not None  # a is now most recent
+        cache.put(("c",), (200, "text/plain", b"90"))
+        assert cache.stats()["bytes"] == 10
+        cache.put(("d",), (200, "text/plain", b"x"))
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) is not None
+        assert cache.stats()["evicted"] == 1
+
+    def test_oversized_body_not_stored(self):
+        cache = ResultCache(max_bytes=3)
+        cache.put(("a",), (200, "text/plain", b"1234"))
+        assert cache.get(("a",)) is None
+        assert cache.stats()["entries"] == 0
+
+
+class TestDigestServer:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+        self.servers = []
+        self.base = self.start(allowed_roots=[self.temp_dir])
+
+    def teardown_method(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def start(self, **options):
+        server = make_server(port=0, quiet=True, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def get(self, endpoint: str, base=None, headers=None, **params):
+        params.setdefault("repo", self.temp_dir)
+        request = urllib.request.Request(f"{base or self.base}{endpoint}?{urlencode(params)}", headers=headers or {})
+        try:
+            with urllib.request.urlopen(request) as resp:
+                return resp.status, resp.headers, resp.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read().decode("utf-8")
+
+    def make_tree(self):
+        self.create_test_file("main.py", "print('hello')\n")
+        self.create_test_file("src/app.py", "def run():\n    return 1 + 2\n")
+        self.create_test_file("docs/readme.md", "# title\nsome words here\n")
+        self.create_test_file("debug.log", "ignored\n")
+        self.create_test_file(".gitignore", "*.log\n")
+
+    def test_digest_matches_export_and_is_cached(self):
+        self.make_tree()
+        output_file = Path(tempfile.mkdtemp()) / "out.txt"
+        try:
+            assert export_repo_as_text(self.temp_dir, str(output_file)) == 0
+            expected = [l for l in output_file.read_text().splitlines() if not l.startswith("Generated:")]
+        finally:
+            shutil.rmtree(output_file.parent)
+        status, headers, body = self.get("/digest")
+        assert status == 200
+        assert headers["X-Repo-Digest-Cache"] == "miss"
+        assert [l for l in body.splitlines() if not l.startswith("Generated:")] == expected
+        status, headers, again = self.get("/digest")
+        assert headers["X-Repo-Digest-Cache"] == "hit"
+        assert again == body
+
+    def test_change_invalidates_cache(self):
+        self.make_tree()
+        _, _, before = self.get("/preview")
+        self.create_test_file("new.py", "x = 1\n")
+        status, headers, after = self.get("/preview")
+        assert headers["X-Repo-Digest-Cache"] == "miss"
+        assert json.loads(after)["files"] == json.loads(before)["files"] + 1
+
+    def test_preview(self):
+        self.make_tree()
+        status, _, body = self.get("/preview", tokenizer="estimate")
+        data = json.loads(body)
+        assert status == 200
+        assert data["files"] == 4  # .gitignore is exported too
+        assert data["tokenizer"] == "estimate"
+        assert set(data["by_extension"]) == {".py", ".md", "<no-ext>"}
+        assert "estimate_bounds" in data
+
+    def test_tree(self):
+        self.make_tree()
+        status, _, body = self.get("/tree")
+        assert status == 200
+        assert body.startswith("===== DIRECTORY TREE =====\n./ (files: 4,")
+        assert "src/" in body
+
+    def test_file(self):
+        self.make_tree()
+        status, _, body = self.get("/file", path="src/app.py")
+        data = json.loads(body)
+        assert status == 200
+        assert data["content"] == "def run():\n    return 1 + 2\n"
+        assert data["lines"] == 2
+
+    def test_file_rejects_excluded_and_escaping_paths(self):
+        self.make_tree()
+        assert self.get("/file", path="debug.log")[0] == 404
+        assert self.get("/file", path="../etc/passwd")[0] == 400
+        assert self.get("/file", path="missing.py")[0] == 404
+        assert self.get("/file")[0] == 400
+
+    def test_sensitive_files_blocked(self):
+        self.make_tree()
+        self.create_test_file(".env", "SECRET=1\n")
+        status, _, body = self.get("/digest")
+        assert status == 403
+        assert json.loads(body)["blocked"] == [".env"]
+        assert self.get("/file", path=".env")[0] == 403
+        # only the server's own flag lets them through
+        assert self.get("/preview", allow_secrets="1")[0] == 403
+        base = self.start(allowed_roots=[self.temp_dir], allow_secrets=True)
+        assert self.get("/preview", base=base)[0] == 200
+        assert self.get("/file", base=base, path=".env")[0] == 200
+
+    def test_bad_requests(self):
+        assert self.get("/nope")[0] == 404
+        assert self.get("/preview", repo=os.path.join(self.temp_dir, "missing"))[0] == 404
+        assert self.get("/preview", max_file_bytes="lots")[0] == 400
+        status, _, body = self.get("/healthz")
+        assert status == 200
+        assert json.loads(body)["status"] == "ok"
+
+    def test_allowed_roots(self):
+        self.make_tree()
+        other = tempfile.mkdtemp()
+        try:
+            assert self.get("/preview", base=self.start(allowed_roots=[other]))[0] == 403
+        finally:
+            shutil.rmtree(other)
+        # without allowed roots only the current directory is served
+        base = self.start()
+        assert self.get("/file", base=base, repo="/", path="etc/passwd")[0] == 403
+        assert self.get("/preview", base=base)[0] == 403
+
+    def test_foreign_host_header_rejected(self):
+        self.make_tree()
+        status, _, body = self.get("/file", headers={"Host": "evil.example.com"}, path="main.py")
+        assert status == 403
+        assert "Host" in json.loads(body)["error"]
+        assert self.get("/file", headers={"Host": "localhost:8765"}, path="main.py")[0] == 200
+
+    def test_non_loopback_bind_refused(self, capsys):
+        with pytest.raises(SystemExit) as e:
+            main(["serve", "--host", "0.0.0.0", "--port", "0"])
+        assert e.value.code == 2
+        assert "--allow-remote" in capsys.readouterr().err
+        with pytest.raises(ValueError):
+            make_server("0.0.0.0", 0, allowed_roots=[self.temp_dir])
+        server = self.servers[0]
+        assert server.client_allowed("127.0.0.1") and server.client_allowed("::ffff:127.0.0.1")
+        assert not server.client_allowed("192.168.1.5")
+
+    def test_fingerprint_tracks_changes(self):
+        self.make_tree()
+        first = tree_fingerprint(self.temp_dir)
+        assert tree_fingerprint(self.temp_dir) == first
+        self.create_test_file("debug2.log", "still ignored\n")
+        assert tree_fingerprint(self.temp_dir) == first
+        self.create_test_file("main.py", "print('changed!')\n")
+        assert tree_fingerprint(self.temp_dir) != first
+
+    @pytest.mark.skipif(not InotifyWatcher.available(), reason="needs inotify")
+    def test_watch_fingerprint(self, monkeypatch):
+        self.make_tree()
+        service = DigestService(allowed_roots=[self.temp_dir])
+        try:
+            first = service.fingerprint(self.temp_dir)
+            # an unchanged tree is not walked again
+            monkeypatch.setattr("src.repo_digest.serve.walk_files", None)
+            assert service.fingerprint(self.temp_dir) == first
+            monkeypatch.undo()
+            self.create_test_file("main.py", "print('hullo')\n")
+            second = service.fingerprint(self.temp_dir)
+            assert second != first
+            self.create_test_file("pkg/new.py", "x = 1\n")
+            third = service.fingerprint(self.temp_dir)
+            assert third != second
+            self.create_test_file("pkg/new.py", "x = 2\n")
+            assert service.fingerprint(self.temp_dir) != third
+        finally:
+            service.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,75 @@
+import re
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.shards import plan_shards, shard_path, shard_index_path
+
+
+def info(path, tokens, size=None, lines=1):
+    return {"path": path, "tokens": tokens, "bytes": tokens if size is None else size, "lines": lines, "content": "x " * tokens}
+
+
+class TestShards:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir) / "repo"
+        self.test_repo.mkdir()
+        self.output_file = Path(self.temp_dir) / "repo_export.txt"
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+
+    def test_paths(self):
+        assert shard_path("out/repo_export.txt", 3) == "out/repo_export.part-003.txt"
+        assert shard_index_path("repo_export.txt") == "repo_export.index.txt"
+
+    def test_plan_keeps_files_whole(self):
+        files = [info(f"f{i}.py", 100) for i in range(10)]
+        shards = plan_shards(self.temp_dir, files, max_tokens=400)
+        assert len(shards) > 1
+        assert all(s.tokens <= 400 for s in shards)
+        assert [p.path for s in shards for p in s.pieces] == [f["path"] for f in files]
+        assert not any(p.is_split for s in shards for p in s.pieces)
+
+    def test_export_shards_and_index(self):
+        self.create_test_file("small.py", "x = 1\n")
+        self.create_test_file("big.py", "".join(f"line_{i} = {i}\n" for i in range(300)))
+        for i in range(5):
+            self.create_test_file(f"pkg/mod{i}.py", " ".join(["word"] * 60) + "\n")
+
+        result = export_repo_as_text(
+            str(self.test_repo), str(self.output_file), respect_gitignore=False, shard_tokens=200
+        )
+        assert result == 0
+        assert not self.output_file.exists()
+
+        parts = sorted(Path(self.temp_dir).glob("repo_export.part-*.txt"))
+        assert len(parts) > 2
+        for part in parts:
+            text = part.read_text()
+            assert text.startswith("===== REPO SHARD ")
+            shard_tokens = int(text.split("Shard tokens: ")[1].split("\n")[0])
+            assert shard_tokens <= 200
+
+        # The split file is reassembled exactly from its pieces in order
+        piece = re.compile(r"===== FILE: big\.py \(part \d+/\d+, lines \d+-\d+\) =====\n\[[^\]]*\]\n(.*?)\n(?=\n===== FILE: |\Z)", re.S)
+        body = [m.group(1) for p in parts for m in piece.finditer(p.read_text())]
+        assert len(body) > 1
+        assert "".join(body) == (self.test_repo / "big.py").read_text()
+
+        index = Path(shard_index_path(str(self.output_file))).read_text()
+        assert "===== SHARD INDEX =====" in index
+        assert "small.py -> repo_export.part-" in index
+        assert "big.py -> repo_export.part-001.txt [lines 1-" in index
+        assert "===== REPO SUMMARY =====" in index
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,65 @@
+import os
+import csv
+import json
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.stats import FileStats
+
+
+def info(path, tokens, size, lines=1):
+    return {"path": path.replace("/", os.sep), "tokens": tokens, "bytes": size, "lines": lines}
+
+
+class TestFileStats:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.base / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def test_top_matches_stable_sort(self):
+        infos = [info(f"d{i % 3}/f{i}.py", (i * 7) % 5, i) for i in range(50)]
+        stats = FileStats.from_infos(infos)
+        assert len(stats) == 50
+        expected = [(x["path"], x["tokens"]) for x in sorted(infos, key=lambda x: x["tokens"], reverse=True)[:20]]
+        assert stats.top(20, "tokens") == expected
+        assert stats.top(3, "bytes") == [(os.path.join("d1", "f49.py"), 49), (os.path.join("d0", "f48.py"), 48), (os.path.join("d2", "f47.py"), 47)]
+        with pytest.raises(ValueError):
+            stats.top(1, "digest")
+
+    def test_analytics(self):
+        stats = FileStats.from_infos([info("a.py", 10, 100), info("src/b.py", 30, 1000), info("src/c.md", 5, 1024), info("README", 0, 0)])
+        assert stats.percentiles("bytes", (50, 100)) == {50: 100, 100: 1024}
+        assert stats.percentiles("bytes", (50,), ext=".py") == {50: 100}
+        assert stats.histogram("bytes") == {0: 1, 128: 1, 1024: 2}
+        assert stats.by_extension()[".py"] == {"files": 2, "tokens": 40, "bytes": 1100, "lines": 2}
+        dirs = stats.by_directory()
+        assert dirs["src"]["files"] == 2 and dirs["src"]["tokens_per_kib"] == round(35 * 1024 / 2024, 2)
+        assert dirs["."]["tokens"] == 10
+
+    def test_export_writes_json_and_csv(self):
+        self.create_test_file("repo/main.py", "print('hello')\n")
+        self.create_test_file("repo/lib/util.py", "def f():\n    return 1\n")
+        for name in ("stats.json", "stats.csv"):
+            assert export_repo_as_text(str(self.base / "repo"), str(self.base / "out.txt"), respect_gitignore=False, preview=True, file_stats=str(self.base / name)) == 0
+        data = json.loads((self.base / "stats.json").read_text())
+        assert data["files"] == 2
+        assert sorted(data["columns"]["path"]) == ["lib/util.py", "main.py"]
+        assert data["extensions"][".py"]["files"] == 2
+        rows = list(csv.DictReader((self.base / "stats.csv").open()))
+        assert [r["path"] for r in rows] == data["columns"]["path"]
+        assert [int(r["tokens"]) for r in rows] == data["columns"]["tokens"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+import os
+import sys
+import subprocess
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.tokenizers import (
+    WORDS_TOKENIZER,
+    TokenizerError,
+    available_tokenizers,
+    encoder_name,
+    get_encoder,
+    register_tokenizer,
+    tiktoken_available,
+    unregister_tokenizer,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestTokenizerRegistry:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+        unregister_tokenizer("chars")
+        unregister_tokenizer("counted")
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def test_builtin_names(self):
+        assert {"cl100k_base", "o200k_base", WORDS_TOKENIZER, "estimate"} <= set(available_tokenizers())
+        assert get_encoder(WORDS_TOKENIZER) is None
+        assert encoder_name(None) == WORDS_TOKENIZER
+        with pytest.raises(TokenizerError):
+            get_encoder("no-such-tokenizer")
+
+    @pytest.mark.skipif(tiktoken_available(), reason="tiktoken is installed")
+    def test_tiktoken_encodings_need_tiktoken(self):
+        with pytest.raises(TokenizerError):
+            get_encoder("o200k_base")
+
+    def test_factory_loaded_once(self):
+        calls = []
+
+        class Encoder:
+            def encode(self, text):
+                return text.split(",")
+
+        def factory():
+            calls.append(1)
+            return Encoder()
+
+        register_tokenizer("counted", factory)
+        first = get_encoder("counted")
+        assert get_encoder("counted") is first
+        assert calls == [1]
+        assert encoder_name(first) == "counted"
+        with pytest.raises(TokenizerError):
+            register_tokenizer("counted", factory)
+        register_tokenizer("counted", factory, replace=True)
+        assert get_encoder("counted") is not first
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_export_with_registered_callable(self, jobs):
+        register_tokenizer("chars", count=len)
+        self.create_test_file("a.py", "x = 1\n")
+        self.create_test_file("b.md", "hello world\n")
+        self.create_test_file("c.txt", "abc")
+
+        output_file = self.test_repo.parent / f"chars_{os.getpid()}.txt"
+        try:
+            assert export_repo_as_text(str(self.test_repo), str(output_file), respect_gitignore=False, tokenizer="chars", jobs=jobs) == 0
+            content = output_file.read_text()
+        finally:
+            output_file.unlink()
+        assert "Tokenizer: chars\n" in content
+        assert "Total tokens: 21\n" in content
+        assert "[TOKENS: 12 | LINES: 1 | BYTES: 12]" in content
+
+    def test_unknown_tokenizer_fails_export(self):
+        self.create_test_file("a.py", "x = 1\n")
+        with pytest.raises(TokenizerError):
+            export_repo_as_text(str(self.test_repo), str(self.test_repo / "out.txt"), tokenizer="nope")
+
+    def test_import_does_not_load_tiktoken(self):
+        code = "import sys; import src.repo_digest.cli; assert 'tiktoken' not in sys.modules"
+        subprocess.run([sys.executable, "-c", code], cwd=str(ROOT), check=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
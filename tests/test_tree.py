@@ -0,0 +1,61 @@
+import os
+from io import StringIO
+import pytest
+from src.repo_digest.tree import DirTree
+
+
+def infos(*specs):
+    return [{"path": path.replace("/", os.sep), "tokens": tokens, "bytes": tokens * 4} for path, tokens in specs]
+
+
+class TestDirTree:
+    def render(self, tree, **options):
+        buf = StringIO()
+        tree.render(buf, **options)
+        return buf.getvalue()
+
+    def test_totals_include_directories_without_files(self):
+        tree = DirTree.from_infos(infos(("main.py", 1), ("a/b/c.py", 10), ("a/b/d/e.py", 5), ("x/y.md", 2)))
+        assert tree.get(".").tokens == 18
+        assert tree.get("a").files == 2
+        assert tree.get(os.path.join("a", "b")).tokens == 15
+        assert self.render(tree) == (
+            "├── a/ (files: 2, tokens: 15, bytes: 60)\n"
+            "│   └── b/ (files: 2, tokens: 15, bytes: 60)\n"
+            "│       └── d/ (files: 1, tokens: 5, bytes: 20)\n"
+            "└── x/ (files: 1, tokens: 2, bytes: 8)\n"
+        )
+
+    def test_depth_and_size_cutoffs(self):
+        tree = DirTree.from_infos(infos(("big/sub/a.py", 100), ("big/other/b.py", 50), ("s1/a.py", 1), ("s2/b.py", 2)))
+        assert self.render(tree, max_depth=1) == (
+            "├── big/ (files: 2, tokens: 150, bytes: 600) [+2 subdirectories]\n"
+            "├── s1/ (files: 1, tokens: 1, bytes: 4)\n"
+            "└── s2/ (files: 1, tokens: 2, bytes: 8)\n"
+        )
+        assert self.render(tree, min_tokens=60) == (
+            "├── big/ (files: 2, tokens: 150, bytes: 600)\n"
+            "│   ├── sub/ (files: 1, tokens: 100, bytes: 400)\n"
+            "│   └── (1 more directories under 60 tokens) (files: 1, tokens: 50, bytes: 200)\n"
+            "└── (2 more directories under 60 tokens) (files: 2, tokens: 3, bytes: 12)\n"
+        )
+        assert self.render(tree, max_depth=0) == ""
+
+    def test_remove_prunes_empty_directories(self):
+        specs = infos(("a/b/c.py", 10), ("a/d.py", 3), ("e/f.py", 1))
+        tree = DirTree.from_infos(specs)
+        tree.add(specs[0]["path"], 10, 40, sign=-1)
+        tree.add(specs[2]["path"], 1, 4, sign=-1)
+        assert tree.aggregates() == DirTree.from_infos(specs[1:2]).aggregates()
+        assert tree.children() == {".": ["a"], "a": []}
+
+    def test_deep_tree_renders_without_recursion(self):
+        path = "/".join(f"d{i}" for i in range(3000)) + "/f.py"
+        tree = DirTree.from_infos(infos((path, 1)))
+        lines = self.render(tree).splitlines()
+        assert len(lines) == 3000
+        assert lines[-1].endswith("d2999/ (files: 1, tokens: 1, bytes: 4)")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
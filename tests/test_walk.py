@@ -0,0 +1,82 @@
+import os
+import tempfile
+import shutil
+from pathlib import Path
+import pytest
+from src.repo_digest.core import export_repo_as_text
+from src.repo_digest.ignore import IgnoreMatcher
+from src.repo_digest.walk import walk_files
+
+
+class TestWalkFiles:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def walk(self, **options):
+        skipped = []
+        paths = [p.replace(os.sep, "/") for p, _ in walk_files(self.temp_dir, IgnoreMatcher.for_root(self.temp_dir, True), skipped=skipped, **options)]
+        return paths, [(p.replace(os.sep, "/"), reason) for p, reason in skipped]
+
+    def test_matches_filtering_and_stats(self):
+        self.create_test_file("b.py")
+        self.create_test_file("a.py", "hello")
+        self.create_test_file("app.min.js")
+        self.create_test_file("node_modules/x.js")
+        self.create_test_file("src/.gitignore", "*.log\n")
+        self.create_test_file("src/debug.log")
+        self.create_test_file("src/main.py")
+        paths, skipped = self.walk()
+        assert paths[:2] == ["a.py", "b.py"]
+        assert sorted(paths) == ["a.py", "b.py", "src/.gitignore", "src/main.py"]
+        assert skipped == []
+        stats = dict(walk_files(self.temp_dir, stat=True))
+        assert stats["a.py"].st_size == 5
+        assert stats["a.py"].st_ino == os.stat(self.test_repo / "a.py").st_ino
+
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+    def test_links_are_included_once(self):
+        self.create_test_file("a.py")
+        self.create_test_file("lib/util.py")
+        os.link(self.test_repo / "a.py", self.test_repo / "hard.py")
+        os.symlink(self.test_repo / "lib" / "util.py", self.test_repo / "soft.py")
+        os.symlink(self.test_repo, self.test_repo / "lib" / "loop")
+        # the first path in walk order wins
+        paths, skipped = self.walk()
+        assert paths == ["a.py", "soft.py"]
+        assert ("hard.py", "already included through another link") in skipped
+        assert ("lib/util.py", "already included through another link") in skipped
+        paths, skipped = self.walk(follow_symlinks=True)
+        assert paths == ["a.py", "soft.py"]
+        assert ("lib/loop", "symlink loop") in skipped
+
+    def test_depth_and_entry_limits(self):
+        self.create_test_file("top.py")
+        self.create_test_file("a/b/c/deep.py")
+        for i in range(5):
+            self.create_test_file(f"big/f{i}.py")
+        paths, skipped = self.walk(max_depth=2, max_dir_entries=4)
+        assert paths == ["top.py"]
+        assert ("a/b/c", "deeper than 2 levels") in skipped
+        assert ("big", "more than 4 entries") in skipped
+
+    def test_export_reports_skipped_directories(self, capsys):
+        self.create_test_file("repo/main.py", "print('hello')\n")
+        self.create_test_file("repo/a/b/deep.py", "x = 1\n")
+        output = self.test_repo / "out.txt"
+        assert export_repo_as_text(str(self.test_repo / "repo"), str(output), respect_gitignore=False, max_dir_depth=1, cache_dir=str(self.test_repo / "cache")) == 0
+        assert f"[skip] {os.path.join('a', 'b')}: deeper than 1 levels" in capsys.readouterr().out
+        assert "deep.py" not in output.read_text()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import shutil
+from io import StringIO
+from pathlib import Path
+import pytest
+from src.repo_digest.core import build_dir_aggregates, export_repo_as_text
+from src.repo_digest.watch import InotifyWatcher, LiveIndex, PollingWatcher
+
+
+class TestLiveIndex:
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_repo = Path(self.temp_dir)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_test_file(self, path: str, content: str = "test content"):
+        file_path = self.test_repo / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        return path
+
+    def bump_mtime(self, path: str):
+        st = os.stat(self.test_repo / path)
+        os.utime(self.test_repo / path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+    def render(self, index):
+        buf = StringIO()
+        index.render(buf)
+        return [l for l in buf.getvalue().splitlines() if not l.startswith("Generated:")]
+
+    def fresh(self):
+        index = LiveIndex(self.temp_dir)
+        index.build()
+        return index
+
+    def make_tree(self):
+        self.create_test_file("main.py", "print('hello')\n")
+        self.create_test_file("src/app.py", "def run():\n    return 1 + 2\n")
+        self.create_test_file("src/lib/util.py", "a b c d e f\n")
+        self.create_test_file("docs/readme.md", "# title\nsome words here too\n")
+        self.create_test_file(".gitignore", "*.log\n")
+
+    def test_build_matches_export(self):
+        self.make_tree()
+        output_file = Path(tempfile.mkdtemp()) / "out.txt"
+        try:
+            assert export_repo_as_text(self.temp_dir, str(output_file)) == 0
+            expected = [l for l in output_file.read_text().splitlines() if not l.startswith("Generated:")]
+        finally:
+            shutil.rmtree(output_file.parent)
+
+        assert self.render(self.fresh()) == expected
+
+    def test_apply_matches_rebuild(self):
+        self.make_tree()
+        index = self.fresh()
+
+        self.create_test_file("src/app.py", "def run():\n    return 1 + 2 + 3 + 4\n")
+        self.create_test_file("new/pkg/mod.py", "x = 1\n")
+        self.create_test_file("debug.log", "ignored\n")
+        os.remove(self.test_repo / "docs/readme.md")
+        changed = index.apply(["src/app.py", "new", "debug.log", "docs/readme.md"])
+
+        assert changed == {"src/app.py", os.path.join("new", "pkg", "mod.py"), os.path.join("docs", "readme.md")}
+        assert self.render(index) == self.render(self.fresh())
+        aggregates, _ = build_dir_aggregates(list(index.records.values()))
+        assert index.aggregates == dict(aggregates)
+
+    def test_unchanged_content_is_not_a_change(self):
+        self.make_tree()
+        index = self.fresh()
+        self.bump_mtime("main.py")
+        assert index.apply(["main.py"]) == set()
+
+    def test_gitignore_change_rebuilds(self):
+        self.make_tree()
+        index = self.fresh()
+        self.create_test_file(".gitignore", "*.log\ndocs/\n")
+
+        index.apply([".gitignore"])
+        assert os.path.join("docs", "readme.md") not in index.records
+        assert self.render(index) == self.render(self.fresh())
+
+    def test_links_and_walk_limits_survive_apply(self):
+        self.make_tree()
+        os.link(self.test_repo / "main.py", self.test_repo / "z.py")
+        self.create_test_file("src/lib/deep/too_deep.py", "x = 1\n")
+        index = LiveIndex(self.temp_dir, max_dir_depth=2)
+        index.build()
+        expected = self.render(index)
+        assert "z.py" not in index.records
+        assert os.path.join("src", "lib", "deep", "too_deep.py") not in index.records
+        assert os.path.join("src", "lib", "deep") not in index.dirs
+
+        assert index.apply([""]) == set()
+        assert index.apply(["src"]) == set()
+        assert index.apply(["z.py"]) == set()
+        assert self.render(index) == expected
+
+        os.remove(self.test_repo / "main.py")
+        assert index.apply(["main.py", "z.py"]) == {"main.py", "z.py"}
+        assert "z.py" in index.records
+
+    def test_sensitive_files_stay_blocked(self):
+        self.make_tree()
+        index = self.fresh()
+        self.create_test_file(".env", "SECRET=1")
+
+        index.apply([".env"])
+        assert ".env" in index.blocked_sensitive
+        assert ".env" not in index.records
+
+    def test_polling_watcher(self):
+        self.make_tree()
+        index = self.fresh()
+        watcher = PollingWatcher(index, interval=0)
+        assert watcher.poll() == set()
+
+        self.create_test_file("main.py", "print('changed')\n")
+        self.bump_mtime("main.py")
+        self.create_test_file("src/added.py", "y = 2\n")
+        self.bump_mtime("src")
+        changed = watcher.poll()
+        assert "main.py" in changed
+        assert os.path.join("src", "added.py") in changed
+
+        index.apply(changed)
+        assert watcher.poll() == set()
+        assert os.path.join("src", "added.py") in index.records
+
+    @pytest.mark.skipif(not InotifyWatcher.available(), reason="inotify not available")
+    def test_inotify_watcher(self):
+        self.make_tree()
+        index = self.fresh()
+        watcher = InotifyWatcher(index)
+        try:
+            self.create_test_file("src/lib/util.py", "changed\n")
+            assert os.path.join("src", "lib", "util.py") in watcher.wait(2.0)
+        finally:
+            watcher.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])